@@ -0,0 +1,6 @@
+"""Standalone performance benchmarks.
+
+Run from the ``backend/`` directory, e.g.::
+
+    python -m benchmarks.bench_local_index --points 20000
+"""
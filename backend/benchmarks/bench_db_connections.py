@@ -0,0 +1,89 @@
+"""Per-request cost of opening PostgreSQL connections vs reusing them.
+
+Simulates requests the way Django serves them: ``request_started``, a few
+queries (``send_message`` makes four or more), then ``request_finished``,
+which closes the connection unless ``CONN_MAX_AGE`` allows reuse.  Each
+mode runs in a fresh process with the app's real settings, configured
+through the same environment variables as production::
+
+    python -m benchmarks.bench_db_connections --requests 500 --queries 4
+
+Modes: ``PG_CONN_MAX_AGE=0`` (connect per request), persistent
+connections, and ``PG_POOL=True`` (skipped unless psycopg 3 is installed).
+Point ``PG_DB_HOST`` etc. at the database to measure; connection cost grows
+with network latency and TLS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from .common import print_table, summarize
+
+MODES = {
+    'connect per request': {'PG_CONN_MAX_AGE': '0', 'PG_POOL': 'False'},
+    'persistent (CONN_MAX_AGE=60)': {'PG_CONN_MAX_AGE': '60', 'PG_POOL': 'False'},
+    'psycopg pool': {'PG_POOL': 'True'},
+}
+
+
+def run_requests(n_requests: int, n_queries: int) -> list[float]:
+    """Run in the child process: time ``n_requests`` simulated requests."""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+    django.setup()
+    from django.core import signals
+    from django.db import connection
+
+    def one_request():
+        signals.request_started.send(sender=None)
+        with connection.cursor() as cursor:
+            for _ in range(n_queries):
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        signals.request_finished.send(sender=None)
+
+    one_request()  # warm up (first connect, pool fill)
+    latencies = []
+    for _ in range(n_requests):
+        t0 = time.perf_counter()
+        one_request()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=4, help='queries per simulated request')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_requests(args.requests, args.queries)))
+        return
+
+    rows = []
+    for mode, env in MODES.items():
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_db_connections', '--child',
+             '--requests', str(args.requests), '--queries', str(args.queries)],
+            env={**os.environ, **env}, capture_output=True, text=True,
+        )
+        if result.returncode:
+            rows.append({'mode': mode, 'error': result.stderr.strip().splitlines()[-1]})
+            continue
+        rows.append({'mode': mode, **summarize(json.loads(result.stdout.splitlines()[-1]))})
+
+    baseline = rows[0].get('mean_ms')
+    for row in rows:
+        if baseline and 'mean_ms' in row:
+            row['saved_per_request_ms'] = round(baseline - row['mean_ms'], 3)
+    print(f'{args.requests} requests x {args.queries} queries\n')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""EXPLAIN ANALYZE of the analytics and session queries on a large table.
+
+Creates a throwaway test database (``test_<PG_DB_NAME>``) with all
+migrations applied, fills it with synthetic sessions and messages using
+``generate_series``, then calls the real analytics and session endpoints,
+capturing every SQL query and running ``EXPLAIN (ANALYZE, FORMAT JSON)``
+on it.  The same queries are explained again after dropping the models'
+``Meta.indexes``, so each row shows the plan and time with and without
+them::
+
+    python -m benchmarks.bench_db_indexes --messages 2000000
+
+Needs a PostgreSQL user allowed to create databases.  ``--keep-db``
+reuses the populated database between runs.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from .common import print_table
+
+SETUP_SQL = """
+INSERT INTO chat_chatsession (id, title, created_at, updated_at)
+SELECT gen_random_uuid(), 'bench ' || i, ts, ts + random() * interval '2 hours'
+FROM (
+    SELECT i, now() - random() * interval '180 days' AS ts FROM generate_series(1, %(sessions)s) i
+) s;
+
+INSERT INTO chat_chatmessage (
+    id, session_id, message_type, text, timestamp, rating, sources,
+    rag_latency_ms, llm_latency_ms, total_latency_ms, top_rag_score,
+    rag_timings, effective_k, dropped_candidates
+)
+SELECT
+    gen_random_uuid(), s.id,
+    CASE WHEN n %% 2 = 0 THEN 'user' ELSE 'bot' END,
+    'benchmark message ' || n,
+    s.created_at + n * interval '30 seconds',
+    CASE WHEN n %% 2 = 1 AND random() < 0.2 THEN 1 + floor(random() * 5)::int END,
+    '[]'::jsonb,
+    (100 + random() * 400)::int,
+    (2000 + random() * 80000)::int,
+    (2100 + random() * 80400)::int,
+    random(),
+    '{}'::jsonb, 3, '[]'::jsonb
+FROM chat_chatsession s, generate_series(1, %(per_session)s) n;
+
+ANALYZE chat_chatsession;
+ANALYZE chat_chatmessage;
+"""
+
+ENDPOINTS = ['/api/analytics/usage/', '/api/analytics/rag/', '/api/sessions/{session}/']
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def describe_plan(plan: dict) -> str:
+    """Compact list of how each chat_ table is read, e.g. 'Index Only Scan chat_msg_type_ts_idx'."""
+    scans = []
+    for node in plan_nodes(plan):
+        if node.get('Relation Name', '').startswith('chat_') or 'Index Name' in node:
+            scans.append(f"{node['Node Type']} {node.get('Index Name', node.get('Relation Name', ''))}".strip())
+    return ', '.join(dict.fromkeys(scans)) or plan['Node Type']
+
+
+def explain_endpoints(client, connection, session_id) -> list[dict]:
+    from django.test.utils import CaptureQueriesContext
+
+    rows = []
+    for endpoint in ENDPOINTS:
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(endpoint.format(session=session_id))
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql)
+                result = cursor.fetchone()[0]
+            result = json.loads(result) if isinstance(result, str) else result
+            rows.append({
+                'endpoint': endpoint.split('/')[2],
+                'query': re.sub(r'\s+', ' ', sql)[:70],
+                'ms': round(result[0]['Execution Time'], 2),
+                'plan': describe_plan(result[0]['Plan']),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2_000_000)
+    parser.add_argument('--per-session', type=int, default=20, help='messages per session')
+    parser.add_argument('--keep-db', action='store_true')
+    args = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+    django.setup()
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    from chat.models import ChatMessage, ChatSession
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=1, interactive=False, keepdb=args.keep_db)
+    try:
+        if not ChatMessage.objects.exists():
+            t0 = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(SETUP_SQL, {
+                    'sessions': max(1, args.messages // args.per_session),
+                    'per_session': args.per_session,
+                })
+            print(f'Inserted {ChatMessage.objects.count()} messages in {time.perf_counter() - t0:.1f}s')
+        session_id = ChatSession.objects.values_list('id', flat=True).first()
+        client = Client()
+
+        indexed = explain_endpoints(client, connection, session_id)
+        with connection.schema_editor() as editor:
+            for model in (ChatMessage, ChatSession):
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        try:
+            plain = explain_endpoints(client, connection, session_id)
+        finally:
+            with connection.schema_editor() as editor:
+                for model in (ChatMessage, ChatSession):
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+
+        rows = [
+            {**row, 'ms_no_index': other['ms'], 'plan_no_index': other['plan']}
+            for row, other in zip(indexed, plain)
+        ]
+        print(f'\nchat_chatmessage: {ChatMessage.objects.count()} rows\n')
+        print_table(rows)
+    finally:
+        teardown_databases(old_config, verbosity=1, keepdb=args.keep_db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Recall@k vs latency: HNSW graph vs exact brute-force search.
+
+Builds an HNSW graph with the same parameters ``HnswIndex`` uses and
+sweeps the query-time ``ef``; ground truth comes from the same
+``argpartition`` top-k that ``NumpyIndex`` uses.  The default corpus is
+1M synthetic 768-d vectors (~3 GB as float32), so use ``--points`` for
+a quick run::
+
+    python -m benchmarks.bench_hnsw --points 100000 --ef 16 32 64 128
+
+Vectors are fed to hnswlib directly rather than through
+``HnswIndex.upsert`` so that building 1M ``PointStruct`` objects does not
+dominate the run.
+"""
+import argparse
+import time
+
+import hnswlib
+import numpy as np
+
+from chat.rag_service import EMBEDDING_DIM
+from chat.vector_index import normalize, top_k_rows
+
+from .common import print_table, summarize, synthetic_vectors, time_calls
+
+CHUNK = 50_000
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Exact top-k over a large corpus, scored in row chunks to bound memory."""
+    best_idx = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(corpus), CHUNK):
+        idx, scores = top_k_rows(queries @ corpus[start:start + CHUNK].T, k)
+        best_idx = np.hstack([best_idx, idx + start])
+        best_scores = np.hstack([best_scores, scores])
+        keep, _ = top_k_rows(best_scores, k)
+        best_idx = np.take_along_axis(best_idx, keep, axis=1)
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+    return best_idx
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--m', type=int, default=16)
+    parser.add_argument('--ef-construction', type=int, default=200)
+    parser.add_argument('--ef', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    corpus = np.vstack([
+        normalize(synthetic_vectors(min(CHUNK, args.points - start), EMBEDDING_DIM, seed=start + 1))
+        for start in range(0, args.points, CHUNK)
+    ])
+    queries = normalize(synthetic_vectors(args.queries, EMBEDDING_DIM, seed=0) + 0.1)
+
+    t0 = time.perf_counter()
+    graph = hnswlib.Index(space='cosine', dim=EMBEDDING_DIM)
+    graph.init_index(max_elements=args.points, M=args.m, ef_construction=args.ef_construction)
+    for start in range(0, args.points, CHUNK):
+        graph.add_items(corpus[start:start + CHUNK], np.arange(start, min(start + CHUNK, args.points)))
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    truth = exact_top_k(corpus, queries, args.top_k)
+    exact_ms = (time.perf_counter() - t0) * 1000 / args.queries
+    truth_sets = [set(row) for row in truth]
+
+    rows = [{
+        'method': 'exact',
+        'ef': '-',
+        f'recall@{args.top_k}': 1.0,
+        **summarize(time_calls(lambda q: top_k_rows(q[None, :] @ corpus.T, args.top_k), queries[:20])),
+    }]
+    for ef in args.ef:
+        graph.set_ef(max(ef, args.top_k))
+        labels, _ = graph.knn_query(queries, k=args.top_k)
+        recall = np.mean([len(truth_sets[i] & set(row)) / args.top_k for i, row in enumerate(labels)])
+        rows.append({
+            'method': 'hnsw',
+            'ef': ef,
+            f'recall@{args.top_k}': round(float(recall), 4),
+            **summarize(time_calls(lambda q: graph.knn_query(q, k=args.top_k, num_threads=1), queries)),
+        })
+
+    print(
+        f'{args.points} points x {EMBEDDING_DIM} dims, M={args.m}, '
+        f'ef_construction={args.ef_construction}, build {build_s:.1f}s, '
+        f'batched exact search {exact_ms:.2f} ms/query\n'
+    )
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""End-to-end load test: throughput, latency and errors under concurrency.
+
+Starts the fake Ollama and Qdrant servers of ``fake_services`` in this
+process, creates a throwaway test database (``test_<PG_DB_NAME>``) and runs
+the app under Gunicorn against them, with the real settings otherwise.
+Then, for each ``--concurrency`` level, that many clients send a mix of
+requests for ``--duration`` seconds:
+
+- ``chat``: ``POST /api/chat/`` (a new session every ``--session-messages``),
+- ``sessions``: ``GET /api/sessions/``,
+- ``session``: ``GET /api/sessions/<id>/`` of the client's session (a
+  ``sessions`` request until the client has one),
+- ``analytics``: ``GET /api/analytics/usage/`` and ``/rag/`` in turn.
+
+Throughput, p50/p99 latency and error rate per level and request type are
+printed and written to ``--output`` as JSON, to diff across commits::
+
+    python -m benchmarks.bench_load --concurrency 1 8 32 --duration 30 --output before.json
+    git checkout my-branch
+    python -m benchmarks.bench_load --concurrency 1 8 32 --duration 30 --output after.json
+    python -m benchmarks.bench_load --compare before.json after.json
+
+The fake LLM answers after ``--llm-latency-ms`` plus ``--tokens`` at
+``--token-rate`` tokens/s, so chat latency has a known floor.  With
+``--url``, nothing is started and the server at ``--url`` is loaded as it
+is (run ``python -m benchmarks.fake_services`` to give it fake backends).
+Gunicorn workers and threads default to ``GUNICORN_WORKERS`` /
+``GUNICORN_THREADS`` like the Docker entrypoint.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from .common import print_table, summarize
+from .fake_services import FakeOllama, FakeQdrant
+
+DEFAULT_MIX = 'chat=6,sessions=2,session=1,analytics=1'
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('chat', 'sessions', 'session', 'analytics'):
+            raise argparse.ArgumentTypeError(f'Unknown request type "{name}"')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def questions() -> list[str]:
+    from chat.mock_data import GUARDIAN_INCIDENTS
+    return [f"How do I fix '{incident['title']}'?" for incident in GUARDIAN_INCIDENTS]
+
+
+class LoadClient:
+    """One simulated user: its own connection, session and request mix."""
+
+    def __init__(self, base_url: str, mix: dict, session_messages: int, seed: int):
+        self.http = httpx.Client(base_url=base_url, timeout=600)
+        self.ops = list(mix)
+        self.weights = list(mix.values())
+        self.session_messages = session_messages
+        self.random = random.Random(seed)
+        self.questions = questions()
+        self.session_id = None
+        self.sent = 0
+        self.analytics_turn = 0
+
+    def request(self, op: str) -> httpx.Response:
+        if op == 'chat':
+            if self.sent % self.session_messages == 0:
+                self.session_id = None
+            body = {'message': self.random.choice(self.questions)}
+            if self.session_id:
+                body['session_id'] = self.session_id
+            response = self.http.post('/api/chat/', json=body)
+            if response.status_code == 200:
+                self.session_id = response.json()['session_id']
+                self.sent += 1
+            return response
+        if op == 'session':
+            return self.http.get(f'/api/sessions/{self.session_id}/')
+        if op == 'analytics':
+            self.analytics_turn += 1
+            return self.http.get('/api/analytics/usage/' if self.analytics_turn % 2 else '/api/analytics/rag/')
+        return self.http.get('/api/sessions/')
+
+    def run(self, deadline: float, samples: list):
+        while time.perf_counter() < deadline:
+            op = self.random.choices(self.ops, self.weights)[0]
+            if op == 'session' and not self.session_id:
+                op = 'sessions'  # no session to fetch yet; list them, and record it as such
+            t0 = time.perf_counter()
+            try:
+                ok = self.request(op).status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples.append((op, ok, (time.perf_counter() - t0) * 1000))
+
+    def close(self):
+        self.http.close()
+
+
+def _stats(samples: list, duration_s: float) -> dict:
+    errors = sum(1 for _, ok, _ in samples if not ok)
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / duration_s, 2),
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        **(summarize([ms for _, _, ms in samples]) if samples else {}),
+    }
+
+
+def run_level(base_url: str, concurrency: int, duration_s: float, mix: dict, session_messages: int, seed: int) -> dict:
+    """Load the server with ``concurrency`` clients for ``duration_s`` seconds."""
+    clients = [LoadClient(base_url, mix, session_messages, seed * 1000 + i) for i in range(concurrency)]
+    samples = []  # list.append is atomic, so clients share it
+    deadline = time.perf_counter() + duration_s
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=c.run, args=(deadline, samples)) for c in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Requests in flight at the deadline finish late; count the real span
+    elapsed = time.perf_counter() - t0
+    for client in clients:
+        client.close()
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'all': _stats(samples, elapsed),
+        'ops': {
+            op: _stats([s for s in samples if s[0] == op], elapsed)
+            for op in dict.fromkeys([*mix, *(s[0] for s in samples)])
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(env: dict, workers: int, threads: int) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'guardian_project.wsgi:application',
+            '--config', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            '--threads', str(threads),
+            '--timeout', '300',
+            '--log-level', 'warning',
+        ],
+        cwd=backend_dir, env={**os.environ, **env},
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Gunicorn exited with status {process.returncode}')
+        try:
+            if httpx.get(f'{url}/api/', timeout=2).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('Gunicorn did not become ready within 60 s')
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_rows(results: list) -> list[dict]:
+    rows = []
+    for level in results:
+        for op, stats in [('all', level['all']), *level['ops'].items()]:
+            rows.append({
+                'concurrency': level['concurrency'],
+                'request': op,
+                'requests': stats['requests'],
+                'rps': stats['throughput_rps'],
+                'p50_ms': stats.get('p50_ms', ''),
+                'p99_ms': stats.get('p99_ms', ''),
+                'errors': f"{stats['error_rate']:.2%}",
+            })
+    return rows
+
+
+def compare(before_path: str, after_path: str):
+    """Print the change in throughput and latency between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def index(report):
+        return {
+            (level['concurrency'], op): stats
+            for level in report['results']
+            for op, stats in [('all', level['all']), *level['ops'].items()]
+        }
+
+    def change(old, new):
+        if not old or new in (None, ''):
+            return ''
+        return f'{(new - old) / old:+.1%}'
+
+    old_stats = index(before)
+    rows = []
+    for key, new in index(after).items():
+        old = old_stats.get(key)
+        if old is None:
+            continue
+        rows.append({
+            'concurrency': key[0],
+            'request': key[1],
+            'rps': f"{old['throughput_rps']} -> {new['throughput_rps']}",
+            'rps_change': change(old['throughput_rps'], new['throughput_rps']),
+            'p50_change': change(old.get('p50_ms'), new.get('p50_ms')),
+            'p99_change': change(old.get('p99_ms'), new.get('p99_ms')),
+            'errors': f"{old['error_rate']:.2%} -> {new['error_rate']:.2%}",
+        })
+    print(f"\n{before['meta'].get('commit')} -> {after['meta'].get('commit')}\n")
+    print_table(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=30, help='seconds per concurrency level')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'request weights (default {DEFAULT_MIX})')
+    parser.add_argument('--session-messages', type=int, default=10, help='chat messages per session')
+    parser.add_argument('--llm-latency-ms', type=float, default=50, help='fake LLM time to first token')
+    parser.add_argument('--tokens', type=int, default=100, help='tokens per fake LLM answer')
+    parser.add_argument('--token-rate', type=float, default=200, help='fake LLM tokens per second')
+    parser.add_argument('--embed-latency-ms', type=float, default=5)
+    parser.add_argument('--search-latency-ms', type=float, default=1)
+    parser.add_argument('--docs', type=int, default=1000, help='points in the fake Qdrant collection')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('GUNICORN_WORKERS', '2')))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('GUNICORN_THREADS', '1')))
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    server = old_config = ollama = qdrant = None
+    try:
+        base_url = args.url
+        if base_url is None:
+            ollama = FakeOllama(
+                latency_ms=args.llm_latency_ms, tokens=args.tokens, token_rate=args.token_rate,
+                embed_latency_ms=args.embed_latency_ms,
+            ).start()
+            qdrant = FakeQdrant(docs=args.docs, latency_ms=args.search_latency_ms).start()
+            print(f'Fake Ollama at {ollama.url}, fake Qdrant at {qdrant.url}')
+
+            import django
+            os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+            django.setup()
+            from django.db import connection
+            from django.test.utils import setup_databases, setup_test_environment
+
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            server, base_url = start_server({
+                'PG_DB_NAME': connection.settings_dict['NAME'],
+                'OLLAMA_BASE_URL': ollama.url,
+                'QDRANT_HOST': '127.0.0.1',
+                'QDRANT_PORT': str(qdrant.port),
+                'QDRANT_PREFER_GRPC': 'False',
+                'RAG_BACKEND': 'qdrant',
+            }, args.workers, args.threads)
+
+        results = []
+        for concurrency in args.concurrency:
+            print(f'Running {concurrency} clients for {args.duration:g} s...')
+            results.append(run_level(base_url, concurrency, args.duration, args.mix, args.session_messages, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if old_config is not None:
+            from django.db import connections
+            from django.test.utils import teardown_databases
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+        for fake in (ollama, qdrant):
+            if fake is not None:
+                fake.stop()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'url': args.url,
+            'workers': None if args.url else args.workers,
+            'threads': None if args.url else args.threads,
+            'mix': args.mix,
+            'fake_ollama': None if args.url else {
+                'llm_latency_ms': args.llm_latency_ms, 'tokens': args.tokens,
+                'token_rate': args.token_rate, 'embed_latency_ms': args.embed_latency_ms,
+            },
+            'fake_qdrant': None if args.url else {'docs': args.docs, 'search_latency_ms': args.search_latency_ms},
+        },
+        'results': results,
+    }
+    print()
+    print_table(result_rows(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nWrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
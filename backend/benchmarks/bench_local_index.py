@@ -0,0 +1,76 @@
+"""Query latency: in-process NumpyIndex vs Qdrant.
+
+By default Qdrant runs in qdrant-client's in-memory local mode, which
+measures client-side overhead only.  Point ``--qdrant-host`` at a real
+server to include the network hop that the local index avoids::
+
+    python -m benchmarks.bench_local_index --points 20000 --qdrant-host 148.230.92.74
+"""
+import argparse
+import tempfile
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from chat.rag_service import EMBEDDING_DIM
+from chat.vector_index import NumpyIndex
+
+from .common import print_table, summarize, synthetic_vectors, time_calls
+
+COLLECTION = 'bench_local_index'
+
+
+def build_points(vectors):
+    return [
+        PointStruct(id=i, vector=v.tolist(), payload={'title': f'doc {i}', 'content': 'x' * 200})
+        for i, v in enumerate(vectors)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32, help='queries per batched search')
+    parser.add_argument('--qdrant-host', default=None, help='remote Qdrant host (default: in-memory local mode)')
+    parser.add_argument('--qdrant-port', type=int, default=6333)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.points, EMBEDDING_DIM)
+    queries = synthetic_vectors(args.queries, EMBEDDING_DIM, seed=1).tolist()
+    points = build_points(vectors)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyIndex(tmp, dim=EMBEDDING_DIM)
+        index.upsert(points)
+        rows.append({'backend': 'numpy', 'mode': 'single', **summarize(
+            time_calls(lambda q: index.search(q, args.top_k), queries)
+        )})
+        batches = [queries[i:i + args.batch_size] for i in range(0, len(queries), args.batch_size)]
+        per_batch = time_calls(lambda b: index.search_batch(b, args.top_k), batches)
+        rows.append({'backend': 'numpy', 'mode': f'batch/{args.batch_size}', **summarize(
+            [ms / args.batch_size for ms in per_batch]
+        )})
+
+    if args.qdrant_host:
+        client = QdrantClient(host=args.qdrant_host, port=args.qdrant_port, check_compatibility=False)
+    else:
+        client = QdrantClient(location=':memory:')
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE))
+    for i in range(0, len(points), 1000):
+        client.upsert(COLLECTION, points=points[i:i + 1000])
+    rows.append({'backend': f'qdrant ({args.qdrant_host or "in-memory"})', 'mode': 'single', **summarize(
+        time_calls(lambda q: client.query_points(COLLECTION, query=q, limit=args.top_k), queries)
+    )})
+    client.delete_collection(COLLECTION)
+
+    print(f'{args.points} points x {EMBEDDING_DIM} dims, {args.queries} queries, top_k={args.top_k}\n')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""REST vs gRPC transport to Qdrant: query latency and ingest throughput.
+
+Needs a Qdrant server; a local container is a good stand-in for the
+remote one (add network latency with ``tc`` if you want realism)::
+
+    docker run -d -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python -m benchmarks.bench_qdrant_transport --points 20000 --queries 500
+
+Clients are built with ``rag_service._qdrant_client_kwargs()``, so the
+pool size, keep-alive and timeout settings are the ones the app uses.
+"""
+import argparse
+import time
+
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, QueryRequest, VectorParams
+
+from chat import rag_service
+from chat.rag_service import EMBEDDING_DIM
+
+from .common import print_table, summarize, synthetic_vectors, time_calls
+
+COLLECTION = 'bench_transport'
+
+
+def bench_transport(prefer_grpc: bool, points, queries, args) -> dict:
+    settings.QDRANT_PREFER_GRPC = prefer_grpc
+    client = QdrantClient(**rag_service._qdrant_client_kwargs())
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE))
+
+    t0 = time.perf_counter()
+    for i in range(0, len(points), args.batch_size):
+        client.upsert(COLLECTION, points=points[i:i + args.batch_size], wait=True)
+    ingest_s = time.perf_counter() - t0
+
+    def query(q):
+        return client.query_points(COLLECTION, query=q, limit=args.top_k, with_payload=['title'])
+
+    def query_batch(batch):
+        return client.query_batch_points(COLLECTION, requests=[
+            QueryRequest(query=q, limit=args.top_k, with_payload=['title']) for q in batch
+        ])
+
+    time_calls(query, queries[:20])  # warm up connections
+    single = summarize(time_calls(query, queries))
+    batches = [queries[i:i + 16] for i in range(0, len(queries), 16)]
+    batched = summarize(time_calls(query_batch, batches))
+    client.delete_collection(COLLECTION)
+    client.close()
+    return {
+        'transport': 'gRPC' if prefer_grpc else 'REST',
+        'ingest_pts_per_s': round(len(points) / ingest_s),
+        'query_p50_ms': single['p50_ms'],
+        'query_p99_ms': single['p99_ms'],
+        'query_mean_ms': single['mean_ms'],
+        'batch16_p50_ms': batched['p50_ms'],
+        'batch16_p99_ms': batched['p99_ms'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6333)
+    parser.add_argument('--grpc-port', type=int, default=6334)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=256, help='points per upsert call')
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+    if not settings.configured:
+        settings.configure(QDRANT_POOL_SIZE=4, QDRANT_KEEPALIVE_S=30.0, QDRANT_TIMEOUT=30)
+    settings.QDRANT_HOST = args.host
+    settings.QDRANT_PORT = args.port
+    settings.QDRANT_GRPC_PORT = args.grpc_port
+
+    vectors = synthetic_vectors(args.points, EMBEDDING_DIM)
+    queries = synthetic_vectors(args.queries, EMBEDDING_DIM, seed=1).tolist()
+    points = [
+        PointStruct(id=i, vector=v.tolist(), payload={'title': f'incident {i}'})
+        for i, v in enumerate(vectors)
+    ]
+
+    rows = [bench_transport(prefer_grpc, points, queries, args) for prefer_grpc in (False, True)]
+    print(f'{args.points} points x {EMBEDDING_DIM} dims, {args.queries} queries, top_k={args.top_k}\n')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
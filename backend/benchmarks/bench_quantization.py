@@ -0,0 +1,121 @@
+"""Memory, latency and recall loss of int8/binary quantization with rescoring.
+
+Runs the local ``NumpyIndex`` in each quantization mode against exact
+float32 search.  With ``--qdrant-host`` the same comparison is made on a
+real Qdrant server using the collection config and search params that
+``rag_service`` applies for each ``RAG_QUANTIZATION`` value::
+
+    python -m benchmarks.bench_quantization --points 100000 --oversampling 1 2 4
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from chat import rag_service
+from chat.rag_service import EMBEDDING_DIM
+from chat.vector_index import NumpyIndex
+
+from .common import print_table, summarize, synthetic_vectors, time_calls
+
+COLLECTION = 'bench_quantization'
+
+
+def recall(results, truth, k):
+    return round(float(np.mean([
+        len({h.id for h in got} & {h.id for h in want}) / k for got, want in zip(results, truth)
+    ])), 4)
+
+
+def bench_local(points, queries, args):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = NumpyIndex(Path(tmp) / 'none', dim=EMBEDDING_DIM)
+        exact.upsert(points)
+        truth = exact.search_batch(queries, args.top_k)
+        float_bytes = exact._snapshot.vectors.nbytes
+        rows.append({
+            'index': 'numpy', 'mode': 'none', 'oversampling': '-',
+            'ram_MB': round(float_bytes / 2**20, 1), 'saved': '0%',
+            f'recall@{args.top_k}': 1.0,
+            **summarize(time_calls(lambda q: exact.search(q, args.top_k), queries)),
+        })
+        for mode in ('int8', 'binary'):
+            for oversampling in args.oversampling:
+                index = NumpyIndex(Path(tmp) / mode, dim=EMBEDDING_DIM, quantization=mode, oversampling=oversampling)
+                if not len(index):
+                    index.upsert(points)
+                code_bytes = index._snapshot.codes.nbytes
+                rows.append({
+                    'index': 'numpy', 'mode': mode, 'oversampling': oversampling,
+                    'ram_MB': round(code_bytes / 2**20, 1),
+                    'saved': f'{100 * (1 - code_bytes / float_bytes):.0f}%',
+                    f'recall@{args.top_k}': recall(index.search_batch(queries, args.top_k), truth, args.top_k),
+                    **summarize(time_calls(lambda q: index.search(q, args.top_k), queries)),
+                })
+    return rows, truth
+
+
+def bench_qdrant(points, queries, truth, args):
+    client = QdrantClient(host=args.qdrant_host, port=args.qdrant_port, check_compatibility=False)
+    rows = []
+    for mode in ('none', 'int8', 'binary'):
+        for oversampling in ([None] if mode == 'none' else args.oversampling):
+            settings.RAG_QUANTIZATION = mode
+            settings.RAG_QUANTIZATION_OVERSAMPLING = oversampling or 1.0
+            if client.collection_exists(COLLECTION):
+                client.delete_collection(COLLECTION)
+            client.create_collection(
+                COLLECTION,
+                vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE),
+                quantization_config=rag_service._quantization_config(),
+            )
+            for i in range(0, len(points), 1000):
+                client.upsert(COLLECTION, points=points[i:i + 1000], wait=True)
+
+            def query(q):
+                return client.query_points(
+                    COLLECTION, query=q, limit=args.top_k, search_params=rag_service._search_params(),
+                ).points
+
+            rows.append({
+                'index': 'qdrant', 'mode': mode, 'oversampling': oversampling or '-',
+                'ram_MB': '-', 'saved': '-',
+                f'recall@{args.top_k}': recall([query(q) for q in queries], truth, args.top_k),
+                **summarize(time_calls(query, queries)),
+            })
+    client.delete_collection(COLLECTION)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--oversampling', type=float, nargs='+', default=[1.0, 3.0, 10.0])
+    parser.add_argument('--qdrant-host', default=None, help='also benchmark a real Qdrant server')
+    parser.add_argument('--qdrant-port', type=int, default=6333)
+    args = parser.parse_args()
+    if not settings.configured:
+        settings.configure()
+
+    vectors = synthetic_vectors(args.points, EMBEDDING_DIM)
+    queries = synthetic_vectors(args.queries, EMBEDDING_DIM, seed=1).tolist()
+    points = [PointStruct(id=i, vector=v.tolist(), payload={}) for i, v in enumerate(vectors)]
+
+    rows, truth = bench_local(points, queries, args)
+    if args.qdrant_host:
+        rows += bench_qdrant(points, queries, truth, args)
+
+    print(f'{args.points} points x {EMBEDDING_DIM} dims, {args.queries} queries, top_k={args.top_k}')
+    print('ram_MB = vectors scanned per query (float32 rows stay memory-mapped when quantized)\n')
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Serialization and JSON rendering cost of the hot read endpoints.
+
+Creates a throwaway test database (``test_<PG_DB_NAME>``) holding one
+session of ``--messages`` messages (plus ``--sessions`` small sessions for
+the session list), then times building and rendering each payload with:
+
+- the ModelSerializers and DRF's ``JSONRenderer`` (the previous code path),
+- the read-only ``session_detail_data`` / ``session_list_data`` helpers,
+- those helpers with ``ORJSONRenderer`` (skipped unless orjson is installed).
+
+Analytics payloads are plain dicts, so only their rendering is compared::
+
+    python -m benchmarks.bench_serialization --messages 1000
+
+Every variant's output is checked to be byte-identical to the old one.
+"""
+import argparse
+import os
+import time
+
+from .common import print_table, summarize
+
+
+def timed(fn, repeat: int):
+    """Return (result, latencies in ms) of ``repeat`` calls, plus queries per call."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        result = fn()
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return result, latencies, len(ctx.captured_queries)
+
+
+def populate(n_messages: int, n_sessions: int):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from chat.models import ChatMessage, ChatSession
+
+    start = timezone.now() - timedelta(days=1)
+    session = ChatSession.objects.create(title='bench long session')
+    ChatMessage.objects.bulk_create([
+        ChatMessage(
+            session=session,
+            message_type='user' if i % 2 == 0 else 'bot',
+            text=f'benchmark message {i} ' + 'lorem ipsum dolor sit amet ' * 20,
+            timestamp=start + timedelta(seconds=30 * i),
+            rating=(i % 5) + 1 if i % 2 else None,
+            sources=[] if i % 2 == 0 else [{'title': f'Incident {i % 12}', 'score': 0.5}] * 3,
+        )
+        for i in range(n_messages)
+    ], batch_size=1000)
+    for i in range(n_sessions):
+        other = ChatSession.objects.create(title=f'bench session {i}')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=other, message_type='user' if j % 2 == 0 else 'bot', text=f'message {j}')
+            for j in range(4)
+        ])
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=1000, help='messages in the long session')
+    parser.add_argument('--sessions', type=int, default=200, help='extra sessions for the session list')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+    django.setup()
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+    from rest_framework.renderers import JSONRenderer
+
+    from chat import analytics
+    from chat.models import ChatSession
+    from chat.serializers import (
+        ChatSessionListSerializer,
+        ChatSessionSerializer,
+        session_detail_data,
+        session_list_data,
+    )
+
+    renderers = {'drf': JSONRenderer()}
+    try:
+        from chat.renderers import ORJSONRenderer
+        renderers['orjson'] = ORJSONRenderer()
+    except ImportError:
+        print('orjson not installed, skipping ORJSONRenderer')
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        session = populate(args.messages, args.sessions)
+        payloads = {
+            'session_detail': {
+                'modelserializer': lambda: ChatSessionSerializer(session).data,
+                'read-only': lambda: session_detail_data(session),
+            },
+            'session_list': {
+                'modelserializer': lambda: ChatSessionListSerializer(ChatSession.objects.all(), many=True).data,
+                'read-only': lambda: session_list_data(ChatSession.objects.all()),
+            },
+            'analytics_usage': {'dict': lambda: analytics.usage_stats()},
+            'analytics_rag': {'dict': lambda: analytics.rag_stats()},
+        }
+
+        rows = []
+        for endpoint, builders in payloads.items():
+            baseline = None
+            for builder_name, build in builders.items():
+                data, build_ms, queries = timed(build, args.repeat)
+                for renderer_name, renderer in renderers.items():
+                    if builder_name == 'modelserializer' and renderer_name != 'drf':
+                        continue
+                    body, render_ms, _ = timed(lambda: renderer.render(data), args.repeat)
+                    baseline = baseline or body
+                    build_stats = summarize(build_ms)
+                    render_stats = summarize(render_ms)
+                    rows.append({
+                        'endpoint': endpoint,
+                        'serializer': builder_name,
+                        'renderer': renderer_name,
+                        'queries': queries,
+                        'build_p50_ms': build_stats['p50_ms'],
+                        'render_p50_ms': render_stats['p50_ms'],
+                        'total_p50_ms': round(build_stats['p50_ms'] + render_stats['p50_ms'], 3),
+                        'bytes': len(body),
+                        'same_output': body == baseline,
+                    })
+        print(f'\nLong session: {args.messages} messages; session list: {args.sessions + 1} sessions\n')
+        print_table(rows)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
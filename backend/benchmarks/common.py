@@ -0,0 +1,55 @@
+"""Helpers shared by the benchmark scripts."""
+import statistics
+import time
+
+import numpy as np
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, latent_dim: int = 48) -> np.ndarray:
+    """Return ``n`` random float32 vectors shaped a little like embeddings.
+
+    Real sentence embeddings occupy a low-dimensional manifold of their
+    768-d space; isotropic noise in the full space makes every neighbour
+    nearly equidistant, which is unrealistically hard for approximate
+    indexes.  Vectors are therefore drawn in ``latent_dim`` dimensions and
+    projected up with a fixed random matrix (shared across seeds, so
+    queries and corpus live in the same subspace), plus a little noise.
+    """
+    projection = np.random.default_rng(12345).standard_normal((latent_dim, dim)).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((n, latent_dim)).astype(np.float32)
+    noise = rng.standard_normal((n, dim)).astype(np.float32)
+    return latent @ projection + 0.5 * noise
+
+
+def time_calls(fn, items, repeat: int = 1) -> list[float]:
+    """Call ``fn(item)`` for every item and return per-call latencies in ms."""
+    latencies = []
+    for _ in range(repeat):
+        for item in items:
+            t0 = time.perf_counter()
+            fn(item)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def summarize(latencies_ms: list[float]) -> dict:
+    ordered = sorted(latencies_ms)
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+    }
+
+
+def print_table(rows: list[dict]):
+    """Print a list of flat dicts as an aligned text table."""
+    if not rows:
+        return
+    headers = list(dict.fromkeys(h for row in rows for h in row))
+    widths = {h: max(len(h), *(len(str(r.get(h, ''))) for r in rows)) for h in headers}
+    print('  '.join(h.ljust(widths[h]) for h in headers))
+    print('  '.join('-' * widths[h] for h in headers))
+    for row in rows:
+        print('  '.join(str(row.get(h, '')).ljust(widths[h]) for h in headers))
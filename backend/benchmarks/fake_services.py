@@ -0,0 +1,269 @@
+"""In-process stand-ins for Ollama and Qdrant, for load tests.
+
+Both speak just enough of the real HTTP APIs for the app's clients:
+
+- ``FakeOllama``: ``/api/embed`` returns deterministic bag-of-words
+  vectors (texts sharing words get similar vectors), ``/api/chat`` waits
+  ``latency_ms`` plus ``tokens / token_rate`` seconds and reports token
+  counts and durations like Ollama does.
+- ``FakeQdrant``: REST ``points/query``, ``points/query/batch`` and
+  ``points`` (retrieve) over the Guardian incidents (repeated up to
+  ``docs`` points), exact cosine search with keyword filters.
+
+Run them on their own to point a manually started server at them::
+
+    python -m benchmarks.fake_services --ollama-port 11500 --qdrant-port 6400
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 QDRANT_HOST=127.0.0.1 QDRANT_PORT=6400 \\
+        QDRANT_PREFER_GRPC=False RAG_BACKEND=qdrant gunicorn guardian_project.wsgi:application
+"""
+import abc
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from chat.mock_data import GUARDIAN_INCIDENTS
+from chat.rag_service import EMBEDDING_DIM, content_hash
+
+WORD_RE = re.compile(r'\w+')
+LOREM = 'the guardian service should be restarted after the configuration is checked'.split()
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Normalised bag of hashed words, so related texts score higher."""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in WORD_RE.findall(text.lower()):
+        vector[zlib.crc32(word.encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real services
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _serve(self, request: dict):
+        try:
+            body = self.server.service.handle(self.command, self.path, request)
+        except Exception as e:
+            self._send_json({'error': repr(e)}, status=500)
+            return
+        if body is None:
+            self._send_json({'error': 'not found'}, status=404)
+        else:
+            self._send_json(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._serve(json.loads(self.rfile.read(length) or b'{}'))
+
+    do_PUT = do_POST
+
+    def do_GET(self):
+        self._serve({})
+
+
+class FakeService(abc.ABC):
+    """Base class: serves ``handle()`` on a background HTTP server thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method: str, path: str, request: dict):
+        with self._lock:
+            self.requests += 1
+        return self.route(method, path, request)
+
+    @abc.abstractmethod
+    def route(self, method: str, path: str, request: dict):
+        """Return the JSON body for one request, or ``None`` for a 404."""
+
+
+class FakeOllama(FakeService):
+    def __init__(self, latency_ms: float = 50, tokens: int = 200, token_rate: float = 50,
+                 embed_latency_ms: float = 5, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.embed_latency_ms = embed_latency_ms
+
+    def route(self, method, path, request):
+        if path == '/api/embed':
+            time.sleep(self.embed_latency_ms / 1000)
+            texts = request.get('input')
+            texts = [texts] if isinstance(texts, str) else texts
+            return {
+                'model': request.get('model'),
+                'embeddings': [fake_embedding(t).tolist() for t in texts],
+            }
+        if path == '/api/chat':
+            prompt = ' '.join(m.get('content', '') for m in request.get('messages', []))
+            prompt_tokens = len(prompt) // 4
+            eval_s = self.tokens / self.token_rate if self.token_rate else 0
+            time.sleep(self.latency_ms / 1000 + eval_s)
+            text = ' '.join(LOREM[i % len(LOREM)] for i in range(self.tokens))
+            return {
+                'model': request.get('model'),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'message': {'role': 'assistant', 'content': text},
+                'done': True,
+                'done_reason': 'stop',
+                'total_duration': int((self.latency_ms / 1000 + eval_s) * 1e9),
+                'load_duration': 0,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(self.latency_ms * 1e6),
+                'eval_count': self.tokens,
+                'eval_duration': int(eval_s * 1e9),
+            }
+        if path in ('/', '/api/tags'):
+            return {'models': []}
+        return None
+
+
+class FakeQdrant(FakeService):
+    def __init__(self, docs: int = len(GUARDIAN_INCIDENTS), latency_ms: float = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.payloads = {}
+        texts = []
+        for i in range(docs):
+            incident = GUARDIAN_INCIDENTS[i % len(GUARDIAN_INCIDENTS)]
+            self.payloads[i + 1] = {
+                'title': incident['title'],
+                'content': incident['content'],
+                'content_hash': content_hash(incident['content']),
+                **incident['metadata'],
+            }
+            texts.append(incident['content'])
+        self.ids = list(self.payloads)
+        self.vectors = np.stack([fake_embedding(t) for t in texts])
+
+    @staticmethod
+    def _ok(result):
+        return {'result': result, 'status': 'ok', 'time': 0.0}
+
+    def _payload(self, point_id, with_payload):
+        payload = self.payloads[point_id]
+        if with_payload is True:
+            return payload
+        if isinstance(with_payload, dict):
+            with_payload = with_payload.get('include') or []
+        if isinstance(with_payload, list):
+            return {k: v for k, v in payload.items() if k in with_payload}
+        return None
+
+    def _matches(self, payload, query_filter) -> bool:
+        for condition in (query_filter or {}).get('must') or []:
+            match = condition.get('match') or {}
+            value = payload.get(condition.get('key'))
+            if 'value' in match and value != match['value']:
+                return False
+            if 'any' in match and value not in match['any']:
+                return False
+        return True
+
+    def _query(self, request: dict) -> dict:
+        query = request['query']
+        if isinstance(query, dict):  # NearestQuery: {"nearest": [...]}
+            query = query['nearest']
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm else query)
+        query_filter = request.get('filter')
+        with_payload = request.get('with_payload', False)
+        with_vector = request.get('with_vector', request.get('with_vectors', False))
+        points = []
+        for row in np.argsort(-scores):
+            point_id = self.ids[row]
+            if not self._matches(self.payloads[point_id], query_filter):
+                continue
+            points.append({
+                'id': point_id,
+                'version': 0,
+                'score': float(scores[row]),
+                'payload': self._payload(point_id, with_payload),
+                'vector': self.vectors[row].tolist() if with_vector else None,
+            })
+            if len(points) >= request.get('limit', 10):
+                break
+        return {'points': points}
+
+    def route(self, method, path, request):
+        time.sleep(self.latency_ms / 1000)
+        parts = path.split('?')[0].strip('/').split('/')
+        if parts[:1] != ['collections'] or len(parts) < 3:
+            return self._ok({'collections': []}) if parts[:1] == ['collections'] else None
+        tail = parts[2:]
+        if tail == ['points', 'query']:
+            return self._ok(self._query(request))
+        if tail == ['points', 'query', 'batch']:
+            return self._ok([self._query(r) for r in request.get('searches', [])])
+        if tail == ['points'] and method == 'POST':
+            return self._ok([
+                {'id': point_id, 'payload': self._payload(point_id, request.get('with_payload', True)), 'vector': None}
+                for point_id in request.get('ids', []) if point_id in self.payloads
+            ])
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ollama-port', type=int, default=11500)
+    parser.add_argument('--qdrant-port', type=int, default=6400)
+    parser.add_argument('--llm-latency-ms', type=float, default=50)
+    parser.add_argument('--tokens', type=int, default=200, help='tokens per generated answer')
+    parser.add_argument('--token-rate', type=float, default=50, help='generated tokens per second')
+    parser.add_argument('--docs', type=int, default=len(GUARDIAN_INCIDENTS), help='points in the fake collection')
+    args = parser.parse_args()
+
+    ollama = FakeOllama(args.llm_latency_ms, args.tokens, args.token_rate, port=args.ollama_port).start()
+    qdrant = FakeQdrant(args.docs, port=args.qdrant_port).start()
+    print(f'Fake Ollama at {ollama.url}, fake Qdrant at {qdrant.url} (Ctrl-C to stop)')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ollama.stop()
+        qdrant.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,463 @@
+"""Dashboard analytics computed from live messages plus hourly rollups.
+
+Messages older than the retention period are archived and deleted
+(``manage.py archive_messages``) after being summarised into
+:class:`~chat.models.MessageRollup` rows.  Every statistic here is built
+from the same additive fields (counts, sums, minima, maxima), read from
+``ChatMessage`` for hours after the rollup watermark and from
+``MessageRollup`` before it, so the numbers do not change when raw rows
+are archived.
+
+Complete hours are rolled up as soon as analytics are requested
+(:func:`ensure_rolled_up`), so hour, day and week series cost one rollup
+row per hour and message type plus the rows of the current hour,
+whatever the number of messages.  Minute series are read from the
+``(message_type, timestamp)`` index and limited by ``ANALYTICS_MAX_BUCKETS``
+like every other range.  Rollups keep counting archived messages, but
+messages deleted by users (cleared or deleted sessions) are taken out of
+them (:func:`delete_messages`), so totals match the live sessions; rating
+changes are applied to them too (:func:`apply_rating_change`).
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Trunc, TruncHour
+from django.utils import timezone
+
+from .models import ChatMessage, ChatSession, MessageRollup
+
+GRANULARITIES = ('minute', 'hour', 'day', 'week')
+DEFAULT_DAYS = 30
+# Messages created less than this long ago may still be committing, so the
+# hour they belong to is not rolled up yet
+ROLLUP_DELAY = timedelta(minutes=1)
+
+# Score and latency distribution buckets: name -> (lower bound, upper bound)
+SCORE_BUCKETS = {
+    'excellent': (0.7, None),
+    'good': (0.5, 0.7),
+    'fair': (0.3, 0.5),
+    'poor': (None, 0.3),
+}
+LATENCY_BUCKETS = {
+    'fast': (None, 5000),         # < 5s
+    'normal': (5000, 30000),      # 5-30s
+    'slow': (30000, 60000),       # 30-60s
+    'very_slow': (60000, None),   # > 60s
+}
+# Generations whose model load took at least this long count as cold loads
+COLD_LOAD_MS = 1000
+
+
+def _range_q(field: str, bounds: tuple) -> Q:
+    low, high = bounds
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def _message_aggregates() -> dict:
+    """Aggregates over ChatMessage rows, named like the MessageRollup fields."""
+    aggregates = {
+        'count': Count('id'),
+        'rated_count': Count('id', filter=Q(rating__isnull=False)),
+        'rating_sum': Sum('rating'),
+        'rag_latency_sum': Sum('rag_latency_ms'),
+        'llm_latency_sum': Sum('llm_latency_ms'),
+        'total_latency_sum': Sum('total_latency_ms'),
+        'top_rag_score_sum': Sum('top_rag_score'),
+        'effective_k_sum': Sum('effective_k'),
+        'rag_latency_max': Max('rag_latency_ms'),
+        'rag_latency_min': Min('rag_latency_ms'),
+        'llm_latency_max': Max('llm_latency_ms'),
+        'llm_latency_min': Min('llm_latency_ms'),
+        'top_rag_score_max': Max('top_rag_score'),
+        'top_rag_score_min': Min('top_rag_score'),
+        'llm_stats_count': Count('id', filter=Q(completion_tokens__isnull=False)),
+        'prompt_tokens_sum': Sum('prompt_tokens'),
+        'completion_tokens_sum': Sum('completion_tokens'),
+        'prompt_eval_ms_sum': Sum('prompt_eval_ms'),
+        'eval_ms_sum': Sum('eval_ms'),
+        'load_ms_sum': Sum('load_ms'),
+        'load_ms_max': Max('load_ms'),
+        'cold_load_count': Count('id', filter=Q(load_ms__gte=COLD_LOAD_MS)),
+    }
+    for stars in range(1, 6):
+        aggregates[f'rating_{stars}'] = Count('id', filter=Q(rating=stars))
+    for name, bounds in SCORE_BUCKETS.items():
+        aggregates[f'score_{name}'] = Count('id', filter=_range_q('top_rag_score', bounds))
+    for name, bounds in LATENCY_BUCKETS.items():
+        aggregates[f'latency_{name}'] = Count('id', filter=_range_q('total_latency_ms', bounds))
+    return aggregates
+
+
+def _rollup_aggregates(names) -> dict:
+    """Re-aggregate rollup rows: sums add up, extremes take the extreme."""
+    aggregates = {}
+    for name in names:
+        if name.endswith('_max'):
+            aggregates[name] = Max(name)
+        elif name.endswith('_min'):
+            aggregates[name] = Min(name)
+        else:
+            aggregates[name] = Sum(name)
+    return aggregates
+
+
+def merge(a: dict, b: dict) -> dict:
+    """Combine two aggregate dicts with the same keys (None = no rows)."""
+    merged = {}
+    for name in a.keys() | b.keys():
+        x, y = a.get(name), b.get(name)
+        if x is None or y is None:
+            merged[name] = y if x is None else x
+        elif name.endswith('_max'):
+            merged[name] = max(x, y)
+        elif name.endswith('_min'):
+            merged[name] = min(x, y)
+        else:
+            merged[name] = x + y
+    return merged
+
+
+# ---------- Rollups ----------
+
+def rollup_watermark():
+    """Start of the first hour not covered by rollups (None if there are none)."""
+    last = MessageRollup.objects.aggregate(last=Max('bucket'))['last']
+    return last + timedelta(hours=1) if last else None
+
+
+def roll_up(until) -> int:
+    """Summarise messages from the watermark up to ``until`` into hourly rollups.
+
+    ``until`` is truncated to the hour.  Hours that are already rolled up
+    are never recomputed (their raw rows may be partly archived), so this
+    is safe to re-run, also concurrently.  Returns the number of rollup
+    rows written.
+    """
+    until = until.replace(minute=0, second=0, microsecond=0)
+    messages = ChatMessage.objects.filter(timestamp__lt=until)
+    watermark = rollup_watermark()
+    if watermark is not None:
+        messages = messages.filter(timestamp__gte=watermark)
+    groups = (
+        messages
+        .annotate(bucket=TruncHour('timestamp'))
+        .values('bucket', 'message_type')
+        .annotate(**_message_aggregates())
+        .order_by()
+    )
+    rollups = [MessageRollup(**{k: v for k, v in group.items() if v is not None}) for group in groups.iterator()]
+    with transaction.atomic():
+        MessageRollup.objects.bulk_create(rollups, batch_size=1000, ignore_conflicts=True)
+    return len(rollups)
+
+
+def ensure_rolled_up() -> int:
+    """Roll up every complete hour (cheap when already up to date)."""
+    until = timezone.now() - ROLLUP_DELAY
+    watermark = rollup_watermark()
+    if watermark is not None and watermark > until - timedelta(hours=1):
+        return 0
+    return roll_up(until)
+
+
+def delete_messages(messages) -> int:
+    """Delete the ``messages`` queryset and take them out of the rollups.
+
+    Every rolled-up hour the messages fell in is recomputed from the rows
+    that remain.  Such an hour still has all its raw rows: archiving
+    removes whole months, and rows that are gone cannot be deleted again.
+    Returns the number of messages deleted.
+    """
+    with transaction.atomic():
+        hours = set(
+            messages.annotate(bucket=TruncHour('timestamp'))
+            .values_list('bucket', 'message_type')
+            .distinct()
+            .order_by()
+        )
+        deleted = messages.delete()[0]
+        for bucket, message_type in hours:
+            _recompute_rollup(bucket, message_type)
+    return deleted
+
+
+def _recompute_rollup(bucket, message_type):
+    rollup = MessageRollup.objects.filter(bucket=bucket, message_type=message_type)
+    if not rollup.exists():
+        return
+    values = ChatMessage.objects.filter(
+        timestamp__gte=bucket, timestamp__lt=bucket + timedelta(hours=1), message_type=message_type,
+    ).aggregate(**_message_aggregates())
+    if not values['count']:
+        rollup.delete()
+        return
+    # Sums over no rows are None; extremes stay None (nullable)
+    rollup.update(**{
+        name: value if value is not None or name.endswith(('_min', '_max')) else 0
+        for name, value in values.items()
+    })
+
+
+def apply_rating_change(message, old_rating):
+    """Keep an already rolled-up hour in step with a changed message rating.
+
+    Call in the transaction that changed the rating, with the message row
+    locked (``select_for_update``) since ``old_rating`` was read.
+    """
+    if old_rating == message.rating:
+        return
+    changes = {}
+    if old_rating is not None:
+        changes[f'rating_{old_rating}'] = F(f'rating_{old_rating}') - 1
+    if message.rating is not None:
+        changes[f'rating_{message.rating}'] = F(f'rating_{message.rating}') + 1
+    changes['rating_sum'] = F('rating_sum') + (message.rating or 0) - (old_rating or 0)
+    changes['rated_count'] = F('rated_count') + int(message.rating is not None) - int(old_rating is not None)
+    bucket = message.timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    MessageRollup.objects.filter(bucket=bucket, message_type=message.message_type).update(**changes)
+
+
+# ---------- Queries over live rows + rollups ----------
+
+def _split(start=None, end=None, granularity='hour'):
+    """Return (live messages, rollups) covering ``[start, end)``, without overlap.
+
+    Minute buckets only exist in the raw rows, so no rollups are used.
+    """
+    messages = ChatMessage.objects.all()
+    rollups = MessageRollup.objects.none()
+    watermark = rollup_watermark() if granularity != 'minute' else None
+    if watermark is not None:
+        messages = messages.filter(timestamp__gte=watermark)
+        rollups = MessageRollup.objects.filter(bucket__lt=watermark)
+    if start is not None:
+        messages = messages.filter(timestamp__gte=start)
+        rollups = rollups.filter(bucket__gte=start)
+    if end is not None:
+        messages = messages.filter(timestamp__lt=end)
+        rollups = rollups.filter(bucket__lt=end)
+    return messages, rollups
+
+
+def totals_by_type(start=None, end=None) -> dict:
+    """``{message_type: aggregates}`` over ``[start, end)`` (default: all stored history)."""
+    aggregates = _message_aggregates()
+    messages, rollups = _split(start, end)
+    totals = {}
+    for row in messages.values('message_type').annotate(**aggregates).order_by():
+        totals[row.pop('message_type')] = row
+    for row in rollups.values('message_type').annotate(**_rollup_aggregates(aggregates)).order_by():
+        message_type = row.pop('message_type')
+        totals[message_type] = merge(totals.get(message_type, {}), row)
+    return totals
+
+
+def series_by_type(start, end, granularity: str) -> dict:
+    """``{bucket start: {message_type: aggregates}}`` for ``[start, end)``."""
+    aggregates = _message_aggregates()
+    messages, rollups = _split(start, end, granularity)
+    buckets = {}
+    live = (
+        messages.annotate(bucket_start=Trunc('timestamp', granularity))
+        .values('bucket_start', 'message_type')
+        .annotate(**aggregates)
+    )
+    rolled = (
+        rollups.annotate(bucket_start=Trunc('bucket', granularity))
+        .values('bucket_start', 'message_type')
+        .annotate(**_rollup_aggregates(aggregates))
+    )
+    for row in list(live.order_by()) + list(rolled.order_by()):
+        bucket, message_type = row.pop('bucket_start'), row.pop('message_type')
+        by_type = buckets.setdefault(bucket, {})
+        by_type[message_type] = merge(by_type.get(message_type, {}), row)
+    return dict(sorted(buckets.items()))
+
+
+def resolve_range(start=None, end=None, granularity='day'):
+    """Fill in the default range (the last 30 days) and align it to the hour.
+
+    Rollups are hourly, so hour, day and week ranges start and end on the
+    hour; minute ranges on the minute.
+    """
+    end = end or timezone.now()
+    start = start or end - timedelta(days=DEFAULT_DAYS)
+    unit = timedelta(minutes=1) if granularity == 'minute' else timedelta(hours=1)
+    zero = {'second': 0, 'microsecond': 0} if granularity == 'minute' else {'minute': 0, 'second': 0, 'microsecond': 0}
+    start = start.astimezone(dt_timezone.utc).replace(**zero)
+    aligned_end = end.astimezone(dt_timezone.utc).replace(**zero)
+    if aligned_end < end:
+        aligned_end += unit
+    return start, aligned_end
+
+
+def count_buckets(start, end, granularity: str) -> int:
+    unit = {
+        'minute': timedelta(minutes=1),
+        'hour': timedelta(hours=1),
+        'day': timedelta(days=1),
+        'week': timedelta(weeks=1),
+    }[granularity]
+    return -(-(end - start) // unit)
+
+
+def _bucket_label(bucket, granularity: str):
+    if bucket is None:
+        return None
+    if granularity in ('day', 'week'):
+        return bucket.date().isoformat()
+    return bucket.isoformat()
+
+
+def _avg(total, count):
+    return total / count if count else None
+
+
+def _per_second(tokens, ms):
+    """Token throughput from summed tokens and milliseconds (0 without data)."""
+    return round(tokens * 1000 / ms, 2) if tokens and ms else 0
+
+
+def usage_stats(start=None, end=None, granularity: str = 'day') -> dict:
+    """Usage analytics: totals, messages and sessions per bucket, rating distribution.
+
+    Without ``start`` / ``end`` the series cover the last 30 days and the
+    summary all stored history; with them, both cover ``[start, end)``.
+    """
+    ensure_rolled_up()
+    ranged = start is not None or end is not None
+    start, end = resolve_range(start, end, granularity)
+
+    totals = totals_by_type(start, end) if ranged else totals_by_type()
+    user = totals.get('user', {})
+    bot = totals.get('bot', {})
+    total_user_messages = user.get('count') or 0
+    total_bot_messages = bot.get('count') or 0
+    total_messages = total_user_messages + total_bot_messages
+    sessions = ChatSession.objects.all()
+    if ranged:
+        sessions = sessions.filter(created_at__gte=start, created_at__lt=end)
+    total_sessions = sessions.count()
+    avg_rating = _avg(bot.get('rating_sum') or 0, bot.get('rated_count') or 0)
+
+    sessions_by_bucket = (
+        ChatSession.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .annotate(bucket_start=Trunc('created_at', granularity))
+        .values('bucket_start')
+        .annotate(count=Count('id'))
+        .order_by('bucket_start')
+    )
+
+    messages_over_time = []
+    for bucket, by_type in series_by_type(start, end, granularity).items():
+        user_count = by_type.get('user', {}).get('count') or 0
+        bot_count = by_type.get('bot', {}).get('count') or 0
+        messages_over_time.append({
+            'date': _bucket_label(bucket, granularity),
+            'user_count': user_count,
+            'bot_count': bot_count,
+            'total': user_count + bot_count,
+        })
+
+    return {
+        'range': {'start': start.isoformat(), 'end': end.isoformat(), 'granularity': granularity},
+        'summary': {
+            'total_sessions': total_sessions,
+            'total_messages': total_messages,
+            'total_user_messages': total_user_messages,
+            'total_bot_messages': total_bot_messages,
+            'avg_messages_per_session': round(total_messages / total_sessions, 2) if total_sessions > 0 else 0,
+            'avg_rating': round(avg_rating, 2) if avg_rating else None,
+            'total_rated': bot.get('rated_count') or 0,
+        },
+        'messages_over_time': messages_over_time,
+        'sessions_over_time': [
+            {
+                'date': _bucket_label(item['bucket_start'], granularity),
+                'count': item['count'],
+            }
+            for item in sessions_by_bucket
+        ],
+        'rating_distribution': {
+            '5_stars': bot.get('rating_5') or 0,
+            '4_stars': bot.get('rating_4') or 0,
+            '3_stars': bot.get('rating_3') or 0,
+            '2_stars': bot.get('rating_2') or 0,
+            '1_star': bot.get('rating_1') or 0,
+            'no_rating': total_bot_messages - (bot.get('rated_count') or 0),
+        },
+    }
+
+
+def rag_stats(start=None, end=None, granularity: str = 'day') -> dict:
+    """RAG performance analytics over bot messages: latencies, scores, distributions.
+
+    The same range rules as :func:`usage_stats` apply.
+    """
+    ensure_rolled_up()
+    ranged = start is not None or end is not None
+    start, end = resolve_range(start, end, granularity)
+    bot = (totals_by_type(start, end) if ranged else totals_by_type()).get('bot', {})
+    count = bot.get('count') or 0
+
+    def avg(name, digits, over='count'):
+        return round(_avg(bot.get(name) or 0, bot.get(over) or 0) or 0, digits)
+
+    latency_over_time = []
+    for bucket, by_type in series_by_type(start, end, granularity).items():
+        day = by_type.get('bot')
+        if not day:
+            continue
+        n = day['count']
+        latency_over_time.append({
+            'date': _bucket_label(bucket, granularity),
+            'avg_rag_ms': round((day.get('rag_latency_sum') or 0) / n, 2),
+            'avg_llm_ms': round((day.get('llm_latency_sum') or 0) / n, 2),
+            'avg_total_ms': round((day.get('total_latency_sum') or 0) / n, 2),
+            'avg_score': round((day.get('top_rag_score_sum') or 0) / n, 4),
+            'tokens_per_second': _per_second(day.get('completion_tokens_sum'), day.get('eval_ms_sum')),
+            'count': n,
+        })
+
+    return {
+        'range': {'start': start.isoformat(), 'end': end.isoformat(), 'granularity': granularity},
+        'summary': {
+            'total_responses': count,
+            'avg_rag_latency_ms': avg('rag_latency_sum', 2),
+            'avg_llm_latency_ms': avg('llm_latency_sum', 2),
+            'avg_total_latency_ms': avg('total_latency_sum', 2),
+            'avg_rag_score': avg('top_rag_score_sum', 4),
+            'avg_effective_k': avg('effective_k_sum', 2),
+            'max_rag_latency_ms': bot.get('rag_latency_max') or 0,
+            'max_llm_latency_ms': bot.get('llm_latency_max') or 0,
+            'min_rag_latency_ms': bot.get('rag_latency_min') or 0,
+            'min_llm_latency_ms': bot.get('llm_latency_min') or 0,
+            'max_rag_score': round(bot.get('top_rag_score_max') or 0, 4),
+            'min_rag_score': round(bot.get('top_rag_score_min') or 0, 4),
+        },
+        # Averages over answers Ollama generated (not fallbacks); throughput
+        # is total tokens over total evaluation time
+        'llm_summary': {
+            'generated_responses': bot.get('llm_stats_count') or 0,
+            'avg_prompt_tokens': avg('prompt_tokens_sum', 1, over='llm_stats_count'),
+            'avg_completion_tokens': avg('completion_tokens_sum', 1, over='llm_stats_count'),
+            'prompt_tokens_per_second': _per_second(bot.get('prompt_tokens_sum'), bot.get('prompt_eval_ms_sum')),
+            'tokens_per_second': _per_second(bot.get('completion_tokens_sum'), bot.get('eval_ms_sum')),
+            'avg_prompt_eval_ms': avg('prompt_eval_ms_sum', 2, over='llm_stats_count'),
+            'avg_eval_ms': avg('eval_ms_sum', 2, over='llm_stats_count'),
+            'avg_load_ms': avg('load_ms_sum', 2, over='llm_stats_count'),
+            'max_load_ms': bot.get('load_ms_max') or 0,
+            'cold_loads': bot.get('cold_load_count') or 0,
+        },
+        'latency_over_time': latency_over_time,
+        'score_distribution': {name: bot.get(f'score_{name}') or 0 for name in SCORE_BUCKETS},
+        'latency_distribution': {name: bot.get(f'latency_{name}') or 0 for name in LATENCY_BUCKETS},
+    }
@@ -0,0 +1,113 @@
+"""Shared response cache for the analytics payloads.
+
+Payloads are stored in Django's cache (shared between workers when
+``REDIS_URL`` is set) under keys that include a version read from the
+database (see ``conditional.analytics_version``, also behind the ETag).
+Every write that changes the numbers changes the version, so no worker
+serves a stale payload, whether or not the cache is shared; ``ANALYTICS_CACHE_TTL``
+bounds how long an unchanged payload lives.
+
+Concurrent misses for the same key are computed once: within a process
+the other threads wait for the leader, and across processes a short lock
+in the cache makes other workers poll for the leader's result instead of
+recomputing it.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_S = 0.05
+
+_lock = threading.Lock()
+_inflight = {}
+_counters = {'hits': 0, 'coalesced': 0, 'misses': 0}
+_RESULTS = {'hits': 'hit', 'coalesced': 'coalesced', 'misses': 'miss'}
+
+
+def _count(name: str):
+    with _lock:
+        _counters[name] += 1
+    metrics.ANALYTICS_CACHE.labels(_RESULTS[name]).inc()
+
+
+def _wait_for(key: str, timeout_s: float):
+    """Poll the cache for another worker's result, up to ``timeout_s``."""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_S)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def get_or_compute(name: str, version: str, compute):
+    """Return the cached payload for ``name``, computing it once on a miss.
+
+    ``name`` must identify every parameter ``compute`` depends on, and
+    ``version`` the state of the data it reads.
+    """
+    ttl = settings.ANALYTICS_CACHE_TTL
+    if ttl <= 0:
+        return compute()
+
+    key = f'analytics:{name}:{version}'
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    with _lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+    timeout_s = settings.ANALYTICS_CACHE_LOCK_TIMEOUT
+
+    if not leader:
+        event.wait(timeout_s)
+        value = cache.get(key)
+        if value is not None:
+            _count('coalesced')
+            return value
+        _count('misses')
+        return compute()
+
+    lock_key = f'{key}:lock'
+    locked = False
+    try:
+        locked = cache.add(lock_key, 1, timeout=timeout_s)
+        if not locked:
+            value = _wait_for(key, timeout_s)
+            if value is not None:
+                _count('coalesced')
+                return value
+        _count('misses')
+        t0 = time.perf_counter()
+        value = compute()
+        cache.set(key, value, timeout=ttl)
+        logger.debug('Computed analytics %s in %.1f ms', name, (time.perf_counter() - t0) * 1000)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+        with _lock:
+            del _inflight[key]
+        event.set()
+
+
+def cache_stats() -> dict:
+    """Hits, coalesced waits and recomputes for this process."""
+    with _lock:
+        stats = dict(_counters)
+    served = stats['hits'] + stats['coalesced']
+    total = served + stats['misses']
+    stats['hit_rate'] = round(served / total, 4) if total else 0.0
+    return stats
@@ -0,0 +1,192 @@
+"""Retention: archive old chat messages to compressed files, then delete them.
+
+Messages are archived a whole (UTC) month at a time.  Before anything is
+deleted, the months are summarised into hourly rollups (see
+``chat/analytics.py``) so the dashboard keeps its history.  Rows are
+streamed from a server-side cursor into the archive file, so a month is
+never held in memory.
+
+Every run writes its own files (named after the month and the run's start
+time) and only deletes rows whose ids it reads back from its completed
+archive, so a run that crashes mid-delete loses nothing: the rerun
+archives the rows that are left into a new file.  A month can therefore
+have several archive files, which may overlap; dedupe on ``id``.
+"""
+import gzip
+import json
+import os
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import analytics, partitions
+from .models import ChatMessage
+
+FORMATS = ('jsonl.gz', 'parquet')
+FIELDS = [field.attname for field in ChatMessage._meta.concrete_fields]
+JSON_FIELDS = {'sources', 'rag_timings', 'dropped_candidates'}
+
+
+def archive_cutoff(retention_days: int):
+    """Start of the month containing ``now - retention_days``.
+
+    Everything before it is archived, so at least ``retention_days`` of
+    history always stays in the database.
+    """
+    return partitions.month_start(timezone.now() - timedelta(days=retention_days))
+
+
+def pending_months(cutoff) -> list:
+    """Month starts before ``cutoff`` that still have messages."""
+    return list(
+        ChatMessage.objects
+        .filter(timestamp__lt=cutoff)
+        .datetimes('timestamp', 'month', tzinfo=dt_timezone.utc)
+    )
+
+
+def month_rows(month, chunk_size: int):
+    """Stream one month's messages as dicts, oldest first."""
+    end = partitions.add_months(month, 1)
+    return (
+        ChatMessage.objects
+        .filter(timestamp__gte=month, timestamp__lt=end)
+        .order_by('timestamp')
+        .values(*FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _write_jsonl_gz(path: str, rows) -> int:
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            count += 1
+    return count
+
+
+def _write_parquet(path: str, rows, chunk_size: int) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def to_table(batch):
+        for row in batch:
+            row['id'] = str(row['id'])
+            row['session_id'] = str(row['session_id'])
+            for name in JSON_FIELDS:
+                row[name] = json.dumps(row[name])
+        return pa.Table.from_pylist(batch)
+
+    count = 0
+    writer = None
+    batch = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                table = to_table(batch)
+                writer = writer or pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table)
+                count += len(batch)
+                batch = []
+        if batch or writer is None:
+            table = to_table(batch)
+            writer = writer or pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def archive_path(output_dir: str, month, fmt: str, run=None) -> str:
+    """``chat_messages_YYYY_MM.<run start, UTC>.<fmt>``, unique per run."""
+    run = run or timezone.now()
+    return os.path.join(output_dir, f'chat_messages_{month:%Y_%m}.{run:%Y%m%dT%H%M%SZ}.{fmt}')
+
+
+def export_month(month, output_dir: str, fmt: str, chunk_size: int = 2000, run=None) -> tuple[str, int]:
+    """Write one month's messages to ``output_dir``; returns (path, row count).
+
+    The file is written under a temporary name and renamed when complete,
+    so a crash never leaves a truncated archive that looks finished.  An
+    existing archive is never replaced (``FileExistsError``).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown archive format "{fmt}", expected one of {", ".join(FORMATS)}')
+    os.makedirs(output_dir, exist_ok=True)
+    path = archive_path(output_dir, month, fmt, run)
+    if os.path.exists(path):
+        raise FileExistsError(f'{path} already exists')
+    tmp_path = path + '.tmp'
+    rows = month_rows(month, chunk_size)
+    if fmt == 'parquet':
+        count = _write_parquet(tmp_path, rows, chunk_size)
+    else:
+        count = _write_jsonl_gz(tmp_path, rows)
+    # A hard link fails if the name was taken meanwhile, where a rename would clobber it
+    os.link(tmp_path, path)
+    os.remove(tmp_path)
+    return path, count
+
+
+def archived_ids(path: str, fmt: str, batch_size: int = 5000):
+    """Yield the message ids stored in an archive file, ``batch_size`` at a time."""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=['id']):
+            yield batch.column('id').to_pylist()
+        return
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            batch.append(json.loads(line)['id'])
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def delete_month(month, path: str, fmt: str, archived: int, batch_size: int = 5000) -> int:
+    """Remove the messages of ``month`` that are in the archive at ``path``.
+
+    ``archived`` is the archive's row count.  If the month's partition holds
+    exactly that many rows, the partition is dropped; otherwise the ids are
+    read back from the archive and deleted in batches, so rows written
+    after the export stay for the next run.  Returns the rows removed.
+    """
+    messages = ChatMessage.objects.filter(timestamp__gte=month, timestamp__lt=partitions.add_months(month, 1))
+    if (
+        partitions.is_partitioned()
+        and partitions.partition_name(month) in partitions.existing_partitions()
+        # Rows of this month can only be in its own partition
+        and messages.count() == archived
+    ):
+        partitions.drop_partition(month)
+        return archived
+    deleted = 0
+    for ids in archived_ids(path, fmt, batch_size):
+        deleted += messages.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def archive_messages(retention_days: int, output_dir: str, fmt: str, chunk_size: int = 2000):
+    """Roll up, export and delete every month older than the retention period.
+
+    Yields ``(month, path, count)`` per archived month.  A month's rows are
+    only deleted after its archive file is complete, and only those in it.
+    """
+    cutoff = archive_cutoff(retention_days)
+    months = pending_months(cutoff)
+    if not months:
+        return
+    analytics.roll_up(cutoff)
+    run = timezone.now()
+    for month in months:
+        path, count = export_month(month, output_dir, fmt, chunk_size, run=run)
+        delete_month(month, path, fmt, count)
+        yield month, path, count
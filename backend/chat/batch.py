@@ -0,0 +1,72 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .llm_service import generate_response
+from .rag_service import retrieve_context_batch
+
+logger = logging.getLogger(__name__)
+
+
+def _answer(index: int, question: str, docs: list[dict], rag_timings: dict, rag_ms: int) -> dict:
+    t_llm = time.perf_counter()
+    answer, llm_stats = generate_response(question, docs)
+    llm_ms = int((time.perf_counter() - t_llm) * 1000)
+    return {
+        'index': index,
+        'question': question,
+        'answer': answer,
+        'sources': [{'title': d.get('title', ''), 'score': round(d.get('score', 0), 3)} for d in docs],
+        'top_rag_score': round(max((d.get('score', 0) for d in docs), default=0.0), 4),
+        'effective_k': len(docs),
+        'timings': {
+            'rag_ms': rag_ms,
+            'rag': rag_timings,
+            'llm_ms': llm_ms,
+            'total_ms': rag_ms + llm_ms,
+        },
+        'llm': llm_stats,
+    }
+
+
+def answer_batch(questions: list[str], filters: dict | None = None, concurrency: int | None = None):
+    """Answer many questions, yielding one result dict per question as it completes.
+
+    Retrieval for the whole batch runs up front (one embedding call, one
+    batched vector search); LLM generation then runs on at most
+    ``concurrency`` threads (``BATCH_LLM_CONCURRENCY`` by default).  Results
+    arrive in completion order and carry their ``index`` in ``questions``.
+    A final ``{'done': True, ...}`` dict summarises the batch.  Nothing is
+    saved to the database.
+    """
+    start = time.perf_counter()
+    concurrency = concurrency or settings.BATCH_LLM_CONCURRENCY
+
+    t_rag = time.perf_counter()
+    try:
+        contexts = retrieve_context_batch(questions, filters=filters)
+    except Exception as e:
+        logger.error('Batch RAG search failed: %s', e)
+        contexts = [([], {}, []) for _ in questions]
+    rag_ms = int((time.perf_counter() - t_rag) * 1000)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch-llm')
+    try:
+        futures = [
+            executor.submit(_answer, i, question, docs, rag_timings, rag_ms)
+            for i, (question, (docs, rag_timings, _)) in enumerate(zip(questions, contexts))
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Stop queued generations if the consumer goes away mid-stream
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {
+        'done': True,
+        'count': len(questions),
+        'rag_ms': rag_ms,
+        'total_ms': int((time.perf_counter() - start) * 1000),
+    }
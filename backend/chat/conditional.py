@@ -0,0 +1,117 @@
+"""Conditional GET (ETag / Last-Modified) for the session and analytics views.
+
+Validators are computed from a handful of indexed aggregates, never from
+the response body, so a matching ``If-None-Match`` is answered with
+``304 Not Modified`` before the view (and its serializer) runs.  They rely
+on every write touching ``ChatSession.updated_at``: new messages, ratings
+and clearing a session all do (see ``touch_session``).  Archiving old
+messages advances the rollup watermark, which is part of the list and
+analytics validators.
+
+Responses are marked ``Cache-Control: private, no-cache`` so browsers keep
+them but revalidate on every use.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .analytics import rollup_watermark
+from .models import ChatMessage, ChatSession
+
+
+def touch_session(session_id):
+    """Mark a session as changed (new messages, ratings, cleared history)."""
+    ChatSession.objects.filter(id=session_id).update(updated_at=timezone.now())
+
+
+def _etag(*parts) -> str:
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def _session_state(request, session_id):
+    """(updated_at, message count, last message time) of a session, or None.
+
+    Cached on the request, which asks for both its ETag and Last-Modified.
+    """
+    if not hasattr(request, '_chat_session_state'):
+        request._chat_session_state = _query_session_state(session_id)
+    return request._chat_session_state
+
+
+def _query_session_state(session_id):
+    session = ChatSession.objects.filter(id=session_id).values('updated_at').first()
+    if session is None:
+        return None
+    messages = ChatMessage.objects.filter(session_id=session_id).aggregate(count=Count('id'), last=Max('timestamp'))
+    return session['updated_at'], messages['count'], messages['last']
+
+
+def session_detail_etag(request, session_id):
+    state = _session_state(request, session_id)
+    return _etag('session', session_id, state) if state else None
+
+
+def session_detail_last_modified(request, session_id):
+    state = _session_state(request, session_id)
+    if state is None:
+        return None
+    updated_at, _, last = state
+    return max(updated_at, last) if last else updated_at
+
+
+def session_list_etag(request):
+    sessions = ChatSession.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return _etag('sessions', sessions['count'], sessions['updated'], rollup_watermark())
+
+
+def analytics_version(request) -> str:
+    """Hash of everything the analytics payloads depend on.
+
+    Part of the analytics ETag and of the analytics cache keys, so every
+    worker sees a write as soon as it is committed.  Cached on the request.
+    """
+    request = getattr(request, '_request', request)  # DRF wraps the HttpRequest
+    if not hasattr(request, '_analytics_version'):
+        # Ranges ending now move with the clock: the version changes with
+        # each new bucket (an hour, or a minute for minute series)
+        now = timezone.now().replace(second=0, microsecond=0)
+        if request.GET.get('granularity') != 'minute':
+            now = now.replace(minute=0)
+        sessions = ChatSession.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        request._analytics_version = _etag(
+            'analytics', now, sessions['count'], sessions['updated'], rollup_watermark(),
+        )
+    return request._analytics_version
+
+
+def analytics_etag(request):
+    return _etag('analytics', request.get_full_path(), analytics_version(request))
+
+
+def conditional(etag_func, last_modified_func=None):
+    """``condition()`` for GET/HEAD only, plus revalidate-always caching.
+
+    Validators are skipped for other methods so writes don't pay for them.
+    """
+    def for_safe_methods(func):
+        if func is None:
+            return None
+
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return None
+            return func(request, *args, **kwargs)
+        return wrapper
+
+    def decorator(view):
+        view = condition(
+            etag_func=for_safe_methods(etag_func),
+            last_modified_func=for_safe_methods(last_modified_func),
+        )(view)
+        return cache_control(private=True, no_cache=True)(view)
+    return decorator
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def _relevance(docs: list[dict]) -> np.ndarray:
+    reranked = sum('rerank_score' in d for d in docs)
+    if reranked == len(docs):
+        return np.array([d['rerank_score'] for d in docs], dtype=np.float32)
+    if reranked == 0:
+        return np.array([d['score'] for d in docs], dtype=np.float32)
+    return 1 - np.arange(len(docs), dtype=np.float32) / len(docs)
+
+
+def mmr_select(
+    docs: list[dict],
+    vectors: list[list[float]],
+    top_k: int,
+    lambda_mult: float = 0.7,
+    dedup_threshold: float = 1.0,
+) -> tuple[list[dict], list[dict]]:
+    """Pick ``top_k`` docs by Maximal Marginal Relevance.
+
+    Each step takes the candidate maximising
+    ``lambda * relevance - (1 - lambda) * max_similarity_to_selected``,
+    where relevance is ``rerank_score`` when every doc has one and the
+    vector ``score`` when none has.  When reranking stopped at its budget,
+    only a head of ``docs`` is scored and the two scales don't compare, so
+    relevance is taken from the order of ``docs`` instead (evenly spaced
+    from 1 down).  ``lambda_mult=1`` keeps the relevance order.
+
+    Candidates whose cosine similarity to an already selected doc reaches
+    ``dedup_threshold`` are collapsed into it (dropped, and counted in the
+    kept doc's ``duplicates``) whatever lambda is; a threshold of 1 or more
+    disables collapsing.  ``vectors`` are the candidates' stored vectors,
+    in ``docs`` order.  Returns ``(selected, collapsed)``.
+    """
+    if not docs:
+        return [], []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    similarity = matrix @ matrix.T
+    relevance = _relevance(docs)
+
+    selected = []
+    collapsed = []
+    candidates = np.arange(len(docs))
+    # Highest similarity of each candidate to anything selected so far
+    redundancy = np.full(len(docs), -np.inf, dtype=np.float32)
+    while len(candidates) and len(selected) < top_k:
+        if selected:
+            redundancy = np.maximum(redundancy, similarity[selected[-1]])
+            if dedup_threshold < 1:
+                duplicate = redundancy[candidates] >= dedup_threshold
+            else:
+                duplicate = np.zeros(len(candidates), dtype=bool)
+            for row in candidates[duplicate]:
+                owner = selected[int(np.argmax(similarity[row, selected]))]
+                docs[owner]['duplicates'] = docs[owner].get('duplicates', 0) + 1
+                collapsed.append(docs[row])
+            candidates = candidates[~duplicate]
+            if not len(candidates):
+                break
+            penalty = redundancy[candidates]
+        else:
+            penalty = 0.0
+        marginal = lambda_mult * relevance[candidates] - (1 - lambda_mult) * penalty
+        best = int(np.argmax(marginal))
+        selected.append(int(candidates[best]))
+        candidates = np.delete(candidates, best)
+    return [docs[row] for row in selected], collapsed
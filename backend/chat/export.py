@@ -0,0 +1,89 @@
+"""Streaming export of chat messages as CSV or NDJSON, optionally gzipped.
+
+Rows come from a server-side cursor (``iterator(chunk_size=...)``) and are
+encoded and compressed as they are read, so memory stays constant however
+many messages are exported.  Used by ``GET /api/messages/export/`` and
+``manage.py export_messages``.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ChatMessage
+
+FORMATS = ('csv', 'ndjson')
+FIELDS = [
+    'id', 'session_id', 'message_type', 'timestamp', 'text', 'rating',
+    'rag_latency_ms', 'llm_latency_ms', 'total_latency_ms', 'top_rag_score',
+    'effective_k', 'prompt_tokens', 'completion_tokens', 'prompt_eval_ms',
+    'eval_ms', 'load_ms', 'sources', 'rag_timings', 'dropped_candidates',
+]
+JSON_FIELDS = {'sources', 'rag_timings', 'dropped_candidates'}
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def export_rows(start=None, end=None, message_type=None, chunk_size: int = 2000):
+    """Stream messages as dicts, oldest first, filtered by time range and type."""
+    messages = ChatMessage.objects.all()
+    if start is not None:
+        messages = messages.filter(timestamp__gte=start)
+    if end is not None:
+        messages = messages.filter(timestamp__lt=end)
+    if message_type:
+        messages = messages.filter(message_type=message_type)
+    return messages.order_by('timestamp').values(*FIELDS).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[name], cls=DjangoJSONEncoder) if name in JSON_FIELDS
+            else row[name].isoformat() if name == 'timestamp'
+            else row[name]
+            for name in FIELDS
+        ])
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def gzip_chunks(lines, flush_bytes: int = 64 * 1024):
+    """Gzip a stream of text lines into byte chunks of roughly ``flush_bytes``."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= flush_bytes:
+            chunk = compressor.compress(b''.join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b''.join(pending)) + compressor.flush()
+
+
+def export_stream(fmt: str, compress: bool = False, **filters):
+    """Encoded export of the messages matching ``filters`` (see ``export_rows``).
+
+    Yields ``str`` lines, or gzip ``bytes`` chunks when ``compress`` is set.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format "{fmt}", expected one of {", ".join(FORMATS)}')
+    rows = export_rows(**filters)
+    lines = csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+    return gzip_chunks(lines) if compress else lines
@@ -1,20 +1,12 @@
 import logging
+import time
 
-from ollama import Client
 from django.conf import settings
 
-logger = logging.getLogger(__name__)
-
-# Create Ollama client pointing to the configured (possibly remote) server
-_ollama_client = None
+from . import metrics, tracing
+from .ollama_client import get_ollama_client
 
-
-def get_ollama_client():
-    global _ollama_client
-    if _ollama_client is None:
-        _ollama_client = Client(host=settings.OLLAMA_BASE_URL)
-        logger.info('Ollama client configured for %s', settings.OLLAMA_BASE_URL)
-    return _ollama_client
+logger = logging.getLogger(__name__)
 
 
 def build_rag_prompt(query: str, context_docs: list[dict]) -> str:
@@ -64,7 +56,7 @@ def _fallback_response(query: str, context_docs: list[dict]) -> str:
     score = top.get('score', 0)
 
     # If best match has very low relevance, say so
-    if score < 0.05:
+    if score < settings.RAG_LOW_RELEVANCE_SCORE:
         return (
             "I found some information in our database, but it may not directly address "
             "your question. Here's the closest match:\n\n"
@@ -85,7 +77,7 @@ def _fallback_response(query: str, context_docs: list[dict]) -> str:
         parts.append(f"\n**Recommended Resolution:** {top['resolution']}\n")
 
     # Include additional relevant docs if available
-    additional = [d for d in context_docs[1:] if d.get('score', 0) > 0.1]
+    additional = [d for d in context_docs[1:] if d.get('score', 0) > settings.RAG_RELATED_SCORE]
     if additional:
         parts.append("\n**Related incidents:**")
         for doc in additional:
@@ -94,35 +86,82 @@ def _fallback_response(query: str, context_docs: list[dict]) -> str:
     return '\n'.join(parts)
 
 
-def generate_response(query: str, context_docs: list[dict]) -> str:
+def _trace_ollama_timings(response):
+    """Split the generation span into the phases Ollama reports (in ns).
+
+    Ollama loads the model, evaluates the prompt, then generates; the
+    phases are laid out back to back ending now, so network and queueing
+    time shows up as the gap before them.
+    """
+    end = time.time_ns()
+    for name, duration, count in (
+        ('ollama.eval', response.get('eval_duration'), response.get('eval_count')),
+        ('ollama.prompt_eval', response.get('prompt_eval_duration'), response.get('prompt_eval_count')),
+        ('ollama.load', response.get('load_duration'), None),
+    ):
+        if duration:
+            tracing.add_span(name, end - duration, end, tokens=count)
+            end -= duration
+
+
+def _ms(ns):
+    return round(ns / 1_000_000) if ns is not None else None
+
+
+def ollama_stats(response) -> dict:
+    """Token counts and phase durations reported by Ollama, as ChatMessage fields."""
+    return {
+        'prompt_tokens': response.get('prompt_eval_count'),
+        'completion_tokens': response.get('eval_count'),
+        'prompt_eval_ms': _ms(response.get('prompt_eval_duration')),
+        'eval_ms': _ms(response.get('eval_duration')),
+        'load_ms': _ms(response.get('load_duration')),
+    }
+
+
+def generate_response(query: str, context_docs: list[dict]) -> tuple[str, dict]:
     """Generate a response using Ollama with RAG context.
 
     Falls back to a deterministic context-based response if Ollama
     is unavailable (e.g. insufficient memory in the container).
+
+    Returns ``(text, stats)``: stats holds the token counts and timings
+    of :func:`ollama_stats`, and is empty for fallback responses.
     """
-    prompt = build_rag_prompt(query, context_docs)
+    with tracing.span('llm.prompt', docs=len(context_docs)) as prompt_span:
+        prompt = build_rag_prompt(query, context_docs)
+        prompt_span.set_attribute('chars', len(prompt))
 
+    t0 = time.perf_counter()
+    metrics.LLM_IN_PROGRESS.inc()
     try:
         client = get_ollama_client()
-        response = client.chat(
-            model=settings.OLLAMA_MODEL,
-            messages=[
-                {
-                    'role': 'system',
-                    'content': (
-                        'You are PSPD Guardian, a helpful technical support chatbot for '
-                        'the PSPD Guardian system. You help users troubleshoot incidents '
-                        'and find solutions based on historical data. Keep responses '
-                        'concise and actionable.'
-                    ),
-                },
-                {
-                    'role': 'user',
-                    'content': prompt,
-                },
-            ],
-        )
-        return response['message']['content']
+        with tracing.span('llm.generate', model=settings.OLLAMA_MODEL):
+            response = client.chat(
+                model=settings.OLLAMA_MODEL,
+                messages=[
+                    {
+                        'role': 'system',
+                        'content': (
+                            'You are PSPD Guardian, a helpful technical support chatbot for '
+                            'the PSPD Guardian system. You help users troubleshoot incidents '
+                            'and find solutions based on historical data. Keep responses '
+                            'concise and actionable.'
+                        ),
+                    },
+                    {
+                        'role': 'user',
+                        'content': prompt,
+                    },
+                ],
+            )
+            _trace_ollama_timings(response)
+        metrics.LLM_SECONDS.labels('ok').observe(time.perf_counter() - t0)
+        return response['message']['content'], ollama_stats(response)
     except Exception as e:
+        metrics.LLM_SECONDS.labels('error').observe(time.perf_counter() - t0)
+        metrics.LLM_FALLBACKS.inc()
         logger.warning('Ollama unavailable (%s), using RAG-context fallback.', e)
-        return _fallback_response(query, context_docs)
+        return _fallback_response(query, context_docs), {}
+    finally:
+        metrics.LLM_IN_PROGRESS.dec()
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chat import archive, partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive chat messages older than the retention period to compressed '
+        'files (one per month), then delete them.  Analytics keep the archived '
+        'history through hourly rollups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.CHAT_RETENTION_DAYS,
+            help='keep at least this many days of messages (default: CHAT_RETENTION_DAYS)',
+        )
+        parser.add_argument('--output-dir', default=settings.CHAT_ARCHIVE_DIR, help='directory for archive files')
+        parser.add_argument(
+            '--format', choices=archive.FORMATS, default=settings.CHAT_ARCHIVE_FORMAT,
+            help='archive file format (parquet needs pyarrow)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='rows fetched per database round trip')
+        parser.add_argument('--dry-run', action='store_true', help='only list the months that would be archived')
+
+    def handle(self, *args, **options):
+        if options['retention_days'] <= 0:
+            raise CommandError('Retention is disabled (CHAT_RETENTION_DAYS <= 0); pass --retention-days.')
+        if options['format'] == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError('--format parquet requires pyarrow: pip install pyarrow')
+
+        cutoff = archive.archive_cutoff(options['retention_days'])
+        if options['dry_run']:
+            months = archive.pending_months(cutoff)
+            for month in months:
+                self.stdout.write(f'{month:%Y-%m}')
+            self.stderr.write(f'{len(months)} months before {cutoff:%Y-%m-%d} would be archived.')
+            return
+
+        total = 0
+        for month, path, count in archive.archive_messages(
+            options['retention_days'], options['output_dir'], options['format'], options['chunk_size'],
+        ):
+            self.stdout.write(f'{month:%Y-%m}: {count} messages -> {path}')
+            total += count
+        self.stderr.write(f'Archived {total} messages older than {cutoff:%Y-%m-%d}.')
+
+        if partitions.is_partitioned():
+            partitions.ensure_partitions(settings.CHAT_PARTITION_MONTHS_AHEAD)
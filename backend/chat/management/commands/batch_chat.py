@@ -0,0 +1,73 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from chat.batch import answer_batch
+from chat.rerank import warm_up
+from chat.serializers import validate_filter_dict
+
+
+def read_questions(stream) -> list[str]:
+    """One question per line; JSON lines with a ``question`` key also work."""
+    questions = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            line = json.loads(line)['question']
+        questions.append(line)
+    return questions
+
+
+class Command(BaseCommand):
+    help = (
+        'Answer a file of questions through the RAG pipeline and write one '
+        'NDJSON result per question (nothing is saved to the database).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="questions file, one per line (or JSON lines); '-' for stdin")
+        parser.add_argument('--output', '-o', default='-', help="NDJSON output file; '-' for stdout")
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='FIELD=VALUE',
+            help='payload filter, repeatable (e.g. --filter severity=Critical)',
+        )
+        parser.add_argument('--concurrency', type=int, default=None, help='parallel LLM generations')
+
+    def handle(self, *args, **options):
+        filters = {}
+        for item in options['filter']:
+            field, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Invalid --filter "{item}", expected FIELD=VALUE')
+            filters.setdefault(field, []).append(value)
+        try:
+            validate_filter_dict(filters)
+        except ValidationError as e:
+            raise CommandError(' '.join(e.detail))
+
+        if options['input'] == '-':
+            questions = read_questions(sys.stdin)
+        else:
+            with open(options['input'], encoding='utf-8') as f:
+                questions = read_questions(f)
+        if not questions:
+            raise CommandError('No questions found.')
+
+        # Every question should be reranked, so wait for the model here
+        warm_up(wait=True)
+        out = self.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        try:
+            for result in answer_batch(questions, filters=filters or None, concurrency=options['concurrency']):
+                out.write(json.dumps(result) + '\n')
+                if result.get('done'):
+                    self.stderr.write(
+                        f"Answered {result['count']} questions in {result['total_ms']} ms "
+                        f"(retrieval {result['rag_ms']} ms)."
+                    )
+        finally:
+            if out is not self.stdout:
+                out.close()
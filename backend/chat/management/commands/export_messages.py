@@ -0,0 +1,62 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from chat.export import FORMATS, export_stream
+from chat.models import ChatMessage
+
+
+def parse_bound(value):
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f'Invalid date/time "{value}", expected ISO 8601 (e.g. 2026-01-31T00:00:00Z)')
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream chat messages with latency, score, rating and sources to CSV '
+        'or NDJSON, optionally gzipped, in constant memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="output file; '-' for stdout")
+        parser.add_argument('--format', choices=FORMATS, default=None, help='default: from the file name, else ndjson')
+        parser.add_argument('--start', help='only messages at or after this time (ISO 8601)')
+        parser.add_argument('--end', help='only messages before this time (ISO 8601)')
+        parser.add_argument('--type', choices=[t for t, _ in ChatMessage.MESSAGE_TYPES], help='only user or bot messages')
+        parser.add_argument('--gzip', action='store_true', help='gzip the output (implied by a .gz file name)')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE, help='rows per cursor fetch')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+        fmt = options['format'] or ('csv' if output.removesuffix('.gz').endswith('.csv') else 'ndjson')
+        stream = export_stream(
+            fmt,
+            compress=compress,
+            start=parse_bound(options['start']),
+            end=parse_bound(options['end']),
+            message_type=options['type'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if output == '-':
+            out = sys.stdout.buffer if compress else sys.stdout
+        elif compress:
+            out = open(output, 'wb')
+        else:
+            out = open(output, 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in stream:
+                out.write(chunk)
+        finally:
+            if output == '-':
+                out.flush()
+            else:
+                out.close()
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from chat import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create upcoming monthly partitions of the chat message table, or '
+        'convert it to a partitioned table with --convert (PostgreSQL only).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='rebuild the table as a monthly-partitioned table (locks it while rows are copied)',
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.CHAT_PARTITION_MONTHS_AHEAD,
+            help='months of partitions to create in advance',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+
+        if not partitions.is_partitioned():
+            if not options['convert']:
+                raise CommandError(f'{partitions.TABLE} is not partitioned; run with --convert first.')
+            executor = MigrationExecutor(connection)
+            if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+                # AddIndexConcurrently cannot run on a partitioned table
+                raise CommandError('Apply pending migrations (manage.py migrate) before converting.')
+            copied = partitions.convert_to_partitioned(options['months_ahead'])
+            self.stdout.write(f'Partitioned {partitions.TABLE} by month ({copied} rows copied).')
+            return
+
+        created = partitions.ensure_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stderr.write(f'{len(created)} partitions created.')
@@ -0,0 +1,123 @@
+"""Prometheus metrics for the RAG pipeline, served at ``/metrics``.
+
+Under Gunicorn every worker is a separate process, so metrics are written
+to shared files in ``PROMETHEUS_MULTIPROC_DIR`` (prometheus_client's
+multiprocess mode) and ``/metrics`` aggregates all workers, whichever one
+serves the scrape.  The directory must be empty when the server starts and
+dead workers are marked by the ``child_exit`` hook in ``gunicorn.conf.py``
+(see ``docker/entrypoint-backend.sh``).  Without the variable, metrics are
+kept in process, which is right for ``runserver``.
+"""
+import os
+import time
+
+from django.db import connection
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Buckets in seconds: embeddings and searches are milliseconds, LLM
+# generations and whole chat requests up to minutes
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+EMBED_SECONDS = Histogram(
+    'guardian_embed_seconds', 'Query embedding time per retrieval (per batch for batch chat)',
+    buckets=FAST_BUCKETS,
+)
+SEARCH_SECONDS = Histogram(
+    'guardian_vector_search_seconds', 'Vector search time per retrieval (per batch for batch chat)',
+    buckets=FAST_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    'guardian_llm_generation_seconds', 'Ollama chat generation time, by outcome',
+    ['outcome'], buckets=SLOW_BUCKETS,
+)
+LLM_IN_PROGRESS = Gauge(
+    'guardian_llm_generations_in_progress', 'LLM generations currently running',
+    multiprocess_mode='livesum',
+)
+LLM_FALLBACKS = Counter(
+    'guardian_llm_fallbacks_total', 'Answers built by the context fallback because Ollama failed',
+)
+RETRIEVAL_MISSES = Counter(
+    'guardian_retrieval_misses_total', 'Retrievals that passed no documents to the LLM',
+)
+INGESTED_DOCUMENTS = Counter(
+    'guardian_ingested_documents_total', 'Documents embedded and upserted by ingest',
+)
+INGEST_SECONDS = Histogram(
+    'guardian_ingest_seconds', 'Time per ingest call (embedding + upsert)',
+    buckets=SLOW_BUCKETS,
+)
+OLLAMA_HTTP = Counter(
+    'guardian_ollama_http_total', 'Ollama HTTP attempts, retries and final failures',
+    ['event'],
+)
+ANALYTICS_CACHE = Counter(
+    'guardian_analytics_cache_total', 'Analytics payload lookups by result (hit, coalesced, miss)',
+    ['result'],
+)
+REQUEST_SECONDS = Histogram(
+    'guardian_request_seconds', 'HTTP request time by view, method and status',
+    ['view', 'method', 'status'], buckets=SLOW_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    'guardian_request_db_seconds', 'Time spent in database queries per HTTP request, by view',
+    ['view'], buckets=FAST_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'guardian_requests_in_progress', 'HTTP requests currently being served (queue depth)',
+    multiprocess_mode='livesum',
+)
+
+
+class MetricsMiddleware:
+    """Times every request and the database queries it runs."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_seconds = 0.0
+
+        def time_query(execute, sql, params, many, context):
+            nonlocal db_seconds
+            t0 = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db_seconds += time.perf_counter() - t0
+
+        REQUESTS_IN_PROGRESS.inc()
+        t0 = time.perf_counter()
+        try:
+            with connection.execute_wrapper(time_query):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        # Streaming responses are timed until the view returns, not until
+        # the last chunk is sent
+        match = request.resolver_match
+        view = match.url_name or match.view_name if match else 'unmatched'
+        REQUEST_SECONDS.labels(view, request.method, str(response.status_code)).observe(time.perf_counter() - t0)
+        REQUEST_DB_SECONDS.labels(view).observe(db_seconds)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition of every worker's metrics."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,76 @@
+import threading
+
+
+class _Batch:
+    __slots__ = ('items', 'full', 'done', 'results', 'error')
+
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls into one batched call.
+
+    ``submit(key, item)`` blocks until ``run_batch(key, items)`` has run
+    for a batch containing ``item`` and returns that item's result.  The
+    first caller for a ``key`` leads the batch: it waits up to
+    ``window_ms`` for other threads to join (or until ``max_size`` items
+    have arrived), then makes the call on everyone's behalf.  Only calls
+    with equal keys are batched together, so the key must capture every
+    parameter the batched call depends on.
+
+    No background thread is involved, which keeps this safe under forking
+    servers; a lone caller just pays the window once.
+    """
+
+    def __init__(self, run_batch, window_ms: float, max_size: int):
+        self.run_batch = run_batch
+        self.window_s = window_ms / 1000
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, key, item):
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            slot = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window_s)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.batches += 1
+                self.items += len(batch.items)
+            try:
+                batch.results = self.run_batch(key, batch.items)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[slot]
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_rating_system'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='rag_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-stage retrieval timings in milliseconds (embed, search, rerank, ...)'),
+        ),
+    ]
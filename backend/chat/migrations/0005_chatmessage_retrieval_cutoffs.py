@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatmessage_rag_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='dropped_candidates',
+            field=models.JSONField(blank=True, default=list, help_text='Retrieved candidates discarded by score cutoffs or deduplication'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='effective_k',
+            field=models.IntegerField(default=0, help_text='Number of context documents passed to the LLM'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-19 10:56
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps chat_chatmessage writable while the
+    # indexes build, but cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('chat', '0005_chatmessage_retrieval_cutoffs'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'timestamp'], name='chat_msg_session_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(fields=['message_type', 'timestamp'], name='chat_msg_type_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('message_type', 'bot'), ('rating__isnull', False)), fields=['rating'], name='chat_msg_bot_rated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('message_type', 'bot')), fields=['top_rag_score'], name='chat_msg_bot_score_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('message_type', 'bot')), fields=['total_latency_ms'], name='chat_msg_bot_latency_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatsession',
+            index=models.Index(fields=['-updated_at'], name='chat_session_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatsession',
+            index=models.Index(fields=['created_at'], name='chat_session_created_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_analytics_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour')),
+                ('message_type', models.CharField(choices=[('user', 'User'), ('bot', 'Bot')], max_length=4)),
+                ('count', models.IntegerField(default=0)),
+                ('rated_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_1', models.IntegerField(default=0)),
+                ('rating_2', models.IntegerField(default=0)),
+                ('rating_3', models.IntegerField(default=0)),
+                ('rating_4', models.IntegerField(default=0)),
+                ('rating_5', models.IntegerField(default=0)),
+                ('rag_latency_sum', models.BigIntegerField(default=0)),
+                ('llm_latency_sum', models.BigIntegerField(default=0)),
+                ('total_latency_sum', models.BigIntegerField(default=0)),
+                ('top_rag_score_sum', models.FloatField(default=0.0)),
+                ('effective_k_sum', models.BigIntegerField(default=0)),
+                ('rag_latency_max', models.IntegerField(null=True)),
+                ('rag_latency_min', models.IntegerField(null=True)),
+                ('llm_latency_max', models.IntegerField(null=True)),
+                ('llm_latency_min', models.IntegerField(null=True)),
+                ('top_rag_score_max', models.FloatField(null=True)),
+                ('top_rag_score_min', models.FloatField(null=True)),
+                ('score_excellent', models.IntegerField(default=0)),
+                ('score_good', models.IntegerField(default=0)),
+                ('score_fair', models.IntegerField(default=0)),
+                ('score_poor', models.IntegerField(default=0)),
+                ('latency_fast', models.IntegerField(default=0)),
+                ('latency_normal', models.IntegerField(default=0)),
+                ('latency_slow', models.IntegerField(default=0)),
+                ('latency_very_slow', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'message_type'), name='chat_rollup_bucket_type_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_message_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='completion_tokens',
+            field=models.IntegerField(blank=True, help_text='Tokens generated by the LLM', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='eval_ms',
+            field=models.IntegerField(blank=True, help_text='LLM token generation time in milliseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='load_ms',
+            field=models.IntegerField(blank=True, help_text='LLM model load time in milliseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='prompt_eval_ms',
+            field=models.IntegerField(blank=True, help_text='LLM prompt evaluation time in milliseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='prompt_tokens',
+            field=models.IntegerField(blank=True, help_text='Prompt tokens evaluated by the LLM', null=True),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='cold_load_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='completion_tokens_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='eval_ms_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='llm_stats_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='load_ms_max',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='load_ms_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='prompt_eval_ms_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagerollup',
+            name='prompt_tokens_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
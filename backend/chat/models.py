@@ -10,6 +10,11 @@ class ChatSession(models.Model):
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Session list ordering and sessions-per-day analytics
+            models.Index(fields=['-updated_at'], name='chat_session_updated_idx'),
+            models.Index(fields=['created_at'], name='chat_session_created_idx'),
+        ]
 
     def __str__(self):
         return f"Session {self.id} - {self.title or 'Untitled'}"
@@ -40,9 +45,102 @@ class ChatMessage(models.Model):
     llm_latency_ms = models.IntegerField(default=0, help_text='LLM generation time in milliseconds')
     total_latency_ms = models.IntegerField(default=0, help_text='Total response time in milliseconds')
     top_rag_score = models.FloatField(default=0.0, help_text='Highest RAG similarity score for this response')
+    rag_timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Per-stage retrieval timings in milliseconds (embed, search, rerank, ...)',
+    )
+    effective_k = models.IntegerField(default=0, help_text='Number of context documents passed to the LLM')
+    dropped_candidates = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Retrieved candidates discarded by score cutoffs or deduplication',
+    )
+    # Reported by Ollama for generated answers (null for fallback answers)
+    prompt_tokens = models.IntegerField(null=True, blank=True, help_text='Prompt tokens evaluated by the LLM')
+    completion_tokens = models.IntegerField(null=True, blank=True, help_text='Tokens generated by the LLM')
+    prompt_eval_ms = models.IntegerField(null=True, blank=True, help_text='LLM prompt evaluation time in milliseconds')
+    eval_ms = models.IntegerField(null=True, blank=True, help_text='LLM token generation time in milliseconds')
+    load_ms = models.IntegerField(null=True, blank=True, help_text='LLM model load time in milliseconds')
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Messages of a session in order (session detail, last message)
+            models.Index(fields=['session', 'timestamp'], name='chat_msg_session_ts_idx'),
+            # Per-type counts and time-bucketed analytics
+            models.Index(fields=['message_type', 'timestamp'], name='chat_msg_type_ts_idx'),
+            # Bot-only analytics: rating distribution, score and latency buckets
+            models.Index(
+                fields=['rating'],
+                name='chat_msg_bot_rated_idx',
+                condition=models.Q(message_type='bot', rating__isnull=False),
+            ),
+            models.Index(
+                fields=['top_rag_score'],
+                name='chat_msg_bot_score_idx',
+                condition=models.Q(message_type='bot'),
+            ),
+            models.Index(
+                fields=['total_latency_ms'],
+                name='chat_msg_bot_latency_idx',
+                condition=models.Q(message_type='bot'),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.message_type}: {self.text[:50]}"
+
+
+class MessageRollup(models.Model):
+    """Hourly per-type aggregates of ChatMessage, kept after raw rows are archived.
+
+    Field names match the aggregates in ``chat/analytics.py``: ``*_sum`` and
+    counts add up across rows, ``*_min`` / ``*_max`` take the extreme.
+    """
+    bucket = models.DateTimeField(help_text='Start of the hour')
+    message_type = models.CharField(max_length=4, choices=ChatMessage.MESSAGE_TYPES)
+    count = models.IntegerField(default=0)
+    rated_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    rag_latency_sum = models.BigIntegerField(default=0)
+    llm_latency_sum = models.BigIntegerField(default=0)
+    total_latency_sum = models.BigIntegerField(default=0)
+    top_rag_score_sum = models.FloatField(default=0.0)
+    effective_k_sum = models.BigIntegerField(default=0)
+    rag_latency_max = models.IntegerField(null=True)
+    rag_latency_min = models.IntegerField(null=True)
+    llm_latency_max = models.IntegerField(null=True)
+    llm_latency_min = models.IntegerField(null=True)
+    top_rag_score_max = models.FloatField(null=True)
+    top_rag_score_min = models.FloatField(null=True)
+    score_excellent = models.IntegerField(default=0)
+    score_good = models.IntegerField(default=0)
+    score_fair = models.IntegerField(default=0)
+    score_poor = models.IntegerField(default=0)
+    latency_fast = models.IntegerField(default=0)
+    latency_normal = models.IntegerField(default=0)
+    latency_slow = models.IntegerField(default=0)
+    latency_very_slow = models.IntegerField(default=0)
+    llm_stats_count = models.IntegerField(default=0)
+    prompt_tokens_sum = models.BigIntegerField(default=0)
+    completion_tokens_sum = models.BigIntegerField(default=0)
+    prompt_eval_ms_sum = models.BigIntegerField(default=0)
+    eval_ms_sum = models.BigIntegerField(default=0)
+    load_ms_sum = models.BigIntegerField(default=0)
+    load_ms_max = models.IntegerField(null=True)
+    cold_load_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'message_type'], name='chat_rollup_bucket_type_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H}:00 {self.message_type}: {self.count}"
@@ -0,0 +1,144 @@
+import importlib.util
+import logging
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from ollama import Client
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Global instance (lazy loaded), shared by embedding and generation calls
+_ollama_client = None
+_ollama_client_lock = threading.Lock()
+# The client's transport, kept for its counters
+_transport = None
+
+# Gateway errors worth retrying: the request never reached a model runner
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+class RetryTransport(httpx.BaseTransport):
+    """httpx transport that retries failed connections with jittered backoff.
+
+    Only failures where Ollama cannot have done any work are retried:
+    connection errors, connections dropped before a response (e.g. a
+    keep-alive connection the server already closed) and 502/503/504 from
+    a proxy.  Read timeouts are not retried, since the model may still be
+    generating.  Backoff is "full jitter": a random wait between 0 and
+    ``backoff_s * 2**attempt`` so that workers do not retry in lockstep.
+
+    It also counts requests and the TCP connects / TLS handshakes they
+    caused (via httpcore's ``trace`` extension), to confirm connections are
+    being reused.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, retries: int, backoff_s: float):
+        self.transport = transport
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'retries': 0, 'failures': 0, 'tcp_connects': 0, 'tls_handshakes': 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+        if name in ('requests', 'retries', 'failures'):
+            metrics.OLLAMA_HTTP.labels(name).inc(n)
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == 'connection.connect_tcp.complete':
+            self._count('tcp_connects')
+        elif event_name == 'connection.start_tls.complete':
+            self._count('tls_handshakes')
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        caller_trace = request.extensions.get('trace')
+
+        def trace(event_name, info):
+            self._trace(event_name, info)
+            if caller_trace is not None:
+                caller_trace(event_name, info)
+
+        request.extensions['trace'] = trace
+        request.read()  # buffer the body so it can be re-sent
+        for attempt in range(self.retries + 1):
+            self._count('requests')
+            last_attempt = attempt == self.retries
+            try:
+                response = self.transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                if last_attempt:
+                    self._count('failures')
+                    raise
+                logger.info('Ollama connection failed (%s), retrying.', e)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                response.close()
+                logger.info('Ollama returned %s, retrying.', response.status_code)
+            self._count('retries')
+            time.sleep(random.uniform(0, self.backoff_s * 2 ** attempt))
+        raise AssertionError('unreachable')
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats['reused_connection_ratio'] = (
+            round(1 - stats['tcp_connects'] / stats['requests'], 4) if stats['requests'] else 0.0
+        )
+        return stats
+
+
+def _build_transport() -> RetryTransport:
+    # httpx only negotiates HTTP/2 over TLS (ALPN), and needs the h2 package
+    http2 = settings.OLLAMA_HTTP2 and importlib.util.find_spec('h2') is not None
+    inner = httpx.HTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.OLLAMA_POOL_SIZE,
+            max_keepalive_connections=settings.OLLAMA_POOL_SIZE,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_S,
+        ),
+    )
+    return RetryTransport(inner, retries=settings.OLLAMA_RETRIES, backoff_s=settings.OLLAMA_RETRY_BACKOFF_S)
+
+
+def get_ollama_client() -> Client:
+    """Return the process-wide Ollama client used for embeddings and chat."""
+    global _ollama_client, _transport
+    if _ollama_client is None:
+        with _ollama_client_lock:
+            if _ollama_client is None:
+                _transport = _build_transport()
+                _ollama_client = Client(
+                    host=settings.OLLAMA_BASE_URL,
+                    transport=_transport,
+                    timeout=httpx.Timeout(
+                        connect=settings.OLLAMA_CONNECT_TIMEOUT,
+                        read=settings.OLLAMA_READ_TIMEOUT,
+                        write=settings.OLLAMA_CONNECT_TIMEOUT,
+                        pool=settings.OLLAMA_CONNECT_TIMEOUT,
+                    ),
+                )
+                logger.info(
+                    'Ollama client configured for %s (pool %s, keep-alive %ss)',
+                    settings.OLLAMA_BASE_URL,
+                    settings.OLLAMA_POOL_SIZE,
+                    settings.OLLAMA_KEEPALIVE_S,
+                )
+    return _ollama_client
+
+
+def transport_stats() -> dict:
+    """Request, retry and connection counters for this process (empty before first use)."""
+    if _transport is None:
+        return {}
+    return _transport.stats()
@@ -0,0 +1,230 @@
+"""Optional monthly range partitioning of the ChatMessage table (PostgreSQL).
+
+``manage.py partition_messages --convert`` turns ``chat_chatmessage`` into a
+table partitioned by ``timestamp`` with one partition per month
+(``chat_chatmessage_p2026_01``, ...) plus a default partition that catches
+rows outside every range.  Old months can then be archived and dropped as a
+whole (``manage.py archive_messages``) instead of being deleted row by row.
+
+Django keeps treating ``id`` as the primary key; in the database the key is
+``(id, timestamp)`` because PostgreSQL requires the partition key in every
+unique constraint on a partitioned table.  That key alone would let the
+same id exist in two partitions, so ids are also claimed in
+``chat_chatmessage_ids`` (``id`` primary key) by a row trigger: inserting
+an id that is already used fails with an ``IntegrityError``, as before.
+
+PostgreSQL cannot build an index ``CONCURRENTLY`` on a partitioned table,
+so migrations using ``AddIndexConcurrently`` (like ``0006_analytics_indexes``)
+fail once the table is converted.  The conversion refuses to run while
+migrations are pending; later index migrations on ``ChatMessage`` must use
+a plain ``AddIndex`` (which locks the table while each partition is
+indexed) or build the index per partition and attach it by hand.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+TABLE = ChatMessage._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+ID_TABLE = f'{TABLE}_ids'
+
+# Keeps ID_TABLE in step with the message ids.  A row moved to another
+# partition by an UPDATE fires DELETE then INSERT, which releases and
+# re-claims its id.
+CLAIM_ID_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION {TABLE}_claim_id() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        DELETE FROM {ID_TABLE} WHERE id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {ID_TABLE} (id) VALUES (NEW.id);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def month_start(dt: datetime) -> datetime:
+    """Start of the (UTC) month containing ``dt``."""
+    dt = dt.astimezone(dt_timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def months_between(start: datetime, end: datetime):
+    """Month starts from ``start``'s month up to (excluding) ``end``."""
+    month = month_start(start)
+    while month < end:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions() -> set[str]:
+    """Names of the partitions currently attached to the message table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _create_partition(cursor, table: str, month: datetime):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {table} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [month, add_months(month, 1)],
+    )
+
+
+def _create_partition_from_default(cursor, month: datetime) -> int:
+    """Create the partition for ``month`` when the default partition already
+    holds rows of that month, moving them into it.
+
+    PostgreSQL refuses to add a partition whose range has rows in the
+    default partition, so the default partition is detached meanwhile.
+    Must run in a transaction.  Returns the number of rows moved.
+    """
+    bounds = [month, add_months(month, 1)]
+    in_month = 'timestamp >= %s AND timestamp < %s'
+    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+    _create_partition(cursor, TABLE, month)
+    # The moved rows claim their ids again on insert
+    cursor.execute(f'DELETE FROM {ID_TABLE} WHERE id IN (SELECT id FROM {DEFAULT_PARTITION} WHERE {in_month})', bounds)
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}', bounds)
+    moved = cursor.rowcount
+    cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}', bounds)
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+    return moved
+
+
+def ensure_partitions(months_ahead: int) -> list[str]:
+    """Create partitions from the current month to ``months_ahead`` months ahead.
+
+    Creating partitions before they are needed keeps new rows out of the
+    default partition, which would otherwise have to be scanned (and
+    locked) whenever a partition covering its rows is added.  Rows that
+    landed there anyway (the job did not run for a while) are moved into
+    the new partition.  Returns the names of the partitions created.
+    """
+    existing = existing_partitions()
+    now = month_start(datetime.now(dt_timezone.utc))
+    created = []
+    with connection.cursor() as cursor:
+        for month in months_between(now, add_months(now, months_ahead + 1)):
+            if partition_name(month) in existing:
+                continue
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= %s AND timestamp < %s)',
+                [month, add_months(month, 1)],
+            )
+            if cursor.fetchone()[0]:
+                with transaction.atomic():
+                    moved = _create_partition_from_default(cursor, month)
+                logger.warning(
+                    'Moved %d messages from %s into the new partition %s',
+                    moved, DEFAULT_PARTITION, partition_name(month),
+                )
+            else:
+                _create_partition(cursor, TABLE, month)
+            created.append(partition_name(month))
+    if created:
+        logger.info('Created message partitions %s', ', '.join(created))
+    return created
+
+
+def convert_to_partitioned(months_ahead: int) -> int:
+    """Rebuild the message table as a monthly-partitioned table.
+
+    Rows are copied inside the database (``INSERT ... SELECT``) in a single
+    transaction that holds an exclusive lock on the table, so run it in a
+    maintenance window.  Indexes and foreign keys are recreated under their
+    original names, so later migrations still find them, and the id
+    uniqueness trigger is installed (see the module docstring).  Returns
+    the number of rows copied.
+    """
+    new_table = f'{TABLE}_partitioned'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+            'WHERE indrelid = %s::regclass AND NOT indisprimary',
+            [TABLE],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(timestamp) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(
+            f'CREATE TABLE {new_table} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (timestamp)'
+        )
+        now = month_start(datetime.now(dt_timezone.utc))
+        for month in months_between(oldest or now, add_months(now, months_ahead + 1)):
+            _create_partition(cursor, new_table, month)
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {new_table} DEFAULT')
+        cursor.execute(f'INSERT INTO {new_table} SELECT * FROM {TABLE}')
+        copied = cursor.rowcount
+
+        cursor.execute(f'DROP TABLE {TABLE}')
+        cursor.execute(f'ALTER TABLE {new_table} RENAME TO {TABLE}')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, timestamp)')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+        cursor.execute(f'CREATE TABLE {ID_TABLE} (id uuid PRIMARY KEY)')
+        cursor.execute(f'INSERT INTO {ID_TABLE} (id) SELECT id FROM {TABLE}')
+        cursor.execute(CLAIM_ID_FUNCTION)
+        cursor.execute(
+            f'CREATE TRIGGER {TABLE}_claim_id AFTER INSERT OR DELETE OR UPDATE OF id ON {TABLE} '
+            f'FOR EACH ROW EXECUTE FUNCTION {TABLE}_claim_id()'
+        )
+    logger.info('Partitioned %s by month (%d rows copied)', TABLE, copied)
+    return copied
+
+
+def drop_partition(month: datetime):
+    """Detach and drop the partition holding ``month`` (its rows are gone)."""
+    name = partition_name(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        # DROP TABLE fires no row triggers, so release the ids here
+        cursor.execute(f'DELETE FROM {ID_TABLE} WHERE id IN (SELECT id FROM {name})')
+        cursor.execute(f'DROP TABLE {name}')
+    logger.info('Dropped message partition %s', name)
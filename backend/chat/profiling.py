@@ -0,0 +1,239 @@
+"""On-demand profiling of individual requests.
+
+Profiling is off unless ``PROFILE_TOKEN`` is set.  A request is then
+profiled when it carries ``X-Profile: cprofile`` or ``X-Profile: sample``
+with ``X-Profile-Token: <PROFILE_TOKEN>``, or when it is picked by
+``PROFILE_SAMPLE_RATE``.  Two profilers are available:
+
+- ``cprofile``: deterministic, every Python call is timed.  Precise but
+  slows the request down several times, so it is for explicit requests
+  only, and one request per process is profiled this way at a time.
+- ``sample``: a background thread records the request thread's stack every
+  ``PROFILE_SAMPLE_INTERVAL_MS``.  Wall-clock time, so waiting on Ollama,
+  Qdrant or the database shows up too; cheap enough for production
+  sampling, which always uses it.
+
+Profiles are written to ``PROFILE_DIR`` (shared by all workers) under a
+random id, returned in the ``X-Profile-Id`` header: ``<id>.prof`` (pstats,
+for ``snakeviz`` or ``python -m pstats``) or ``<id>.folded`` (collapsed
+stacks, for ``flamegraph.pl`` or speedscope), plus ``<id>.json`` with the
+request details (including the client's ``X-Request-Id``).  The newest
+``PROFILE_MAX_FILES`` profiles are kept.  When profiling is off, the
+middleware only looks at one setting.
+"""
+import cProfile
+import glob
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.http import Http404
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sample')
+EXTENSIONS = {'cprofile': 'prof', 'sample': 'folded'}
+PROFILE_ID_RE = re.compile(r'^[0-9A-Za-z_-]{1,64}$')
+
+# cProfile can only profile one thread per process at a time
+_cprofile_lock = threading.Lock()
+
+
+def authorized(request) -> bool:
+    """Whether the request may ask for, or read, profiles (never without a token)."""
+    token = settings.PROFILE_TOKEN
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Profile-Token', ''), token)
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one ``frame;frame;... count`` line each."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it (see the module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self._mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        profile_id = uuid.uuid4().hex
+        t0 = time.perf_counter()
+        if mode == 'cprofile':
+            if not _cprofile_lock.acquire(blocking=False):
+                logger.info('Another request is being cProfiled, sampling %s instead.', profile_id)
+                mode = 'sample'
+        if mode == 'cprofile':
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            finally:
+                _cprofile_lock.release()
+        else:
+            profiler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+        duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        try:
+            save_profile(profile_id, mode, profiler, {
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': duration_ms,
+                'trace_id': response.get('X-Trace-Id'),
+                'request_id': request.headers.get('X-Request-Id', '')[:128] or None,
+            })
+        except OSError as e:
+            logger.warning('Could not save profile %s: %s', profile_id, e)
+            return response
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    @staticmethod
+    def _mode(request):
+        if not settings.PROFILE_TOKEN:
+            return None
+        requested = request.headers.get('X-Profile')
+        if requested and authorized(request):
+            return requested if requested in MODES else 'cprofile'
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate > 0 and random.random() < rate:
+            return 'sample'
+        return None
+
+
+# ---------- Storage ----------
+
+def _path(profile_id: str, extension: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, f'{profile_id}.{extension}')
+
+
+def save_profile(profile_id: str, mode: str, profiler, meta: dict):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    path = _path(profile_id, EXTENSIONS[mode])
+    if mode == 'cprofile':
+        profiler.dump_stats(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.folded())
+        meta['samples'] = sum(profiler.stacks.values())
+    meta.update({'id': profile_id, 'mode': mode, 'created_at': time.time(), 'pid': os.getpid()})
+    # The metadata file is written last: its presence marks a complete profile
+    tmp_path = _path(profile_id, 'json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _path(profile_id, 'json'))
+    prune_profiles(settings.PROFILE_MAX_FILES)
+
+
+def list_profiles() -> list[dict]:
+    """Metadata of the stored profiles, newest first."""
+    profiles = []
+    for path in glob.glob(os.path.join(settings.PROFILE_DIR, '*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # pruned or half-written meanwhile
+    return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+
+def prune_profiles(keep: int):
+    """Remove all but the ``keep`` newest profiles, by metadata file mtime."""
+    try:
+        entries = [
+            entry for entry in os.scandir(settings.PROFILE_DIR)
+            if entry.name.endswith('.json')
+        ]
+    except FileNotFoundError:
+        return
+    if len(entries) <= keep:
+        return
+
+    def mtime(entry):
+        try:
+            return entry.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0  # pruned by another worker meanwhile
+
+    entries.sort(key=mtime, reverse=True)
+    for entry in entries[keep:]:
+        profile_id = entry.name[:-len('.json')]
+        for extension in ('json', *EXTENSIONS.values()):
+            try:
+                os.remove(_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id: str):
+    """(metadata, path of the profile data file); raises Http404."""
+    if not PROFILE_ID_RE.match(profile_id):
+        raise Http404('Profile not found')
+    try:
+        with open(_path(profile_id, 'json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise Http404('Profile not found')
+    return meta, _path(profile_id, EXTENSIONS[meta['mode']])
+
+
+def pstats_text(path: str, limit: int = 50) -> str:
+    """The ``limit`` most expensive functions by cumulative time."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
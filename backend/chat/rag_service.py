@@ -1,41 +1,68 @@
+import abc
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import List
 
+import httpx
 from django.conf import settings
-from ollama import Client
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
     Distance,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
     PointStruct,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    ScoredPoint,
+    SearchParams,
     VectorParams,
 )
 
+from . import metrics, tracing
+from .ollama_client import get_ollama_client
+
 logger = logging.getLogger(__name__)
 
 # Global instances (lazy loaded)
-_ollama_embed_client = None
 _qdrant_client = None
+_retrieval_backend = None
+_microbatchers = {}
+_microbatchers_lock = threading.Lock()
+
+# Local document store: (id, content_hash) -> content, filled from backend
+# lookups.  Bounded (LRU); keyed on the hash that searches return with the
+# summary fields, so a re-ingest by any process is never served stale.
+_content_cache = OrderedDict()
+_content_cache_lock = threading.Lock()
 
 # nomic-embed-text produces 768-dimensional vectors
 EMBEDDING_DIM = 768
 
+# Payload fields that searches can filter on (indexed as keywords)
+FILTERABLE_FIELDS = ('category', 'severity', 'error_code')
 
-def get_ollama_embed_client():
-    """Return a shared Ollama client for embedding requests."""
-    global _ollama_embed_client
-    if _ollama_embed_client is None:
-        _ollama_embed_client = Client(host=settings.OLLAMA_BASE_URL)
-        logger.info(
-            'Ollama embedding client configured for %s (model: %s)',
-            settings.OLLAMA_BASE_URL,
-            settings.OLLAMA_EMBED_MODEL,
-        )
-    return _ollama_embed_client
+# Small payload fields returned with every hit; the (large) 'content'
+# field is only fetched when a prompt is actually being built
+SUMMARY_FIELDS = ('title', 'category', 'severity', 'resolution', 'content_hash')
 
 
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """Embed a list of texts using Ollama nomic-embed-text."""
-    client = get_ollama_embed_client()
+    client = get_ollama_client()
     response = client.embed(
         model=settings.OLLAMA_EMBED_MODEL,
         input=texts,
@@ -44,30 +71,167 @@ def embed_texts(texts: list[str]) -> list[list[float]]:
 
 
 def embed_query(query: str) -> list[float]:
-    """Embed a single query string."""
+    """Embed a single query string.
+
+    With micro-batching enabled, concurrent calls share one ``embed_texts``
+    request.
+    """
+    batcher = _get_microbatcher('embed', lambda key, texts: embed_texts(texts))
+    if batcher is not None:
+        return batcher.submit(None, query)
     vectors = embed_texts([query])
     return vectors[0]
 
 
+# ---------- Micro-batching ----------
+
+def _get_microbatcher(name: str, run_batch):
+    """Return the shared micro-batcher ``name``, or None when disabled."""
+    if settings.RAG_MICROBATCH_WINDOW_MS <= 0:
+        return None
+    batcher = _microbatchers.get(name)
+    if batcher is None:
+        from .microbatch import MicroBatcher
+        with _microbatchers_lock:
+            batcher = _microbatchers.get(name)
+            if batcher is None:
+                batcher = _microbatchers[name] = MicroBatcher(
+                    run_batch,
+                    window_ms=settings.RAG_MICROBATCH_WINDOW_MS,
+                    max_size=settings.RAG_MICROBATCH_MAX_SIZE,
+                )
+    return batcher
+
+
+def microbatch_stats() -> dict:
+    """Batches issued and items coalesced per micro-batcher (this process)."""
+    return {name: batcher.stats() for name, batcher in _microbatchers.items()}
+
+
+def _qdrant_client_kwargs() -> dict:
+    """Connection settings for ``QdrantClient`` from ``settings.QDRANT_*``.
+
+    gRPC sends vectors as packed floats instead of JSON, which is cheaper
+    to encode and decode for 768-d queries.  Over gRPC ``pool_size`` is the
+    number of channels and keep-alive is done with HTTP/2 pings; over REST
+    both go into the httpx connection limits.  (qdrant-client's own REST
+    default disables keep-alive for ``localhost``.)
+    """
+    kwargs = {
+        'host': settings.QDRANT_HOST,
+        'port': settings.QDRANT_PORT,
+        'grpc_port': settings.QDRANT_GRPC_PORT,
+        'prefer_grpc': settings.QDRANT_PREFER_GRPC,
+        'timeout': settings.QDRANT_TIMEOUT,
+        'check_compatibility': False,
+    }
+    keepalive_ms = int(settings.QDRANT_KEEPALIVE_S * 1000)
+    if settings.QDRANT_PREFER_GRPC:
+        kwargs['pool_size'] = settings.QDRANT_POOL_SIZE
+        kwargs['grpc_options'] = {
+            'grpc.keepalive_time_ms': keepalive_ms,
+            'grpc.keepalive_timeout_ms': min(keepalive_ms, 10000),
+            'grpc.keepalive_permit_without_calls': 1,
+            'grpc.http2.max_pings_without_data': 0,
+        }
+    else:
+        kwargs['limits'] = httpx.Limits(
+            max_connections=settings.QDRANT_POOL_SIZE,
+            max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+            keepalive_expiry=settings.QDRANT_KEEPALIVE_S,
+        )
+    return kwargs
+
+
 def get_qdrant():
     global _qdrant_client
     if _qdrant_client is None:
-        _qdrant_client = QdrantClient(
-            host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT,
-            check_compatibility=False,
+        _qdrant_client = QdrantClient(**_qdrant_client_kwargs())
+        logger.info(
+            'Connected to Qdrant at %s:%s (%s)',
+            settings.QDRANT_HOST,
+            settings.QDRANT_GRPC_PORT if settings.QDRANT_PREFER_GRPC else settings.QDRANT_PORT,
+            'gRPC' if settings.QDRANT_PREFER_GRPC else 'REST',
         )
-        logger.info('Connected to Qdrant at %s:%s', settings.QDRANT_HOST, settings.QDRANT_PORT)
     return _qdrant_client
 
 
+def _quantization_config():
+    """Return the Qdrant quantization config for ``settings.RAG_QUANTIZATION``."""
+    mode = settings.RAG_QUANTIZATION
+    if mode == 'int8':
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True),
+        )
+    if mode == 'binary':
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    if mode == 'none':
+        return None
+    raise ValueError(f'Unknown RAG_QUANTIZATION "{mode}"')
+
+
+def _search_params():
+    """Search params that oversample quantized candidates and rescore them
+    with the original float32 vectors."""
+    if settings.RAG_QUANTIZATION == 'none':
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True,
+            oversampling=settings.RAG_QUANTIZATION_OVERSAMPLING,
+        ),
+    )
+
+
+def _qdrant_filter(filters: dict | None):
+    """Translate ``{'severity': 'Critical', 'category': ['API', 'Database']}``
+    into a Qdrant filter: every field must match, a list matches any value."""
+    if not filters:
+        return None
+    conditions = []
+    for field, value in filters.items():
+        if isinstance(value, (list, tuple)):
+            match = MatchAny(any=list(value))
+        else:
+            match = MatchValue(value=value)
+        conditions.append(FieldCondition(key=field, match=match))
+    return Filter(must=conditions)
+
+
+def _ensure_payload_indexes(client, collection_name: str):
+    """Create keyword indexes so filters are applied inside the vector search."""
+    schema = client.get_collection(collection_name).payload_schema
+    for field in FILTERABLE_FIELDS:
+        if field not in schema:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+            logger.info('Created keyword payload index on "%s".', field)
+
+
+def _payload_selector(with_payload):
+    return list(with_payload) if isinstance(with_payload, (list, tuple)) else with_payload
+
+
 def ensure_collection():
     """Create the Qdrant collection if it doesn't already exist.
 
     If an existing collection has the wrong vector size (e.g. 384 from a
     previous embedding model), it is deleted and recreated with the
-    correct dimensions for nomic-embed-text (768).
+    correct dimensions for nomic-embed-text (768).  Either way the
+    collection's quantization is brought in line with ``RAG_QUANTIZATION``
+    and keyword payload indexes exist for every ``FILTERABLE_FIELDS`` entry.
+
+    When a local retrieval backend is configured there is no collection to
+    create; the backend's own storage is prepared instead.
     """
+    backend = get_retrieval_backend()
+    if backend.name != 'qdrant':
+        backend.ensure_ready()
+        return
+
     client = get_qdrant()
     collection_name = settings.QDRANT_COLLECTION
     collections = [c.name for c in client.get_collections().collections]
@@ -86,6 +250,11 @@ def ensure_collection():
             client.delete_collection(collection_name)
         else:
             logger.info('Qdrant collection "%s" already exists with correct dimensions.', collection_name)
+            client.update_collection(
+                collection_name=collection_name,
+                quantization_config=_quantization_config() or Disabled.DISABLED,
+            )
+            _ensure_payload_indexes(client, collection_name)
             return
 
     client.create_collection(
@@ -94,12 +263,186 @@ def ensure_collection():
             size=EMBEDDING_DIM,  # nomic-embed-text output dimension
             distance=Distance.COSINE,
         ),
+        quantization_config=_quantization_config(),
+    )
+    logger.info(
+        'Created Qdrant collection: %s (dim=%d, quantization=%s)',
+        collection_name,
+        EMBEDDING_DIM,
+        settings.RAG_QUANTIZATION,
     )
-    logger.info('Created Qdrant collection: %s (dim=%d)', collection_name, EMBEDDING_DIM)
+    _ensure_payload_indexes(client, collection_name)
+
+
+# ---------- Retrieval backends ----------
+
+class RetrievalBackend(abc.ABC):
+    """Interface shared by every vector search backend.
+
+    Backends return ``qdrant_client.models.ScoredPoint`` objects so that
+    :func:`search_similar` can build its result dicts the same way no
+    matter where the vectors live.  ``filters`` is a dict of payload field
+    to value (or list of accepted values); backends must apply it before
+    ranking, never by discarding hits afterwards.  ``with_payload`` is
+    ``True`` (whole payload), ``False`` (ids and scores only) or a list of
+    payload fields to return.  ``with_vectors=True`` also returns each
+    hit's stored (normalised) vector.
+    """
+
+    name = ''
+
+    def ensure_ready(self):
+        """Prepare storage for ingestion (no-op by default)."""
+
+    @abc.abstractmethod
+    def upsert(self, points: list[PointStruct]):
+        """Insert or replace points by id."""
+
+    @abc.abstractmethod
+    def delete(self, ids: list):
+        """Remove points by id (unknown ids are ignored)."""
+
+    def search(
+        self, vector: list[float], top_k: int, filters: dict | None = None, with_payload=True, with_vectors=False,
+    ) -> list[ScoredPoint]:
+        return self.search_batch([vector], top_k, filters, with_payload, with_vectors)[0]
+
+    @abc.abstractmethod
+    def search_batch(
+        self,
+        vectors: list[list[float]],
+        top_k: int,
+        filters: dict | None = None,
+        with_payload=True,
+        with_vectors=False,
+    ) -> list[list[ScoredPoint]]:
+        """One list of hits per query vector, best first."""
+
+    @abc.abstractmethod
+    def retrieve(self, ids: list, with_payload=True) -> dict:
+        """Return ``{id: payload}`` for the given ids (missing ids are omitted)."""
+
+
+class QdrantBackend(RetrievalBackend):
+    """Remote Qdrant collection at ``QDRANT_HOST``."""
+
+    name = 'qdrant'
+
+    def upsert(self, points):
+        get_qdrant().upsert(collection_name=settings.QDRANT_COLLECTION, points=points)
+
+    def delete(self, ids):
+        get_qdrant().delete(
+            collection_name=settings.QDRANT_COLLECTION,
+            points_selector=PointIdsList(points=list(ids)),
+        )
+
+    def search(self, vector, top_k, filters=None, with_payload=True, with_vectors=False):
+        results = get_qdrant().query_points(
+            collection_name=settings.QDRANT_COLLECTION,
+            query=vector,
+            query_filter=_qdrant_filter(filters),
+            limit=top_k,
+            search_params=_search_params(),
+            with_payload=_payload_selector(with_payload),
+            with_vectors=with_vectors,
+        )
+        return results.points
+
+    def search_batch(self, vectors, top_k, filters=None, with_payload=True, with_vectors=False):
+        query_filter = _qdrant_filter(filters)
+        responses = get_qdrant().query_batch_points(
+            collection_name=settings.QDRANT_COLLECTION,
+            requests=[
+                QueryRequest(
+                    query=v,
+                    filter=query_filter,
+                    limit=top_k,
+                    params=_search_params(),
+                    with_payload=_payload_selector(with_payload),
+                    with_vector=with_vectors,
+                )
+                for v in vectors
+            ],
+        )
+        return [r.points for r in responses]
+
+    def retrieve(self, ids, with_payload=True):
+        records = get_qdrant().retrieve(
+            collection_name=settings.QDRANT_COLLECTION,
+            ids=list(ids),
+            with_payload=_payload_selector(with_payload),
+            with_vectors=False,
+        )
+        return {record.id: record.payload or {} for record in records}
+
+
+def _build_retrieval_backend(name: str) -> RetrievalBackend:
+    if name == 'qdrant':
+        return QdrantBackend()
+    if name == 'numpy':
+        from .vector_index import NumpyIndex
+        return NumpyIndex(
+            settings.RAG_LOCAL_INDEX_DIR,
+            dim=EMBEDDING_DIM,
+            quantization=settings.RAG_QUANTIZATION,
+            oversampling=settings.RAG_QUANTIZATION_OVERSAMPLING,
+        )
+    if name == 'hnsw':
+        from .vector_index import HnswIndex
+        return HnswIndex(
+            settings.RAG_LOCAL_INDEX_DIR,
+            dim=EMBEDDING_DIM,
+            m=settings.RAG_HNSW_M,
+            ef_construction=settings.RAG_HNSW_EF_CONSTRUCTION,
+            ef=settings.RAG_HNSW_EF,
+        )
+    raise ValueError(f'Unknown RAG_BACKEND "{name}"')
+
+
+def get_retrieval_backend() -> RetrievalBackend:
+    """Return the retrieval backend selected by ``settings.RAG_BACKEND``."""
+    global _retrieval_backend
+    if _retrieval_backend is None:
+        _retrieval_backend = _build_retrieval_backend(settings.RAG_BACKEND)
+        logger.info('Using "%s" retrieval backend.', _retrieval_backend.name)
+    return _retrieval_backend
+
+
+def _run_search_batch(key, vectors):
+    top_k, filters, with_payload, with_vectors = key
+    return get_retrieval_backend().search_batch(
+        vectors, top_k, json.loads(filters) if filters else None, with_payload, with_vectors,
+    )
+
+
+def search_vector(
+    vector: list[float], top_k: int, filters: dict | None = None, with_payload=True, with_vectors=False,
+) -> list[ScoredPoint]:
+    """Search the active backend for one vector.
+
+    With micro-batching enabled, concurrent searches with the same
+    parameters are sent as one ``search_batch`` call.
+    """
+    batcher = _get_microbatcher('search', _run_search_batch)
+    if batcher is None:
+        return get_retrieval_backend().search(vector, top_k, filters, with_payload, with_vectors)
+    key = (
+        top_k,
+        json.dumps(filters, sort_keys=True) if filters else None,
+        tuple(with_payload) if isinstance(with_payload, (list, tuple)) else with_payload,
+        with_vectors,
+    )
+    return batcher.submit(key, vector)
+
+
+def content_hash(content: str) -> str:
+    """Version of a document's content, stored in its payload at ingest."""
+    return hashlib.sha1(content.encode()).hexdigest()[:16]
 
 
 def ingest_documents(documents: list[dict]):
-    """Ingest a list of documents into Qdrant.
+    """Ingest a list of documents into the configured retrieval backend.
 
     Each document should have:
       - id: unique int
@@ -107,9 +450,7 @@ def ingest_documents(documents: list[dict]):
       - content: str  (the text that will be embedded)
       - metadata: dict (extra payload stored alongside)
     """
-    client = get_qdrant()
-    collection_name = settings.QDRANT_COLLECTION
-
+    t0 = time.perf_counter()
     texts = [d['content'] for d in documents]
     embeddings = embed_texts(texts)
 
@@ -120,38 +461,298 @@ def ingest_documents(documents: list[dict]):
             payload={
                 'title': doc.get('title', ''),
                 'content': doc['content'],
+                'content_hash': content_hash(doc['content']),
                 **doc.get('metadata', {}),
             },
         )
         for doc, emb in zip(documents, embeddings)
     ]
 
-    client.upsert(collection_name=collection_name, points=points)
-    logger.info('Ingested %d documents into Qdrant.', len(points))
+    backend = get_retrieval_backend()
+    backend.upsert(points)
+    metrics.INGEST_SECONDS.observe(time.perf_counter() - t0)
+    metrics.INGESTED_DOCUMENTS.inc(len(points))
+    logger.info('Ingested %d documents into %s.', len(points), backend.name)
 
 
-def search_similar(query: str, top_k: int = 3) -> List[dict]:
-    """Return the top_k most relevant documents for the given query."""
-    client = get_qdrant()
-    collection_name = settings.QDRANT_COLLECTION
+def delete_documents(ids: list):
+    """Remove documents from the configured retrieval backend by id."""
+    backend = get_retrieval_backend()
+    backend.delete(ids)
+    logger.info('Deleted %d documents from %s.', len(ids), backend.name)
+
+
+# ---------- Document content store ----------
+
+def load_content(docs: list[dict]) -> list[dict]:
+    """Fill in ``content`` for docs returned by ``search_similar(..., with_content=False)``.
+
+    Content comes from the in-process store when possible; the rest is
+    fetched from the backend in a single lookup.  The store is keyed on each
+    doc's ``content_hash``; docs without one (ingested before it existed)
+    are always fetched.  Docs are updated in place and also returned for
+    convenience.
+    """
+    missing = [d for d in docs if d.get('content') is None]
+    if not missing:
+        return docs
+
+    with _content_cache_lock:
+        for doc in missing:
+            key = (doc['id'], doc.get('content_hash'))
+            if key[1] and key in _content_cache:
+                _content_cache.move_to_end(key)
+                doc['content'] = _content_cache[key]
+
+    to_fetch = [d for d in missing if d['content'] is None]
+    if to_fetch:
+        payloads = get_retrieval_backend().retrieve([d['id'] for d in to_fetch], ['content'])
+        with _content_cache_lock:
+            for doc in to_fetch:
+                doc['content'] = payloads.get(doc['id'], {}).get('content', '')
+                if doc.get('content_hash'):
+                    _content_cache[(doc['id'], doc['content_hash'])] = doc['content']
+            while len(_content_cache) > settings.RAG_CONTENT_CACHE_SIZE:
+                _content_cache.popitem(last=False)
+    return docs
 
+
+# ---------- Search ----------
+
+def _hit_to_doc(hit: ScoredPoint) -> dict:
+    payload = hit.payload or {}
+    return {
+        'id': hit.id,
+        'score': hit.score,
+        'title': payload.get('title', ''),
+        # None marks content that was not requested (see load_content)
+        'content': payload.get('content'),
+        'category': payload.get('category', ''),
+        'severity': payload.get('severity', ''),
+        'resolution': payload.get('resolution', ''),
+        'content_hash': payload.get('content_hash'),
+    }
+
+
+def search_similar(
+    query: str, top_k: int = 3, filters: dict | None = None, with_content: bool = True,
+) -> List[dict]:
+    """Return the top_k most relevant documents for the given query.
+
+    ``filters`` restricts the search to documents whose payload matches,
+    e.g. ``{'severity': 'Critical'}`` or ``{'category': ['API', 'Database']}``.
+
+    Hits carry only the payload fields that are needed.  With
+    ``with_content=False`` that is just ``SUMMARY_FIELDS`` and each doc's
+    ``content`` is left as ``None``, so callers that discard candidates or
+    only need titles and scores can defer it to :func:`load_content`.
+    """
     query_vector = embed_query(query)
+    fields = SUMMARY_FIELDS + ('content',) if with_content else SUMMARY_FIELDS
+    hits = search_vector(query_vector, top_k, filters, with_payload=fields)
+    return [_hit_to_doc(hit) for hit in hits]
 
-    results = client.query_points(
-        collection_name=collection_name,
-        query=query_vector,
-        limit=top_k,
+
+def _elapsed_ms(start: float) -> int:
+    return int((time.perf_counter() - start) * 1000)
+
+
+def _dropped(doc: dict, reason: str) -> dict:
+    return {'id': str(doc['id']), 'title': doc['title'], 'score': round(doc['score'], 4), 'reason': reason}
+
+
+def apply_score_cutoffs(
+    docs: list[dict],
+    max_k: int,
+    min_k: int = 1,
+    min_score: float = 0.0,
+    max_gap: float = 1.0,
+    confident_score: float = 1.0,
+) -> tuple[list[dict], int, list[dict]]:
+    """Drop weak candidates and choose how many docs the prompt gets.
+
+    ``docs`` must be in descending ``score`` order.  Candidates scoring
+    below ``min_score`` are dropped, as is everything after the first
+    drop between consecutive scores larger than ``max_gap`` times the top
+    score.  When the top score reaches ``confident_score`` only ``min_k``
+    docs are needed, otherwise up to ``max_k``.
+
+    Returns ``(survivors, k, dropped)``; survivors may hold more than ``k``
+    docs so later stages (rerank, MMR) still have a choice.  ``dropped``
+    lists ``{id, title, score, reason}`` for every discarded candidate.
+    """
+    if not docs:
+        return [], 0, []
+    kept, dropped = [], []
+    top = docs[0]['score']
+    previous = top
+    for i, doc in enumerate(docs):
+        if doc['score'] < min_score:
+            dropped += [_dropped(d, 'min_score') for d in docs[i:]]
+            break
+        if previous - doc['score'] > max_gap * top:
+            dropped += [_dropped(d, 'score_gap') for d in docs[i:]]
+            break
+        kept.append(doc)
+        previous = doc['score']
+    k = min_k if top >= confident_score else max_k
+    return kept, min(k, len(kept)), dropped
+
+
+def _candidate_limit(reranker, diversify: bool) -> int:
+    limit = settings.RAG_TOP_K
+    if reranker:
+        limit = max(limit, settings.RAG_RERANK_CANDIDATES)
+    if diversify:
+        limit = max(limit, settings.RAG_MMR_CANDIDATES)
+    return limit
+
+
+def _search_fields(limit: int) -> tuple:
+    """Payload fields for the candidate search.
+
+    Without over-fetching every candidate may reach the prompt, so content
+    comes inline; otherwise only the kept docs load it afterwards.
+    """
+    return SUMMARY_FIELDS + ('content',) if limit <= settings.RAG_TOP_K else SUMMARY_FIELDS
+
+
+def _diversify_enabled() -> bool:
+    return settings.RAG_MMR_LAMBDA < 1 or settings.RAG_DEDUP_THRESHOLD < 1
+
+
+def retrieve_context(query: str, filters: dict | None = None) -> tuple[list[dict], dict, list[dict]]:
+    """Run the full retrieval pipeline for one chat message.
+
+    Embeds the query, searches (over-fetching candidates when a reranker or
+    MMR diversification is configured), applies the score cutoffs and
+    dynamic k of :func:`apply_score_cutoffs`, reranks within its latency
+    budget, picks the final docs (by MMR and near-duplicate collapsing when
+    enabled) and loads their content.
+
+    Returns ``(docs, timings, dropped)``: timings holds per-stage
+    milliseconds and candidate counts, dropped the candidates discarded by
+    the cutoffs or collapsed as duplicates.
+    """
+    from .rerank import get_reranker
+
+    timings = {}
+    reranker = get_reranker()
+    diversify = _diversify_enabled()
+
+    t0 = time.perf_counter()
+    with tracing.span('rag.embed', model=settings.OLLAMA_EMBED_MODEL):
+        query_vector = embed_query(query)
+    timings['embed_ms'] = _elapsed_ms(t0)
+    metrics.EMBED_SECONDS.observe(timings['embed_ms'] / 1000)
+
+    t0 = time.perf_counter()
+    limit = _candidate_limit(reranker, diversify)
+    with tracing.span('rag.search', backend=settings.RAG_BACKEND, limit=limit) as search_span:
+        hits = search_vector(
+            query_vector,
+            limit,
+            filters,
+            with_payload=_search_fields(limit),
+            with_vectors=diversify,
+        )
+        search_span.set_attribute('hits', len(hits))
+    timings['search_ms'] = _elapsed_ms(t0)
+    metrics.SEARCH_SECONDS.observe(timings['search_ms'] / 1000)
+    return _select_context(query, hits, timings, reranker, diversify)
+
+
+def retrieve_context_batch(
+    queries: list[str], filters: dict | None = None,
+) -> list[tuple[list[dict], dict, list[dict]]]:
+    """:func:`retrieve_context` for many queries at once.
+
+    All queries are embedded in one ``embed_texts`` call and searched with
+    one ``search_batch`` call; the per-query stages (cutoffs, rerank, MMR,
+    content) then run as usual.  ``embed_ms`` and ``search_ms`` in each
+    result's timings are the shared batch totals.
+    """
+    from .rerank import get_reranker
+
+    if not queries:
+        return []
+    reranker = get_reranker()
+    diversify = _diversify_enabled()
+
+    t0 = time.perf_counter()
+    vectors = embed_texts(queries)
+    embed_ms = _elapsed_ms(t0)
+    metrics.EMBED_SECONDS.observe(embed_ms / 1000)
+
+    t0 = time.perf_counter()
+    limit = _candidate_limit(reranker, diversify)
+    batches = get_retrieval_backend().search_batch(
+        vectors,
+        limit,
+        filters,
+        with_payload=_search_fields(limit),
+        with_vectors=diversify,
     )
+    search_ms = _elapsed_ms(t0)
+    metrics.SEARCH_SECONDS.observe(search_ms / 1000)
 
-    docs = []
-    for hit in results.points:
-        docs.append({
-            'id': hit.id,
-            'score': hit.score,
-            'title': hit.payload.get('title', ''),
-            'content': hit.payload.get('content', ''),
-            'category': hit.payload.get('category', ''),
-            'severity': hit.payload.get('severity', ''),
-            'resolution': hit.payload.get('resolution', ''),
-        })
-    return docs
+    return [
+        _select_context(query, hits, {'embed_ms': embed_ms, 'search_ms': search_ms}, reranker, diversify)
+        for query, hits in zip(queries, batches)
+    ]
+
+
+def _select_context(query: str, hits: list[ScoredPoint], timings: dict, reranker, diversify: bool):
+    from .diversity import mmr_select
+    from .rerank import rerank
+
+    docs = [_hit_to_doc(hit) for hit in hits]
+    timings['candidates'] = len(docs)
+
+    docs, top_k, dropped = apply_score_cutoffs(
+        docs,
+        max_k=settings.RAG_TOP_K,
+        min_k=settings.RAG_MIN_K,
+        min_score=settings.RAG_MIN_SCORE,
+        max_gap=settings.RAG_MAX_SCORE_GAP,
+        confident_score=settings.RAG_CONFIDENT_SCORE,
+    )
+
+    if reranker and len(docs) > 1:
+        t0 = time.perf_counter()
+        with tracing.span('rag.rerank', reranker=settings.RAG_RERANKER, candidates=len(docs)):
+            # Content is only fetched for the batches that get scored
+            docs, stats = rerank(
+                query,
+                docs,
+                reranker,
+                batch_size=settings.RAG_RERANK_BATCH_SIZE,
+                budget_ms=settings.RAG_RERANK_BUDGET_MS,
+                prepare=load_content if reranker.needs_content else None,
+            )
+        timings['rerank_ms'] = _elapsed_ms(t0)
+        timings['reranked'] = stats['reranked']
+
+    if diversify and len(docs) > 1:
+        t0 = time.perf_counter()
+        vectors = {hit.id: hit.vector for hit in hits}
+        with tracing.span('rag.mmr', candidates=len(docs)):
+            docs, collapsed = mmr_select(
+                docs,
+                [vectors[d['id']] for d in docs],
+                top_k,
+                lambda_mult=settings.RAG_MMR_LAMBDA,
+                dedup_threshold=settings.RAG_DEDUP_THRESHOLD,
+            )
+        timings['mmr_ms'] = _elapsed_ms(t0)
+        timings['deduplicated'] = len(collapsed)
+        dropped += [_dropped(d, 'duplicate') for d in collapsed]
+
+    docs = docs[:top_k]
+    t0 = time.perf_counter()
+    with tracing.span('rag.load_content', docs=len(docs)):
+        load_content(docs)
+    timings['content_ms'] = _elapsed_ms(t0)
+    if not docs:
+        metrics.RETRIEVAL_MISSES.inc()
+    return docs, timings, dropped
@@ -0,0 +1,213 @@
+import abc
+import logging
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Global instance (lazy loaded)
+_reranker = None
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:[-_][a-z0-9]+)*')
+
+# Words too common in support questions to signal relevance
+STOPWORDS = frozenset(
+    'a an and are as at be by can do does for from how i in is it my of on or '
+    'the this to what when where which why with you your'.split()
+)
+
+
+def tokenize(text: str) -> set[str]:
+    return {t for t in _TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS}
+
+
+class Reranker(abc.ABC):
+    """Scores (query, document) pairs; higher scores rank first."""
+
+    name = ''
+    # Scoring cost per document in ms, learned from past batches
+    ms_per_doc = None
+    # Whether ``score`` reads ``content`` (loaded per batch, see :func:`rerank`)
+    needs_content = False
+
+    @property
+    def ready(self) -> bool:
+        """Whether ``score`` can run now without loading anything."""
+        return True
+
+    def load(self):
+        """Load whatever ``score`` needs, blocking until it is ready."""
+
+    @abc.abstractmethod
+    def score(self, query: str, docs: list[dict]) -> list[float]:
+        """One score per doc, in ``docs`` order."""
+
+    def observe(self, docs: int, elapsed_ms: float):
+        """Fold a scored batch's duration into ``ms_per_doc``."""
+        cost = elapsed_ms / docs
+        self.ms_per_doc = cost if self.ms_per_doc is None else 0.8 * self.ms_per_doc + 0.2 * cost
+
+
+class LexicalReranker(Reranker):
+    """Blend of the vector score and query-term overlap.
+
+    Overlap is the share of query terms found in the document, with title
+    hits counting double.  Error codes and product names that embeddings
+    blur together (e.g. ``AUTH-001`` vs ``AUTH-002``) are matched exactly.
+    Only the summary fields returned by the search are read, never
+    ``content``, so candidates need no extra lookup.
+    """
+
+    name = 'lexical'
+
+    def __init__(self, vector_weight: float = 0.5):
+        self.vector_weight = vector_weight
+
+    def score(self, query, docs):
+        terms = tokenize(query)
+        scores = []
+        for doc in docs:
+            if terms:
+                title = tokenize(doc.get('title', ''))
+                body = tokenize(' '.join(str(doc.get(f) or '') for f in ('resolution', 'category', 'severity')))
+                overlap = sum(2 if t in title else 1 if t in body else 0 for t in terms) / (2 * len(terms))
+            else:
+                overlap = 0.0
+            scores.append(self.vector_weight * doc.get('score', 0) + (1 - self.vector_weight) * overlap)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """A small sentence-transformers cross-encoder run on CPU.
+
+    The model is loaded (downloaded, the first time) off the request path:
+    :meth:`start_loading` runs :meth:`load` on a background thread, and
+    until it has finished the reranker is not ``ready`` and requests skip
+    reranking.  Loading ends with a timed dummy batch, so ``ms_per_doc`` is
+    known before the first real request is scored.  sentence-transformers
+    is only needed when this reranker is configured.
+    """
+
+    name = 'cross-encoder'
+    needs_content = True
+
+    def __init__(self, model_name: str, batch_size: int = 16):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._loader = None
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def start_loading(self):
+        with self._load_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load_logged, name='cross-encoder-load', daemon=True)
+                self._loader.start()
+
+    def _load_logged(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception('Could not load cross-encoder %s; reranking is disabled.', self.model_name)
+
+    def load(self):
+        with self._load_lock:
+            if self._model is not None:
+                return
+            from sentence_transformers import CrossEncoder
+            t0 = time.perf_counter()
+            model = CrossEncoder(self.model_name, device='cpu')
+            pairs = [('warm up', 'calibration document ' * 32)] * self.batch_size
+            model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)  # first call is slow
+            t1 = time.perf_counter()
+            model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            self.observe(len(pairs), (time.perf_counter() - t1) * 1000)
+            self._model = model
+            logger.info(
+                'Loaded cross-encoder %s in %.1f s (%.1f ms per document).',
+                self.model_name, t1 - t0, self.ms_per_doc,
+            )
+
+    def score(self, query, docs):
+        pairs = [(query, f"{d.get('title', '')}\n{d.get('content') or ''}") for d in docs]
+        logits = self._model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        # Squash logits into (0, 1) so scores are comparable to cosine scores
+        return [1 / (1 + math.exp(-float(x))) for x in logits]
+
+
+def get_reranker():
+    """Return the reranker selected by ``settings.RAG_RERANKER`` (or None)."""
+    global _reranker
+    name = settings.RAG_RERANKER
+    if name == 'none':
+        return None
+    if _reranker is None or _reranker.name != name:
+        if name == 'lexical':
+            _reranker = LexicalReranker()
+        elif name == 'cross-encoder':
+            _reranker = CrossEncoderReranker(settings.RAG_CROSS_ENCODER_MODEL, settings.RAG_RERANK_BATCH_SIZE)
+            _reranker.start_loading()
+        else:
+            raise ValueError(f'Unknown RAG_RERANKER "{name}"')
+    return _reranker
+
+
+def warm_up(wait: bool = False):
+    """Start loading the configured reranker (Gunicorn's ``post_worker_init``
+    calls this); with ``wait``, block until it is ready."""
+    reranker = get_reranker()
+    if reranker is not None and wait:
+        reranker.load()
+
+
+def rerank(
+    query: str, docs: list[dict], reranker: Reranker, batch_size: int, budget_ms: float, prepare=None,
+):
+    """Reorder ``docs`` by ``reranker`` score, a batch at a time.
+
+    A batch is only started if its estimated cost (``ms_per_doc`` learned
+    from earlier batches, across requests) fits in what is left of
+    ``budget_ms``, and nothing is scored while the reranker is still
+    loading, so a slow model can never hold a request hostage: whatever
+    was scored is ranked first and the unscored tail keeps its
+    vector-search order.  Only a reranker that has never scored anything
+    gets one batch unchecked.  ``prepare(batch)``, if given, runs right
+    before a batch is scored (e.g. to load its content) and is timed and
+    budgeted with it.  Each scored doc gets a ``rerank_score``.
+    Returns ``(docs, stats)``.
+    """
+    start = time.perf_counter()
+    scored = 0
+    if not reranker.ready:
+        logger.info('Reranker %s is still loading, skipping reranking.', reranker.name)
+        return docs, {'reranker': reranker.name, 'reranked': 0, 'budget_exhausted': False}
+    for offset in range(0, len(docs), batch_size):
+        batch = docs[offset:offset + batch_size]
+        t0 = time.perf_counter()
+        elapsed_ms = (t0 - start) * 1000
+        if reranker.ms_per_doc is not None and elapsed_ms + reranker.ms_per_doc * len(batch) > budget_ms:
+            break
+        if prepare is not None:
+            prepare(batch)
+        for doc, value in zip(batch, reranker.score(query, batch)):
+            doc['rerank_score'] = value
+        scored += len(batch)
+        reranker.observe(len(batch), (time.perf_counter() - t0) * 1000)
+
+    head = sorted(docs[:scored], key=lambda d: d['rerank_score'], reverse=True)
+    stats = {
+        'reranker': reranker.name,
+        'reranked': scored,
+        'budget_exhausted': scored < len(docs),
+    }
+    if stats['budget_exhausted']:
+        logger.info('Rerank budget (%s ms) hit after %d/%d candidates.', budget_ms, scored, len(docs))
+    return head + docs[scored:], stats
@@ -1,5 +1,12 @@
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Left
+from django.utils import timezone
 from rest_framework import serializers
+from .analytics import GRANULARITIES, count_buckets, resolve_range
+from .export import FORMATS as EXPORT_FORMATS
 from .models import ChatSession, ChatMessage
+from .rag_service import FILTERABLE_FIELDS
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -44,9 +51,147 @@ class ChatSessionListSerializer(serializers.ModelSerializer):
         return None
 
 
+# ---------- Read-only fast paths ----------
+# Plain dicts built from .values() rows, with the same output as the
+# ModelSerializers above but none of their per-field machinery and no
+# per-session queries.  Used by the session list and detail GETs.
+
+MESSAGE_FIELDS = ['id', 'session_id', 'message_type', 'text', 'timestamp', 'rating', 'sources']
+
+
+def _datetime(value):
+    """ISO 8601 like DRF's DateTimeField (current timezone, 'Z' for UTC)."""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def message_data(row: dict) -> dict:
+    """ChatMessageSerializer output for a ``.values(*MESSAGE_FIELDS)`` row."""
+    return {
+        'id': str(row['id']),
+        'session': row['session_id'],
+        'message_type': row['message_type'],
+        'text': row['text'],
+        'timestamp': _datetime(row['timestamp']),
+        'rating': row['rating'],
+        'sources': row['sources'],
+    }
+
+
+def session_detail_data(session: ChatSession) -> dict:
+    """ChatSessionSerializer output, with all messages fetched in one query."""
+    messages = [
+        message_data(row)
+        for row in session.messages.order_by('timestamp').values(*MESSAGE_FIELDS)
+    ]
+    return {
+        'id': str(session.id),
+        'title': session.title,
+        'created_at': _datetime(session.created_at),
+        'updated_at': _datetime(session.updated_at),
+        'messages': messages,
+        'last_message': messages[-1] if messages else None,
+    }
+
+
+def session_list_data(sessions) -> list[dict]:
+    """ChatSessionListSerializer output, counts and previews computed in SQL."""
+    last_text = (
+        ChatMessage.objects
+        .filter(session=OuterRef('pk'))
+        .order_by('-timestamp')
+        .values('text')[:1]
+    )
+    rows = (
+        sessions
+        .annotate(message_count=Count('messages'), last_message_preview=Left(Subquery(last_text), 80))
+        .values('id', 'title', 'created_at', 'updated_at', 'message_count', 'last_message_preview')
+        # Meta.ordering is not applied to GROUP BY queries
+        .order_by(*(sessions.query.order_by or ChatSession._meta.ordering))
+    )
+    return [
+        {
+            'id': str(row['id']),
+            'title': row['title'],
+            'created_at': _datetime(row['created_at']),
+            'updated_at': _datetime(row['updated_at']),
+            'message_count': row['message_count'],
+            'last_message_preview': row['last_message_preview'],
+        }
+        for row in rows
+    ]
+
+
+def validate_filter_dict(value):
+    """Accept ``{field: value}`` or ``{field: [values]}`` on indexed fields only."""
+    unknown = sorted(set(value) - set(FILTERABLE_FIELDS))
+    if unknown:
+        raise serializers.ValidationError(
+            f"Unsupported filter field(s): {', '.join(unknown)}. "
+            f"Allowed: {', '.join(FILTERABLE_FIELDS)}."
+        )
+    for field, match in value.items():
+        values = match if isinstance(match, list) else [match]
+        if not values or not all(isinstance(v, str) and v for v in values):
+            raise serializers.ValidationError(
+                f'Filter "{field}" must be a non-empty string or list of strings.'
+            )
+    return value
+
+
 class SendMessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=4000)
     session_id = serializers.UUIDField(required=False, allow_null=True)
+    filters = serializers.DictField(required=False, allow_empty=True, validators=[validate_filter_dict])
+
+
+class BatchChatSerializer(serializers.Serializer):
+    questions = serializers.ListField(child=serializers.CharField(max_length=4000), allow_empty=False)
+    filters = serializers.DictField(required=False, allow_empty=True, validators=[validate_filter_dict])
+    concurrency = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_questions(self, value):
+        if len(value) > settings.BATCH_MAX_QUESTIONS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_QUESTIONS} questions per batch; '
+                'use the batch_chat management command for larger runs.'
+            )
+        return value
+
+    def validate_concurrency(self, value):
+        return min(value, settings.BATCH_MAX_CONCURRENCY)
+
+
+class AnalyticsRangeSerializer(serializers.Serializer):
+    """``?start=&end=&granularity=`` for the analytics endpoints."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default='day')
+
+    def validate(self, data):
+        start, end = resolve_range(data.get('start'), data.get('end'), data['granularity'])
+        if start >= end:
+            raise serializers.ValidationError('start must be before end.')
+        buckets = count_buckets(start, end, data['granularity'])
+        if buckets > settings.ANALYTICS_MAX_BUCKETS:
+            raise serializers.ValidationError(
+                f"Range has {buckets} {data['granularity']} buckets; at most "
+                f"{settings.ANALYTICS_MAX_BUCKETS} are allowed. Narrow the range or use a coarser granularity."
+            )
+        return data
+
+
+class MessageExportSerializer(serializers.Serializer):
+    """``GET /api/messages/export/`` parameters (``format`` is taken by DRF)."""
+    output = serializers.ChoiceField(choices=EXPORT_FORMATS, default='ndjson')
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    type = serializers.ChoiceField(choices=[t for t, _ in ChatMessage.MESSAGE_TYPES], required=False)
+    gzip = serializers.BooleanField(default=False)
 
 
 class FeedbackSerializer(serializers.Serializer):
@@ -0,0 +1,249 @@
+"""Per-stage tracing of chat requests.
+
+A traced view (see :func:`traced`) records a tree of timed spans: session
+lookup, message inserts, query embedding, vector search, prompt assembly,
+the Ollama call (split into model load, prompt evaluation and generation
+from the durations Ollama reports) and persistence.  Code deeper in the
+pipeline opens spans with :func:`span`, which costs one context-variable
+lookup when no trace is active (batch chat, management commands, requests
+that were not sampled).
+
+Spans are OpenTelemetry SDK spans, batched and exported according to
+``TRACE_EXPORTER``:
+
+- ``otlp``: sent to the OpenTelemetry collector configured by the standard
+  ``OTEL_EXPORTER_OTLP_*`` variables,
+- ``file``: appended to ``TRACE_FILE`` as one OTLP/JSON ``resourceSpans``
+  document per batch (what the collector's file exporter writes, and its
+  ``otlpjsonfile`` receiver reads).  The file is rotated once it would
+  exceed ``TRACE_FILE_MAX_BYTES``, keeping ``TRACE_FILE_BACKUPS`` old files,
+- ``none`` (the default): tracing is off and the SDK is never imported.
+
+The trace id is returned in the ``X-Trace-Id`` response header.
+"""
+import contextvars
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'guardian-backend'
+SCOPE_NAME = 'chat.tracing'
+
+# The innermost open SDK span of the current request, None when not tracing
+_current = contextvars.ContextVar('chat_tracing_span', default=None)
+_tracer_lock = threading.Lock()
+_tracer = None
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _attributes(attributes: dict) -> dict:
+    # The SDK drops None values with a warning
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def get_tracer():
+    """The SDK tracer, built on first use (after Gunicorn forks)."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                if settings.TRACE_EXPORTER == 'otlp':
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                    exporter = OTLPSpanExporter()
+                else:
+                    exporter = file_exporter(
+                        settings.TRACE_FILE, settings.TRACE_FILE_MAX_BYTES, settings.TRACE_FILE_BACKUPS,
+                    )
+                provider = TracerProvider(resource=Resource.create({'service.name': SERVICE_NAME}))
+                provider.add_span_processor(BatchSpanProcessor(exporter))
+                _tracer = provider.get_tracer(SCOPE_NAME)
+    return _tracer
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a child of the current span (if tracing)."""
+    parent = _current.get()
+    if parent is None:
+        yield _NOOP
+        return
+    from opentelemetry import trace as otel_trace
+
+    child = get_tracer().start_span(
+        name, context=otel_trace.set_span_in_context(parent), attributes=_attributes(attributes),
+    )
+    token = _current.set(child)
+    try:
+        # Records exceptions and marks the span as failed
+        with otel_trace.use_span(child, end_on_exit=True):
+            yield child
+    finally:
+        _current.reset(token)
+
+
+def add_span(name: str, start_ns: int, end_ns: int, **attributes):
+    """Record an already-timed child of the current span (e.g. from timings
+    reported by another service)."""
+    parent = _current.get()
+    if parent is None:
+        return
+    from opentelemetry import trace as otel_trace
+
+    child = get_tracer().start_span(
+        name, context=otel_trace.set_span_in_context(parent), attributes=_attributes(attributes), start_time=start_ns,
+    )
+    child.end(end_time=end_ns)
+
+
+def current_trace_id():
+    parent = _current.get()
+    return format(parent.get_span_context().trace_id, '032x') if parent is not None else None
+
+
+def traced(name: str):
+    """Trace a view: sampled by ``TRACE_SAMPLE_RATE`` and exported on return."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.TRACE_EXPORTER == 'none' or random.random() >= settings.TRACE_SAMPLE_RATE:
+                return view(request, *args, **kwargs)
+            from opentelemetry import trace as otel_trace
+            from opentelemetry.trace import SpanKind, Status, StatusCode
+
+            root = get_tracer().start_span(
+                name, kind=SpanKind.SERVER, attributes={'http.method': request.method, 'http.target': request.path},
+            )
+            token = _current.set(root)
+            try:
+                with otel_trace.use_span(root, end_on_exit=True):
+                    response = view(request, *args, **kwargs)
+                    root.set_attribute('http.status_code', response.status_code)
+                    if response.status_code >= 500:
+                        root.set_status(Status(StatusCode.ERROR))
+                    response['X-Trace-Id'] = current_trace_id()
+                    return response
+            finally:
+                _current.reset(token)
+        return wrapper
+    return decorator
+
+
+# ---------- OTLP/JSON file ----------
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def otlp_json(spans) -> dict:
+    """Finished SDK spans as an OTLP/JSON ``TracesData`` document."""
+    encoded = []
+    for s in spans:
+        encoded.append({
+            'traceId': format(s.context.trace_id, '032x'),
+            'spanId': format(s.context.span_id, '016x'),
+            'parentSpanId': format(s.parent.span_id, '016x') if s.parent else '',
+            'name': s.name,
+            # The API's SpanKind counts from 0, OTLP's from 1 (0 is unspecified)
+            'kind': s.kind.value + 1,
+            'startTimeUnixNano': str(s.start_time),
+            'endTimeUnixNano': str(s.end_time),
+            'attributes': [_attribute(k, v) for k, v in s.attributes.items()],
+            'events': [
+                {
+                    'timeUnixNano': str(event.timestamp),
+                    'name': event.name,
+                    'attributes': [_attribute(k, v) for k, v in event.attributes.items()],
+                }
+                for event in s.events
+            ],
+            # UNSET, OK and ERROR have the same values in both
+            'status': {'code': s.status.status_code.value} if s.status.status_code.value else {},
+        })
+    resource = spans[0].resource.attributes if spans else {'service.name': SERVICE_NAME}
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_attribute(k, v) for k, v in resource.items()]},
+        'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': encoded}],
+    }]}
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _rotate(path: str, incoming: int, max_bytes: int, backups: int):
+    """Shift ``path`` to ``path.1`` (``path.1`` to ``path.2``, ...), unless
+    another worker already did while we waited for the lock."""
+    with open(f'{path}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        size = _size(path)
+        if size == 0 or size + incoming <= max_bytes:
+            return
+        if backups == 0:
+            os.remove(path)
+            return
+        for n in range(backups - 1, 0, -1):
+            if os.path.exists(f'{path}.{n}'):
+                os.replace(f'{path}.{n}', f'{path}.{n + 1}')
+        os.replace(path, f'{path}.1')
+
+
+def append_line(path: str, line: bytes, max_bytes: int = 0, backups: int = 0):
+    """Append one line to ``path``, rotating it first if it would grow past
+    ``max_bytes`` (0: never)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if max_bytes and _size(path) + len(line) > max_bytes:
+        _rotate(path, len(line), max_bytes, backups)
+    # A single unbuffered append per line, so workers don't interleave lines
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def file_exporter(path: str, max_bytes: int = 0, backups: int = 0):
+    """An SDK span exporter appending OTLP/JSON lines to ``path``."""
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class OtlpJsonFileExporter(SpanExporter):
+        def export(self, spans):
+            line = (json.dumps(otlp_json(spans), separators=(',', ':')) + '\n').encode()
+            try:
+                append_line(path, line, max_bytes, backups)
+            except OSError as e:
+                logger.warning('Could not write %d spans to %s: %s', len(spans), path, e)
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+    return OtlpJsonFileExporter()
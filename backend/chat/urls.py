@@ -13,12 +13,18 @@ urlpatterns = [
 
     # Chat
     path('chat/', views.send_message, name='send-message'),
+    path('chat/batch/', views.batch_chat, name='batch-chat'),
 
     # Feedback
     path('messages/<uuid:message_id>/feedback/', views.message_feedback, name='message-feedback'),
 
+    # Export
+    path('messages/export/', views.export_messages, name='export-messages'),
+
     # Admin / Ingest
     path('ingest/', views.ingest_data, name='ingest-data'),
+    path('profiles/', views.profile_list, name='profile-list'),
+    path('profiles/<str:profile_id>/', views.profile_detail, name='profile-detail'),
 
     # Analytics
     path('analytics/usage/', views.usage_analytics, name='usage-analytics'),
@@ -0,0 +1,633 @@
+"""In-process vector indexes used as local retrieval backends.
+
+These indexes let ``search_similar`` skip the network hop to the remote
+Qdrant entirely: ``NumpyIndex`` does exact search for corpora that fit in
+RAM, ``HnswIndex`` does approximate search for much larger ones.
+
+Index data is persisted under ``RAG_LOCAL_INDEX_DIR/<backend name>`` as
+immutable "generations" (a directory per write) plus a ``CURRENT`` pointer
+file, so every Gunicorn worker picks up a fresh ingest on its next query
+without ever seeing a half-written index.  Writers hold an exclusive ``flock`` on
+``LOCK`` while they read, modify and publish, so concurrent ``ingest``
+processes don't lose each other's updates.
+"""
+import abc
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from qdrant_client.models import ScoredPoint
+
+from .rag_service import FILTERABLE_FIELDS, RetrievalBackend
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = 'LOCK'
+VECTORS_FILE = 'vectors.npy'
+POINTS_FILE = 'points.json'
+HNSW_FILE = 'index.bin'
+
+# Old generations kept around so that readers still holding them can finish
+KEEP_GENERATIONS = 2
+
+# Rows scored per block when quantized codes are widened to float32
+QUANTIZED_CHUNK = 16384
+
+# Filtered HNSW searches with at most this many matching points are scored
+# exactly instead of walking the graph (mirrors Qdrant's query planner)
+HNSW_EXACT_FILTER_LIMIT = 5000
+
+
+def normalize(vectors) -> np.ndarray:
+    """Return float32 row vectors scaled to unit length (cosine -> dot)."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(vectors: np.ndarray, mode: str) -> np.ndarray:
+    """Compress normalized float32 vectors for candidate scoring.
+
+    ``int8`` maps each component to [-127, 127] using one global scale
+    (the 0.99 quantile of absolute values, as Qdrant does), a 4x saving.
+    ``binary`` keeps only the sign bit, packed 8 per byte: a 32x saving.
+    Both preserve ranking well enough to pick candidates for rescoring.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == 'int8':
+        scale = float(np.quantile(np.abs(vectors), 0.99)) if vectors.size else 1.0
+        return np.clip(np.rint(vectors * (127.0 / (scale or 1.0))), -127, 127).astype(np.int8)
+    if mode == 'binary':
+        return np.packbits(vectors > 0, axis=1)
+    raise ValueError(f'Unknown quantization mode "{mode}"')
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (indices, scores) of the top_k columns of each row, best first.
+
+    Uses ``argpartition`` so the cost is linear in the number of columns;
+    only the k survivors per row are fully sorted.
+    """
+    n = scores.shape[1]
+    k = min(top_k, n)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    if k < n:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(n), (scores.shape[0], 1))
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class _ReadWriteLock:
+    """Any number of readers, or one writer.  Waiting writers go first."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _Snapshot:
+    """Everything a query needs, swapped in as one object on reload."""
+
+    def __init__(self, generation, vectors, ids: list, payloads: list, codes=None):
+        self.generation = generation
+        self.vectors = vectors
+        self.codes = codes
+        self.ids = ids
+        self.payloads = payloads
+        self.live = sum(1 for p in payloads if p is not None)
+        self._field_index = None
+        self._row_of = None
+
+    @property
+    def row_of(self) -> dict:
+        """``{point id: row}`` for live points, built on first lookup."""
+        if self._row_of is None:
+            self._row_of = {
+                pid: row for row, (pid, payload) in enumerate(zip(self.ids, self.payloads))
+                if payload is not None
+            }
+        return self._row_of
+
+    @property
+    def field_index(self) -> dict:
+        """``{field: {value: sorted row array}}`` over ``FILTERABLE_FIELDS``.
+
+        Built on the first filtered query so unfiltered deployments never
+        pay for it.
+        """
+        if self._field_index is None:
+            index = {field: {} for field in FILTERABLE_FIELDS}
+            for row, payload in enumerate(self.payloads):
+                if payload is None:
+                    continue
+                for field in FILTERABLE_FIELDS:
+                    value = payload.get(field)
+                    if value is not None:
+                        index[field].setdefault(value, []).append(row)
+            self._field_index = {
+                field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for field, values in index.items()
+            }
+        return self._field_index
+
+    def matching_rows(self, filters: dict) -> np.ndarray:
+        """Rows whose payload satisfies every filter (a list matches any value)."""
+        matched = None
+        for field, value in filters.items():
+            by_value = self.field_index.get(field)
+            if by_value is None:
+                raise ValueError(f'Cannot filter on unindexed field "{field}"')
+            values = value if isinstance(value, (list, tuple)) else [value]
+            parts = [by_value[v] for v in values if v in by_value]
+            rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+            matched = rows if matched is None else np.intersect1d(matched, rows, assume_unique=True)
+        return matched
+
+
+class _PersistentIndex(RetrievalBackend):
+    """Shared generation/hot-reload machinery for the local indexes.
+
+    Subclasses implement ``_empty_snapshot``, ``_load`` (read a generation
+    directory) and ``_write`` (fill a fresh one).
+    """
+
+    def __init__(self, path, dim: int):
+        # Kept apart per backend: switching RAG_BACKEND must not load the
+        # other's generations
+        self.path = Path(path) / self.name
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._current_mtime = None
+        self._snapshot = self._empty_snapshot()
+
+    def __len__(self):
+        self._maybe_reload()
+        return self._snapshot.live
+
+    @abc.abstractmethod
+    def _empty_snapshot(self) -> _Snapshot:
+        """The snapshot of an index with no points."""
+
+    @abc.abstractmethod
+    def _load(self, generation: str) -> _Snapshot:
+        """Read the generation directory ``generation``."""
+
+    @abc.abstractmethod
+    def _write(self, gen_dir: Path, snapshot: _Snapshot):
+        """Fill the fresh generation directory ``gen_dir`` with ``snapshot``."""
+
+    def ensure_ready(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _read_current(self):
+        try:
+            return (self.path / CURRENT_FILE).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _maybe_reload(self):
+        """Reload from disk if another process published a new generation."""
+        try:
+            mtime = (self.path / CURRENT_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._current_mtime:
+            return
+        with self._lock:
+            self._reload()
+
+    def _reload(self):
+        """Adopt the generation CURRENT points at.  ``self._lock`` must be held."""
+        try:
+            mtime = (self.path / CURRENT_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        # Compared by name, not mtime: two publishes can share a timestamp
+        generation = self._read_current()
+        if generation and generation != self._snapshot.generation:
+            self._snapshot = self._load(generation)
+            logger.info(
+                'Loaded %s index generation %s (%d points).',
+                self.name, generation, len(self._snapshot.ids),
+            )
+        self._current_mtime = mtime
+
+    @contextmanager
+    def _writing(self):
+        """Hold the index for a read-modify-write, across threads and processes.
+
+        Yields the latest published snapshot with ``self._lock`` and an
+        exclusive ``flock`` on ``LOCK`` held, so an update made by another
+        process since this one last read the index is not overwritten.
+        """
+        self.ensure_ready()
+        with self._lock, open(self.path / LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reload()
+                yield self._snapshot
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_points(self, gen_dir: Path) -> dict:
+        with open(gen_dir / POINTS_FILE) as f:
+            return json.load(f)
+
+    def _write_points(self, gen_dir: Path, snapshot: _Snapshot):
+        with open(gen_dir / POINTS_FILE, 'w') as f:
+            json.dump({'ids': snapshot.ids, 'payloads': snapshot.payloads}, f)
+
+    def _publish(self, snapshot: _Snapshot):
+        """Write ``snapshot`` as a new generation and point CURRENT at it.
+
+        Must be called inside ``self._writing()``.
+        """
+        self.ensure_ready()
+        generation = f'gen-{time.time_ns()}'
+        tmp_dir = self.path / f'.{generation}.tmp'
+        tmp_dir.mkdir()
+        self._write(tmp_dir, snapshot)
+        self._write_points(tmp_dir, snapshot)
+        os.replace(tmp_dir, self.path / generation)
+
+        tmp_current = self.path / f'.{CURRENT_FILE}.tmp'
+        tmp_current.write_text(generation)
+        os.replace(tmp_current, self.path / CURRENT_FILE)
+        self._prune_generations()
+        return generation
+
+    def _prune_generations(self):
+        generations = sorted(p for p in self.path.glob('gen-*') if p.is_dir())
+        for old in generations[:-KEEP_GENERATIONS]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def _project(payload: dict, with_payload):
+        if with_payload is True:
+            return payload
+        if not with_payload:
+            return None
+        return {field: payload[field] for field in with_payload if field in payload}
+
+    @staticmethod
+    def _row_vectors(snapshot: _Snapshot, rows) -> np.ndarray:
+        return np.asarray(snapshot.vectors[np.asarray(rows, dtype=np.int64)])
+
+    def _to_points(
+        self, snapshot: _Snapshot, rows, scores, with_payload=True, with_vectors=False,
+    ) -> list[ScoredPoint]:
+        vectors = self._row_vectors(snapshot, rows).tolist() if with_vectors and len(rows) else None
+        return [
+            ScoredPoint(
+                id=snapshot.ids[row],
+                version=0,
+                score=float(score),
+                payload=self._project(snapshot.payloads[row], with_payload),
+                vector=vectors[i] if vectors else None,
+            )
+            for i, (row, score) in enumerate(zip(rows, scores))
+        ]
+
+    def retrieve(self, ids, with_payload=True):
+        self._maybe_reload()
+        snapshot = self._snapshot
+        rows = ((pid, snapshot.row_of.get(pid)) for pid in ids)
+        return {
+            pid: self._project(snapshot.payloads[row], with_payload) or {}
+            for pid, row in rows if row is not None
+        }
+
+
+class NumpyIndex(_PersistentIndex):
+    """Exact cosine search over a normalized float32 matrix.
+
+    Vectors are loaded memory-mapped, so start-up is cheap and all workers
+    on a host share the same page cache.  Queries are scored in one
+    matrix product per batch.  Deletes compact the matrix, so every row
+    is always live.
+
+    With ``quantization`` set to ``int8`` or ``binary`` only the compact
+    codes are held in RAM and scanned; the top ``top_k * oversampling``
+    candidates are then rescored against the memory-mapped float32 rows,
+    so only those pages are ever touched.
+    """
+
+    name = 'numpy'
+
+    def __init__(self, path, dim: int, quantization: str = 'none', oversampling: float = 3.0):
+        self.quantization = quantization
+        self.oversampling = oversampling
+        super().__init__(path, dim)
+
+    def _codes_file(self) -> str:
+        return f'codes-{self.quantization}.npy'
+
+    def _empty_snapshot(self):
+        return _Snapshot(None, np.zeros((0, self.dim), dtype=np.float32), [], [])
+
+    def _load(self, generation):
+        gen_dir = self.path / generation
+        points = self._read_points(gen_dir)
+        vectors = np.load(gen_dir / VECTORS_FILE, mmap_mode='r')
+        codes = None
+        if self.quantization != 'none':
+            codes_path = gen_dir / self._codes_file()
+            # Generations written under another RAG_QUANTIZATION lack the file
+            codes = np.load(codes_path) if codes_path.exists() else quantize(vectors, self.quantization)
+        return _Snapshot(generation, vectors, points['ids'], points['payloads'], codes=codes)
+
+    def _write(self, gen_dir, snapshot):
+        np.save(gen_dir / VECTORS_FILE, snapshot.vectors)
+        if self.quantization != 'none':
+            np.save(gen_dir / self._codes_file(), quantize(snapshot.vectors, self.quantization))
+
+    # ---------- Writes ----------
+
+    def upsert(self, points):
+        with self._writing() as snapshot:
+            ids = list(snapshot.ids)
+            payloads = list(snapshot.payloads)
+            row_of = {pid: row for row, pid in enumerate(ids)}
+            vectors = np.array(snapshot.vectors, dtype=np.float32)
+
+            new_rows = []
+            for point in points:
+                vector = normalize(point.vector)[0]
+                row = row_of.get(point.id)
+                if row is None:
+                    row_of[point.id] = len(ids)
+                    new_rows.append(vector)
+                    ids.append(point.id)
+                    payloads.append(point.payload or {})
+                else:
+                    vectors[row] = vector
+                    payloads[row] = point.payload or {}
+            if new_rows:
+                vectors = np.vstack([vectors, np.stack(new_rows)])
+
+            self._publish(_Snapshot(None, vectors, ids, payloads))
+        # Pick the new generation up (memory-mapped) in this process too
+        self._maybe_reload()
+
+    def delete(self, ids):
+        with self._writing() as snapshot:
+            doomed = set(ids)
+            keep = [row for row, pid in enumerate(snapshot.ids) if pid not in doomed]
+            if len(keep) == len(snapshot.ids):
+                return
+            self._publish(_Snapshot(
+                None,
+                np.asarray(snapshot.vectors[keep], dtype=np.float32),
+                [snapshot.ids[row] for row in keep],
+                [snapshot.payloads[row] for row in keep],
+            ))
+        self._maybe_reload()
+
+    # ---------- Search ----------
+
+    def search_batch(self, vectors, top_k, filters=None, with_payload=True, with_vectors=False):
+        self._maybe_reload()
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return [[] for _ in vectors]
+        queries = normalize(vectors)
+        # Pre-filter: only rows matching the payload filters are scored
+        allowed = snapshot.matching_rows(filters) if filters else None
+        if allowed is not None and not len(allowed):
+            return [[] for _ in vectors]
+        if snapshot.codes is None:
+            matrix = snapshot.vectors if allowed is None else snapshot.vectors[allowed]
+            rows, scores = top_k_rows(queries @ matrix.T, top_k)
+        else:
+            rows, scores = self._rescored_top_k(snapshot, queries, top_k, allowed)
+        if allowed is not None:
+            rows = [allowed[r] for r in rows]
+        return [self._to_points(snapshot, r, s, with_payload, with_vectors) for r, s in zip(rows, scores)]
+
+    def _approximate_scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Score every row from its quantized code (higher is closer)."""
+        if self.quantization == 'binary':
+            query_bits = np.packbits(queries > 0, axis=1)
+            # Negated Hamming distance between sign patterns
+            return np.stack([
+                -np.bitwise_count(codes ^ bits).sum(axis=1, dtype=np.int32) for bits in query_bits
+            ]).astype(np.float32)
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), QUANTIZED_CHUNK):
+            block = codes[start:start + QUANTIZED_CHUNK].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def _rescored_top_k(self, snapshot: _Snapshot, queries: np.ndarray, top_k: int, allowed=None):
+        """Top-k via quantized candidates; row numbers are relative to ``allowed``."""
+        codes = snapshot.codes if allowed is None else snapshot.codes[allowed]
+        vectors = snapshot.vectors if allowed is None else snapshot.vectors[allowed]
+        n_candidates = max(top_k, int(np.ceil(top_k * self.oversampling)))
+        candidates, _ = top_k_rows(self._approximate_scores(codes, queries), n_candidates)
+        rows, scores = [], []
+        for query, cand in zip(queries, candidates):
+            cand = np.sort(cand)  # ascending rows read the memory map sequentially
+            exact = np.asarray(vectors[cand], dtype=np.float32) @ query
+            best, best_scores = top_k_rows(exact[None, :], top_k)
+            rows.append(cand[best[0]])
+            scores.append(best_scores[0])
+        return rows, scores
+
+
+class HnswIndex(_PersistentIndex):
+    """Approximate cosine search with an HNSW graph (hnswlib).
+
+    Each point gets a permanent integer label (its position in
+    ``snapshot.ids``).  Re-upserting an id updates its vector in place and
+    deletes only mark the label, so inserts and deletes never rebuild the
+    graph.  A deleted label keeps a ``None`` payload until it is re-used.
+
+    ``m`` and ``ef_construction`` fix the graph's quality/size trade-off at
+    build time; ``ef`` is the query-time beam width (raise for recall,
+    lower for latency).  hnswlib is only imported by this class, so the
+    other backends work without it.
+
+    Concurrent ``knn_query`` calls are safe with each other but not with
+    inserts, resizes or deletes on the same graph, so searches share a
+    read lock and writers take it exclusively only while they mutate the
+    graph and swap the snapshot, not while they persist it.
+    """
+
+    name = 'hnsw'
+
+    def __init__(self, path, dim: int, m: int = 16, ef_construction: int = 200, ef: int = 64):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._graph_lock = _ReadWriteLock()
+        super().__init__(path, dim)
+
+    def _new_graph(self, capacity: int):
+        import hnswlib
+        graph = hnswlib.Index(space='cosine', dim=self.dim)
+        graph.init_index(max_elements=max(capacity, 1), M=self.m, ef_construction=self.ef_construction)
+        graph.set_ef(self.ef)
+        return graph
+
+    def _empty_snapshot(self):
+        return _Snapshot(None, self._new_graph(1024), [], [])
+
+    def _load(self, generation):
+        import hnswlib
+        gen_dir = self.path / generation
+        points = self._read_points(gen_dir)
+        graph = hnswlib.Index(space='cosine', dim=self.dim)
+        graph.load_index(str(gen_dir / HNSW_FILE), allow_replace_deleted=False)
+        graph.set_ef(self.ef)
+        return _Snapshot(generation, graph, points['ids'], points['payloads'])
+
+    def _write(self, gen_dir, snapshot):
+        snapshot.vectors.save_index(str(gen_dir / HNSW_FILE))
+
+    def _commit(self, snapshot: _Snapshot):
+        """Publish the already adopted ``snapshot`` without re-reading it from disk."""
+        snapshot.generation = self._publish(snapshot)
+        self._current_mtime = (self.path / CURRENT_FILE).stat().st_mtime_ns
+
+    # ---------- Writes ----------
+
+    def upsert(self, points):
+        with self._writing() as snapshot:
+            graph = snapshot.vectors
+            ids = list(snapshot.ids)
+            payloads = list(snapshot.payloads)
+            label_of = {pid: label for label, pid in enumerate(ids)}
+
+            labels, vectors, revived = [], [], []
+            for point in points:
+                label = label_of.get(point.id)
+                if label is None:
+                    label = label_of[point.id] = len(ids)
+                    ids.append(point.id)
+                    payloads.append(point.payload or {})
+                else:
+                    if payloads[label] is None:
+                        revived.append(label)
+                    payloads[label] = point.payload or {}
+                labels.append(label)
+                vectors.append(point.vector)
+
+            updated = _Snapshot(None, graph, ids, payloads)
+            with self._graph_lock.write():
+                for label in revived:
+                    graph.unmark_deleted(label)
+                if len(ids) > graph.get_max_elements():
+                    graph.resize_index(max(len(ids), 2 * graph.get_max_elements()))
+                if labels:
+                    graph.add_items(np.asarray(vectors, dtype=np.float32), np.asarray(labels))
+                self._snapshot = updated
+            self._commit(updated)
+
+    def delete(self, ids):
+        with self._writing() as snapshot:
+            payloads = list(snapshot.payloads)
+            label_of = {pid: label for label, pid in enumerate(snapshot.ids)}
+            doomed = []
+            for pid in ids:
+                label = label_of.get(pid)
+                if label is not None and payloads[label] is not None:
+                    payloads[label] = None
+                    doomed.append(label)
+            if not doomed:
+                return
+            updated = _Snapshot(None, snapshot.vectors, list(snapshot.ids), payloads)
+            with self._graph_lock.write():
+                for label in doomed:
+                    snapshot.vectors.mark_deleted(label)
+                self._snapshot = updated
+            self._commit(updated)
+
+    # ---------- Search ----------
+
+    def search_batch(self, vectors, top_k, filters=None, with_payload=True, with_vectors=False):
+        self._maybe_reload()
+        queries = normalize(vectors)
+        with self._graph_lock.read():
+            snapshot = self._snapshot
+            graph = snapshot.vectors
+            allowed = snapshot.matching_rows(filters) if filters else None
+            k = min(top_k, snapshot.live if allowed is None else len(allowed))
+            if k <= 0:
+                return [[] for _ in vectors]
+            if allowed is not None and len(allowed) <= HNSW_EXACT_FILTER_LIMIT:
+                return self._exact_top_k(snapshot, queries, k, allowed, with_payload, with_vectors)
+            allowed_set = None if allowed is None else set(allowed.tolist())
+            try:
+                labels, distances = graph.knn_query(
+                    queries,
+                    k=k,
+                    filter=None if allowed_set is None else allowed_set.__contains__,
+                )
+            except RuntimeError:
+                # The filtered walk found fewer than k matches within ef
+                if allowed is None:
+                    raise
+                return self._exact_top_k(snapshot, queries, k, allowed, with_payload, with_vectors)
+            # hnswlib's cosine space returns distance = 1 - similarity
+            return [
+                self._to_points(snapshot, l, 1.0 - d, with_payload, with_vectors)
+                for l, d in zip(labels, distances)
+            ]
+
+    def _exact_top_k(
+        self, snapshot: _Snapshot, queries: np.ndarray, k: int, allowed: np.ndarray, with_payload, with_vectors,
+    ):
+        stored = normalize(snapshot.vectors.get_items(allowed, return_type='numpy'))
+        rows, scores = top_k_rows(queries @ stored.T, k)
+        return [
+            self._to_points(snapshot, allowed[r], s, with_payload, with_vectors) for r, s in zip(rows, scores)
+        ]
+
+    @staticmethod
+    def _row_vectors(snapshot, rows):
+        return snapshot.vectors.get_items(rows, return_type='numpy')
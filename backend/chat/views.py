@@ -1,22 +1,40 @@
+import json
 import logging
+import os
 import time
 
-from django.utils import timezone
-from django.db.models import Avg, Count, Sum, Max, Min, Q, F
-from django.db.models.functions import TruncDate, TruncHour
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from . import analytics, analytics_cache, profiling, tracing
+from .conditional import (
+    analytics_etag,
+    analytics_version,
+    conditional,
+    session_detail_etag,
+    session_detail_last_modified,
+    session_list_etag,
+    touch_session,
+)
 from .models import ChatSession, ChatMessage
 from .serializers import (
     ChatSessionSerializer,
-    ChatSessionListSerializer,
     ChatMessageSerializer,
     SendMessageSerializer,
+    BatchChatSerializer,
     FeedbackSerializer,
+    AnalyticsRangeSerializer,
+    MessageExportSerializer,
+    session_detail_data,
+    session_list_data,
 )
-from .rag_service import search_similar
+from .batch import answer_batch
+from .export import CONTENT_TYPES, export_stream
+from .rag_service import retrieve_context
 from .llm_service import generate_response
 
 logger = logging.getLogger(__name__)
@@ -39,7 +57,7 @@ def service_status(request):
 
     # Check Ollama
     try:
-        from .llm_service import get_ollama_client
+        from .ollama_client import get_ollama_client
         client = get_ollama_client()
         client.list()
         statuses['ollama'] = True
@@ -55,22 +73,27 @@ def service_status(request):
     except Exception as e:
         logger.warning('Qdrant not reachable: %s', e)
 
+    from .ollama_client import transport_stats
+    from .rag_service import microbatch_stats
+
     all_connected = all(statuses.values())
     return Response({
         'connected': all_connected,
         'services': statuses,
+        'microbatching': microbatch_stats(),
+        'ollama_transport': transport_stats(),
+        'analytics_cache': analytics_cache.cache_stats(),
     })
 
 
 # ---------- Chat Session CRUD ----------
 
+@conditional(session_list_etag)
 @api_view(['GET', 'POST'])
 def session_list(request):
     """List all sessions or create a new one."""
     if request.method == 'GET':
-        sessions = ChatSession.objects.all()
-        serializer = ChatSessionListSerializer(sessions, many=True)
-        return Response(serializer.data)
+        return Response(session_list_data(ChatSession.objects.all()))
 
     elif request.method == 'POST':
         session = ChatSession.objects.create(title=request.data.get('title', ''))
@@ -78,6 +101,7 @@ def session_list(request):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@conditional(session_detail_etag, session_detail_last_modified)
 @api_view(['GET', 'DELETE'])
 def session_detail(request, session_id):
     """Get or delete a single session."""
@@ -87,11 +111,12 @@ def session_detail(request, session_id):
         return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = ChatSessionSerializer(session)
-        return Response(serializer.data)
+        return Response(session_detail_data(session))
 
     elif request.method == 'DELETE':
-        session.delete()
+        with transaction.atomic():
+            analytics.delete_messages(session.messages.all())
+            session.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -103,13 +128,15 @@ def clear_session(request, session_id):
     except ChatSession.DoesNotExist:
         return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    session.messages.all().delete()
+    analytics.delete_messages(session.messages.all())
+    touch_session(session.id)
     return Response({'status': 'cleared'})
 
 
 # ---------- Send Message (RAG + LLM) ----------
 
 @api_view(['POST'])
+@tracing.traced('chat.send_message')
 def send_message(request):
     """Accept a user message, perform RAG search, generate LLM response."""
     serializer = SendMessageSerializer(data=request.data)
@@ -118,37 +145,41 @@ def send_message(request):
 
     user_text = serializer.validated_data['message']
     session_id = serializer.validated_data.get('session_id')
+    filters = serializer.validated_data.get('filters') or None
 
     # Get or create session
-    if session_id:
-        try:
-            session = ChatSession.objects.get(id=session_id)
-        except ChatSession.DoesNotExist:
-            return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
-    else:
-        # Create a new session, title from first message
-        title = user_text[:60] if len(user_text) > 60 else user_text
-        session = ChatSession.objects.create(title=title)
+    with tracing.span('db.session_lookup', created=not session_id):
+        if session_id:
+            try:
+                session = ChatSession.objects.get(id=session_id)
+            except ChatSession.DoesNotExist:
+                return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            # Create a new session, title from first message
+            title = user_text[:60] if len(user_text) > 60 else user_text
+            session = ChatSession.objects.create(title=title)
 
     # Save user message
-    user_msg = ChatMessage.objects.create(
-        session=session,
-        message_type='user',
-        text=user_text,
-    )
+    with tracing.span('db.insert_user_message'):
+        user_msg = ChatMessage.objects.create(
+            session=session,
+            message_type='user',
+            text=user_text,
+        )
 
-    # RAG: retrieve similar documents (with timing)
+    # RAG: retrieve (and optionally rerank) similar documents, with timing
     t_start = time.time()
     try:
-        context_docs = search_similar(user_text, top_k=3)
+        with tracing.span('rag.retrieve'):
+            context_docs, rag_timings, dropped = retrieve_context(user_text, filters=filters)
     except Exception as e:
         logger.error('RAG search failed: %s', e)
-        context_docs = []
+        context_docs, rag_timings, dropped = [], {}, []
     rag_ms = int((time.time() - t_start) * 1000)
 
     # LLM: generate response (with timing)
     t_llm = time.time()
-    bot_text = generate_response(user_text, context_docs)
+    bot_text, llm_stats = generate_response(user_text, context_docs)
     llm_ms = int((time.time() - t_llm) * 1000)
     total_ms = rag_ms + llm_ms
 
@@ -159,21 +190,27 @@ def send_message(request):
         {'title': d.get('title', ''), 'score': round(d.get('score', 0), 3)}
         for d in context_docs
     ]
-    bot_msg = ChatMessage.objects.create(
-        session=session,
-        message_type='bot',
-        text=bot_text,
-        sources=sources,
-        rag_latency_ms=rag_ms,
-        llm_latency_ms=llm_ms,
-        total_latency_ms=total_ms,
-        top_rag_score=round(top_score, 4),
-    )
+    with tracing.span('db.persist'):
+        bot_msg = ChatMessage.objects.create(
+            session=session,
+            message_type='bot',
+            text=bot_text,
+            sources=sources,
+            rag_latency_ms=rag_ms,
+            rag_timings=rag_timings,
+            effective_k=len(context_docs),
+            dropped_candidates=dropped,
+            llm_latency_ms=llm_ms,
+            total_latency_ms=total_ms,
+            top_rag_score=round(top_score, 4),
+            **llm_stats,
+        )
 
-    # Update session title if it was auto-generated
-    if not session.title:
-        session.title = user_text[:60]
-        session.save(update_fields=['title'])
+        # Update session title if it was auto-generated
+        if not session.title:
+            session.title = user_text[:60]
+            session.save(update_fields=['title'])
+        touch_session(session.id)
 
     return Response({
         'session_id': str(session.id),
@@ -182,23 +219,89 @@ def send_message(request):
     })
 
 
+@api_view(['POST'])
+def batch_chat(request):
+    """Answer a list of questions, streaming one NDJSON line per answer.
+
+    Intended for regression sets and bulk triage: nothing is saved, and
+    lines arrive in completion order (each carries its ``index``).
+    """
+    serializer = BatchChatSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    results = answer_batch(
+        serializer.validated_data['questions'],
+        filters=serializer.validated_data.get('filters') or None,
+        concurrency=serializer.validated_data.get('concurrency'),
+    )
+    response = StreamingHttpResponse(
+        (json.dumps(result) + '\n' for result in results),
+        content_type='application/x-ndjson',
+    )
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ---------- Feedback ----------
 
 @api_view(['PATCH'])
 def message_feedback(request, message_id):
     """Update rating on a bot message (1-5 stars)."""
-    try:
-        message = ChatMessage.objects.get(id=message_id)
-    except ChatMessage.DoesNotExist:
-        return Response({'error': 'Message not found'}, status=status.HTTP_404_NOT_FOUND)
-
     serializer = FeedbackSerializer(data=request.data)
+    with transaction.atomic():
+        # Locked so concurrent ratings (a double click) each see the
+        # other's result, and the rollup is adjusted once per change
+        try:
+            message = ChatMessage.objects.select_for_update().get(id=message_id)
+        except ChatMessage.DoesNotExist:
+            return Response({'error': 'Message not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        old_rating = message.rating
+        message.rating = serializer.validated_data['rating']
+        message.save(update_fields=['rating'])
+        analytics.apply_rating_change(message, old_rating)
+    touch_session(message.session_id)
+    return Response(ChatMessageSerializer(message).data)
+
+
+# ---------- Export ----------
+
+@api_view(['GET'])
+def export_messages(request):
+    """Stream messages with their metrics as CSV or NDJSON (optionally gzipped).
+
+    Query parameters: ``output`` (csv/ndjson), ``start``, ``end`` (ISO 8601),
+    ``type`` (user/bot) and ``gzip``.  Rows are read with a server-side
+    cursor, so memory use does not grow with the export size.
+    """
+    serializer = MessageExportSerializer(data=request.query_params)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    message.rating = serializer.validated_data['rating']
-    message.save(update_fields=['rating'])
-    return Response(ChatMessageSerializer(message).data)
+    params = serializer.validated_data
+
+    fmt = params['output']
+    filename = f'chat_messages.{fmt}'
+    content_type = CONTENT_TYPES[fmt]
+    if params['gzip']:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export_stream(
+            fmt,
+            compress=params['gzip'],
+            start=params.get('start'),
+            end=params.get('end'),
+            message_type=params.get('type'),
+            chunk_size=settings.EXPORT_CHUNK_SIZE,
+        ),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # ---------- Ingest (admin) ----------
@@ -224,8 +327,44 @@ def ingest_data(request):
         )
 
 
+# ---------- Profiles ----------
+
+@api_view(['GET'])
+def profile_list(request):
+    """List stored request profiles, newest first (see chat/profiling.py)."""
+    if not profiling.authorized(request):
+        return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({'profiles': profiling.list_profiles()})
+
+
+@api_view(['GET'])
+def profile_detail(request, profile_id):
+    """Download a profile: the raw file, ``?output=text`` (pstats summary of
+    a cProfile profile) or ``?output=json`` (request details)."""
+    if not profiling.authorized(request):
+        return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+    meta, path = profiling.load_profile(profile_id)
+    output = request.query_params.get('output')
+    if output == 'json':
+        return Response(meta)
+    if output == 'text' and meta['mode'] == 'cprofile':
+        return HttpResponse(profiling.pstats_text(path), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
 # ---------- Analytics ----------
 
+def _analytics_response(request, name, compute):
+    serializer = AnalyticsRangeSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+    bounds = [params[p].isoformat() if params.get(p) else '' for p in ('start', 'end')]
+    key = ':'.join([name, *bounds, params['granularity']])
+    return Response(analytics_cache.get_or_compute(key, analytics_version(request), lambda: compute(**params)))
+
+
+@conditional(analytics_etag)
 @api_view(['GET'])
 def usage_analytics(request):
     """Return usage analytics for the dashboard.
@@ -234,94 +373,18 @@ def usage_analytics(request):
     - Total messages (user + bot)
     - Total sessions
     - Average messages per session
-    - Message counts over time (daily)
+    - Message and session counts over time
     - Rating distribution (1-5 stars)
+
+    Query parameters: ``start``, ``end`` (ISO 8601) and ``granularity``
+    (minute/hour/day/week, default day).  Without a range the series cover
+    the last 30 days and the summary all history.  Archived history is
+    included through the hourly rollups (see chat/analytics.py).
     """
-    from datetime import timedelta
-    
-    # Time range: last 30 days
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=30)
-    
-    # Total counts
-    total_sessions = ChatSession.objects.count()
-    total_messages = ChatMessage.objects.count()
-    total_user_messages = ChatMessage.objects.filter(message_type='user').count()
-    total_bot_messages = ChatMessage.objects.filter(message_type='bot').count()
-    
-    # Average messages per session
-    avg_messages_per_session = round(total_messages / total_sessions, 2) if total_sessions > 0 else 0
-    
-    # Messages over time (daily for last 30 days)
-    messages_by_day = (
-        ChatMessage.objects
-        .filter(timestamp__gte=start_date)
-        .annotate(date=TruncDate('timestamp'))
-        .values('date')
-        .annotate(
-            user_count=Count('id', filter=Q(message_type='user')),
-            bot_count=Count('id', filter=Q(message_type='bot')),
-            total=Count('id'),
-        )
-        .order_by('date')
-    )
-    
-    # Rating distribution (only for bot messages with ratings)
-    bot_messages = ChatMessage.objects.filter(message_type='bot')
-    rating_dist = {
-        '5_stars': bot_messages.filter(rating=5).count(),
-        '4_stars': bot_messages.filter(rating=4).count(),
-        '3_stars': bot_messages.filter(rating=3).count(),
-        '2_stars': bot_messages.filter(rating=2).count(),
-        '1_star': bot_messages.filter(rating=1).count(),
-        'no_rating': bot_messages.filter(rating__isnull=True).count(),
-    }
-    
-    # Calculate average rating
-    rated_messages = bot_messages.filter(rating__isnull=False)
-    avg_rating = rated_messages.aggregate(avg=Avg('rating'))['avg']
-    total_rated = rated_messages.count()
-    
-    # Sessions created over time (daily for last 30 days)
-    sessions_by_day = (
-        ChatSession.objects
-        .filter(created_at__gte=start_date)
-        .annotate(date=TruncDate('created_at'))
-        .values('date')
-        .annotate(count=Count('id'))
-        .order_by('date')
-    )
-    
-    return Response({
-        'summary': {
-            'total_sessions': total_sessions,
-            'total_messages': total_messages,
-            'total_user_messages': total_user_messages,
-            'total_bot_messages': total_bot_messages,
-            'avg_messages_per_session': avg_messages_per_session,
-            'avg_rating': round(avg_rating, 2) if avg_rating else None,
-            'total_rated': total_rated,
-        },
-        'messages_over_time': [
-            {
-                'date': item['date'].isoformat() if item['date'] else None,
-                'user_count': item['user_count'],
-                'bot_count': item['bot_count'],
-                'total': item['total'],
-            }
-            for item in messages_by_day
-        ],
-        'sessions_over_time': [
-            {
-                'date': item['date'].isoformat() if item['date'] else None,
-                'count': item['count'],
-            }
-            for item in sessions_by_day
-        ],
-        'rating_distribution': rating_dist,
-    })
+    return _analytics_response(request, 'usage', analytics.usage_stats)
 
 
+@conditional(analytics_etag)
 @api_view(['GET'])
 def rag_performance_analytics(request):
     """Return RAG performance analytics for the dashboard.
@@ -331,92 +394,11 @@ def rag_performance_analytics(request):
     - Average LLM latency
     - Average total latency
     - Average RAG similarity score
+    - Average number of context documents used (effective k)
     - Latency distribution over time
     - Score distribution
+
+    Takes the same ``start``, ``end`` and ``granularity`` parameters as
+    the usage analytics.
     """
-    from datetime import timedelta
-    
-    # Only analyze bot messages (they have the performance metrics)
-    bot_messages = ChatMessage.objects.filter(message_type='bot')
-    
-    # Overall statistics
-    stats = bot_messages.aggregate(
-        avg_rag_latency=Avg('rag_latency_ms'),
-        avg_llm_latency=Avg('llm_latency_ms'),
-        avg_total_latency=Avg('total_latency_ms'),
-        avg_rag_score=Avg('top_rag_score'),
-        max_rag_latency=Max('rag_latency_ms'),
-        max_llm_latency=Max('llm_latency_ms'),
-        max_total_latency=Max('total_latency_ms'),
-        min_rag_latency=Min('rag_latency_ms'),
-        min_llm_latency=Min('llm_latency_ms'),
-        min_total_latency=Min('total_latency_ms'),
-        max_rag_score=Max('top_rag_score'),
-        min_rag_score=Min('top_rag_score'),
-        total_responses=Count('id'),
-    )
-    
-    # Time range: last 30 days
-    end_date = timezone.now()
-    start_date = end_date - timedelta(days=30)
-    
-    # Latency over time (daily averages)
-    latency_by_day = (
-        bot_messages
-        .filter(timestamp__gte=start_date)
-        .annotate(date=TruncDate('timestamp'))
-        .values('date')
-        .annotate(
-            avg_rag=Avg('rag_latency_ms'),
-            avg_llm=Avg('llm_latency_ms'),
-            avg_total=Avg('total_latency_ms'),
-            avg_score=Avg('top_rag_score'),
-            count=Count('id'),
-        )
-        .order_by('date')
-    )
-    
-    # Score distribution (buckets)
-    score_buckets = {
-        'excellent': bot_messages.filter(top_rag_score__gte=0.7).count(),
-        'good': bot_messages.filter(top_rag_score__gte=0.5, top_rag_score__lt=0.7).count(),
-        'fair': bot_messages.filter(top_rag_score__gte=0.3, top_rag_score__lt=0.5).count(),
-        'poor': bot_messages.filter(top_rag_score__lt=0.3).count(),
-    }
-    
-    # Latency distribution (buckets in ms)
-    latency_buckets = {
-        'fast': bot_messages.filter(total_latency_ms__lt=5000).count(),       # < 5s
-        'normal': bot_messages.filter(total_latency_ms__gte=5000, total_latency_ms__lt=30000).count(),  # 5-30s
-        'slow': bot_messages.filter(total_latency_ms__gte=30000, total_latency_ms__lt=60000).count(),   # 30-60s
-        'very_slow': bot_messages.filter(total_latency_ms__gte=60000).count(),  # > 60s
-    }
-    
-    return Response({
-        'summary': {
-            'total_responses': stats['total_responses'] or 0,
-            'avg_rag_latency_ms': round(stats['avg_rag_latency'] or 0, 2),
-            'avg_llm_latency_ms': round(stats['avg_llm_latency'] or 0, 2),
-            'avg_total_latency_ms': round(stats['avg_total_latency'] or 0, 2),
-            'avg_rag_score': round(stats['avg_rag_score'] or 0, 4),
-            'max_rag_latency_ms': stats['max_rag_latency'] or 0,
-            'max_llm_latency_ms': stats['max_llm_latency'] or 0,
-            'min_rag_latency_ms': stats['min_rag_latency'] or 0,
-            'min_llm_latency_ms': stats['min_llm_latency'] or 0,
-            'max_rag_score': round(stats['max_rag_score'] or 0, 4),
-            'min_rag_score': round(stats['min_rag_score'] or 0, 4),
-        },
-        'latency_over_time': [
-            {
-                'date': item['date'].isoformat() if item['date'] else None,
-                'avg_rag_ms': round(item['avg_rag'] or 0, 2),
-                'avg_llm_ms': round(item['avg_llm'] or 0, 2),
-                'avg_total_ms': round(item['avg_total'] or 0, 2),
-                'avg_score': round(item['avg_score'] or 0, 4),
-                'count': item['count'],
-            }
-            for item in latency_by_day
-        ],
-        'score_distribution': score_buckets,
-        'latency_distribution': latency_buckets,
-    })
+    return _analytics_response(request, 'rag', analytics.rag_stats)
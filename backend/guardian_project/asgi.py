@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "guardian_project.settings")
+# Lets settings switch from per-thread persistent connections to pooling
+os.environ.setdefault("DJANGO_SERVER_INTERFACE", "asgi")
 
 application = get_asgi_application()
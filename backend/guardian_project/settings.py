@@ -24,6 +24,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'chat.metrics.MetricsMiddleware',
+    'chat.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +58,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'guardian_project.wsgi.application'
 
+# Database connections.  By default each worker keeps its connection open
+# for PG_CONN_MAX_AGE seconds (checked with a cheap query before reuse when
+# PG_CONN_HEALTH_CHECKS is on) instead of reconnecting on every request.
+# PG_POOL=True uses psycopg 3's connection pool instead (requires
+# "psycopg[binary,pool]"), which is also the only way to reuse connections
+# under ASGI: there each request runs in a different thread, so persistent
+# per-thread connections would pile up and are disabled.
+ASGI = os.environ.get('DJANGO_SERVER_INTERFACE') == 'asgi'
+PG_POOL = os.environ.get('PG_POOL', 'False').lower() in ('true', '1', 'yes')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -64,12 +76,73 @@ DATABASES = {
         'PASSWORD': os.environ.get('PG_DB_PASSWORD', 'guardian_pass'),
         'HOST': os.environ.get('PG_DB_HOST', 'localhost'),
         'PORT': os.environ.get('PG_DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if PG_POOL or ASGI else int(os.environ.get('PG_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('PG_CONN_HEALTH_CHECKS', 'True').lower() in ('true', '1', 'yes'),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('PG_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+if PG_POOL:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured('PG_POOL=True requires psycopg 3: pip install "psycopg[binary,pool]"') from e
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('PG_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('PG_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.environ.get('PG_POOL_TIMEOUT', '10')),
+    }
+
+# Cache shared by all workers when REDIS_URL is set (requires the redis
+# package); otherwise each process has its own in-memory cache.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    try:
+        import redis  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured('REDIS_URL requires redis: pip install redis') from e
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'guardian',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Analytics payloads are cached for ANALYTICS_CACHE_TTL seconds (0 disables)
+# under a version read from the database, so writes take effect in every
+# worker at once, shared cache or not; concurrent misses wait up to
+# ANALYTICS_CACHE_LOCK_TIMEOUT seconds for a single recompute.
+ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', '30'))
+ANALYTICS_CACHE_LOCK_TIMEOUT = float(os.environ.get('ANALYTICS_CACHE_LOCK_TIMEOUT', '10'))
+# Largest number of time buckets one analytics request may ask for (e.g.
+# 1500 minutes ~ 25 hours, 1500 hours ~ 62 days); stops accidental full scans
+ANALYTICS_MAX_BUCKETS = int(os.environ.get('ANALYTICS_MAX_BUCKETS', '1500'))
+
+# JSON renderer for API responses: 'drf' (DRF's JSONRenderer) or 'orjson'
+# (same output, much faster on large sessions and analytics payloads;
+# requires "pip install orjson")
+API_JSON_RENDERER = os.environ.get('API_JSON_RENDERER', 'drf')
+if API_JSON_RENDERER == 'orjson':
+    try:
+        import orjson  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured('API_JSON_RENDERER=orjson requires orjson: pip install orjson') from e
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'chat.renderers.ORJSONRenderer' if API_JSON_RENDERER == 'orjson' else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -91,11 +164,151 @@ OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.1')
 OLLAMA_EMBED_MODEL = os.environ.get('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
 
+# Shared Ollama HTTP client: pooled keep-alive connections, timeouts
+# (generation can be slow, so the read timeout is long), HTTP/2 when the
+# server is behind TLS, and jittered retries of failed connections.
+OLLAMA_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', '10'))
+OLLAMA_KEEPALIVE_S = float(os.environ.get('OLLAMA_KEEPALIVE_S', '60'))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '5'))
+OLLAMA_READ_TIMEOUT = float(os.environ.get('OLLAMA_READ_TIMEOUT', '300'))
+OLLAMA_HTTP2 = os.environ.get('OLLAMA_HTTP2', 'True').lower() in ('true', '1', 'yes')
+OLLAMA_RETRIES = int(os.environ.get('OLLAMA_RETRIES', '2'))
+OLLAMA_RETRY_BACKOFF_S = float(os.environ.get('OLLAMA_RETRY_BACKOFF_S', '0.2'))
+
 # Qdrant configuration
 QDRANT_HOST = os.environ.get('QDRANT_HOST', 'localhost')
 QDRANT_PORT = int(os.environ.get('QDRANT_PORT', '6333'))
 QDRANT_COLLECTION = os.environ.get('QDRANT_COLLECTION', 'guardian_incidents')
 
+# Qdrant transport: gRPC (QDRANT_GRPC_PORT) avoids JSON-encoding vectors.
+# QDRANT_POOL_SIZE is gRPC channels or pooled REST connections; idle
+# connections are kept alive (pinged, for gRPC) every QDRANT_KEEPALIVE_S.
+QDRANT_PREFER_GRPC = os.environ.get('QDRANT_PREFER_GRPC', 'False').lower() in ('true', '1', 'yes')
+QDRANT_GRPC_PORT = int(os.environ.get('QDRANT_GRPC_PORT', '6334'))
+QDRANT_POOL_SIZE = int(os.environ.get('QDRANT_POOL_SIZE', '4'))
+QDRANT_KEEPALIVE_S = float(os.environ.get('QDRANT_KEEPALIVE_S', '30'))
+QDRANT_TIMEOUT = int(os.environ.get('QDRANT_TIMEOUT', '10'))
+
+# Retrieval backend: 'qdrant' (remote collection), 'numpy' (exact in-process
+# index) or 'hnsw' (approximate in-process index for large corpora)
+RAG_BACKEND = os.environ.get('RAG_BACKEND', 'qdrant')
+RAG_LOCAL_INDEX_DIR = os.environ.get('RAG_LOCAL_INDEX_DIR', str(BASE_DIR / 'vector_index'))
+RAG_HNSW_M = int(os.environ.get('RAG_HNSW_M', '16'))
+RAG_HNSW_EF_CONSTRUCTION = int(os.environ.get('RAG_HNSW_EF_CONSTRUCTION', '200'))
+RAG_HNSW_EF = int(os.environ.get('RAG_HNSW_EF', '64'))
+if RAG_BACKEND == 'hnsw':
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured('RAG_BACKEND=hnsw requires hnswlib: pip install hnswlib') from e
+
+# Vector quantization: 'none', 'int8' (scalar) or 'binary'.  Quantized
+# candidates are oversampled by this factor, then rescored with float32.
+RAG_QUANTIZATION = os.environ.get('RAG_QUANTIZATION', 'none')
+RAG_QUANTIZATION_OVERSAMPLING = float(os.environ.get('RAG_QUANTIZATION_OVERSAMPLING', '3.0'))
+
+# Document content kept in-process so prompts don't refetch it (keyed on a
+# content hash stored at ingest, so re-ingests in other workers are seen)
+RAG_CONTENT_CACHE_SIZE = int(os.environ.get('RAG_CONTENT_CACHE_SIZE', '1024'))
+
+# Micro-batching: concurrent query embeddings and vector searches in one
+# process wait up to RAG_MICROBATCH_WINDOW_MS (0 disables) to be sent as a
+# single batched call of at most RAG_MICROBATCH_MAX_SIZE items.  Needs
+# threaded workers (GUNICORN_THREADS > 1) to have anything to batch.
+RAG_MICROBATCH_WINDOW_MS = float(os.environ.get('RAG_MICROBATCH_WINDOW_MS', '0'))
+RAG_MICROBATCH_MAX_SIZE = int(os.environ.get('RAG_MICROBATCH_MAX_SIZE', '32'))
+
+# Number of documents passed to the LLM per chat message: up to RAG_TOP_K,
+# or RAG_MIN_K when the best hit scores at least RAG_CONFIDENT_SCORE.
+# Candidates below RAG_MIN_SCORE, or after a drop between consecutive
+# scores larger than RAG_MAX_SCORE_GAP x the top score, are never used.
+RAG_TOP_K = int(os.environ.get('RAG_TOP_K', '3'))
+RAG_MIN_K = int(os.environ.get('RAG_MIN_K', '1'))
+RAG_CONFIDENT_SCORE = float(os.environ.get('RAG_CONFIDENT_SCORE', '1.0'))
+RAG_MIN_SCORE = float(os.environ.get('RAG_MIN_SCORE', '0.0'))
+RAG_MAX_SCORE_GAP = float(os.environ.get('RAG_MAX_SCORE_GAP', '1.0'))
+
+# Fallback answers (Ollama unavailable): below RAG_LOW_RELEVANCE_SCORE the
+# best match is flagged as possibly unrelated; other docs are listed as
+# related incidents above RAG_RELATED_SCORE.
+RAG_LOW_RELEVANCE_SCORE = float(os.environ.get('RAG_LOW_RELEVANCE_SCORE', '0.05'))
+RAG_RELATED_SCORE = float(os.environ.get('RAG_RELATED_SCORE', '0.1'))
+
+# Batch chat (POST /api/chat/batch/ and the batch_chat command): questions
+# per request and parallel LLM generations (keep <= OLLAMA_NUM_PARALLEL).
+# Gunicorn kills a sync worker after GUNICORN_TIMEOUT, so by default an HTTP
+# batch is capped at what one-at-a-time generation (~20 s per warm answer)
+# finishes within it; the batch_chat command has no limit, use it for bulk runs.
+BATCH_MAX_QUESTIONS = int(os.environ.get('BATCH_MAX_QUESTIONS', int(os.environ.get('GUNICORN_TIMEOUT', '300')) // 20))
+BATCH_LLM_CONCURRENCY = int(os.environ.get('BATCH_LLM_CONCURRENCY', '4'))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', '16'))
+
+# Reranking: 'none', 'lexical' (term overlap) or 'cross-encoder' (CPU model).
+# RAG_RERANK_CANDIDATES are fetched and reranked in batches while the next
+# batch's estimated cost fits in the latency budget.  The cross-encoder is
+# loaded when a Gunicorn worker starts; requests skip reranking until then.
+RAG_RERANKER = os.environ.get('RAG_RERANKER', 'none')
+RAG_RERANK_CANDIDATES = int(os.environ.get('RAG_RERANK_CANDIDATES', '50'))
+RAG_RERANK_BATCH_SIZE = int(os.environ.get('RAG_RERANK_BATCH_SIZE', '16'))
+RAG_RERANK_BUDGET_MS = float(os.environ.get('RAG_RERANK_BUDGET_MS', '250'))
+RAG_CROSS_ENCODER_MODEL = os.environ.get('RAG_CROSS_ENCODER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+
+# Diversification: Maximal Marginal Relevance over RAG_MMR_CANDIDATES
+# (lambda 1.0 = relevance only) and collapsing of near-identical chunks
+# (cosine >= RAG_DEDUP_THRESHOLD; 1.0 disables).
+RAG_MMR_LAMBDA = float(os.environ.get('RAG_MMR_LAMBDA', '1.0'))
+RAG_MMR_CANDIDATES = int(os.environ.get('RAG_MMR_CANDIDATES', '20'))
+RAG_DEDUP_THRESHOLD = float(os.environ.get('RAG_DEDUP_THRESHOLD', '1.0'))
+
+# Rows fetched per server-side cursor round trip by message exports
+# (GET /api/messages/export/ and the export_messages command)
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
+# Message retention: "manage.py archive_messages" rolls up, archives
+# (CHAT_ARCHIVE_FORMAT: jsonl.gz or parquet) and deletes whole months older
+# than CHAT_RETENTION_DAYS (0 disables).  With a partitioned message table
+# ("manage.py partition_messages --convert"), CHAT_PARTITION_MONTHS_AHEAD
+# months of empty partitions are kept ready.
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', '365'))
+CHAT_ARCHIVE_DIR = os.environ.get('CHAT_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+CHAT_ARCHIVE_FORMAT = os.environ.get('CHAT_ARCHIVE_FORMAT', 'jsonl.gz')
+CHAT_PARTITION_MONTHS_AHEAD = int(os.environ.get('CHAT_PARTITION_MONTHS_AHEAD', '3'))
+
+# Per-stage tracing of chat requests (chat/tracing.py): 'otlp' sends spans
+# to the OpenTelemetry collector at OTEL_EXPORTER_OTLP_ENDPOINT, 'file'
+# appends them to TRACE_FILE as OTLP/JSON lines (rotated at
+# TRACE_FILE_MAX_BYTES, keeping TRACE_FILE_BACKUPS old files), 'none' (the
+# default without a collector) disables tracing.  TRACE_SAMPLE_RATE is the
+# fraction of requests traced.
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'otlp' if os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT') else 'none')
+TRACE_FILE = os.environ.get('TRACE_FILE', str(BASE_DIR / 'traces' / 'traces.jsonl'))
+TRACE_FILE_MAX_BYTES = int(os.environ.get('TRACE_FILE_MAX_BYTES', str(100 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.environ.get('TRACE_FILE_BACKUPS', '3'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+if TRACE_EXPORTER != 'none':
+    try:
+        import opentelemetry.sdk  # noqa: F401
+        if TRACE_EXPORTER == 'otlp':
+            import opentelemetry.exporter.otlp.proto.http.trace_exporter  # noqa: F401
+    except ImportError as e:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            f'TRACE_EXPORTER={TRACE_EXPORTER} requires the OpenTelemetry SDK: '
+            'pip install opentelemetry-sdk opentelemetry-exporter-otlp-proto-http'
+        ) from e
+
+# On-demand request profiling (chat/profiling.py), off unless PROFILE_TOKEN
+# is set: requests sent with "X-Profile: cprofile|sample" and
+# "X-Profile-Token: <PROFILE_TOKEN>", plus PROFILE_SAMPLE_RATE of all
+# requests with the low-overhead stack sampler.  The newest
+# PROFILE_MAX_FILES profiles are kept in PROFILE_DIR.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '200'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -0,0 +1,15 @@
+"""Gunicorn settings loaded by docker/entrypoint-backend.sh (command-line flags override)."""
+import os
+
+
+def post_worker_init(worker):
+    # Load the cross-encoder (if configured) before requests need it
+    from chat.rerank import warm_up
+    warm_up()
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges from the shared Prometheus metrics
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
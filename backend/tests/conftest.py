@@ -0,0 +1,14 @@
+"""Helpers shared by the unit tests."""
+
+
+def make_docs(*scores, titles=()):
+    """Retrieval candidates with ids 0, 1, ... in order.
+
+    Each doc gets the given vector ``score`` (0.5 when only ``titles`` are
+    given) and title (``doc <id>`` by default).
+    """
+    count = max(len(scores), len(titles))
+    return [
+        {'id': i, 'score': scores[i] if scores else 0.5, 'title': titles[i] if titles else f'doc {i}'}
+        for i in range(count)
+    ]
@@ -142,6 +142,7 @@ class TestAnalyticsRAGPerformanceAPI:
             'avg_llm_latency_ms',
             'avg_total_latency_ms',
             'avg_rag_score',
+            'avg_effective_k',
             'max_rag_latency_ms',
             'max_llm_latency_ms',
             'min_rag_latency_ms',
@@ -174,6 +175,26 @@ class TestAnalyticsRAGPerformanceAPI:
         else:
             print("✓ Latency over time is empty (no data yet)")
     
+    def test_rag_analytics_llm_summary(self):
+        """Test llm_summary structure (Ollama token counts and throughput)"""
+        response = requests.get(f"{BASE_URL}/api/analytics/rag/")
+        data = response.json()
+
+        assert 'llm_summary' in data
+        llm = data['llm_summary']
+
+        required_fields = [
+            'generated_responses', 'avg_prompt_tokens', 'avg_completion_tokens',
+            'prompt_tokens_per_second', 'tokens_per_second',
+            'avg_prompt_eval_ms', 'avg_eval_ms', 'avg_load_ms', 'max_load_ms', 'cold_loads',
+        ]
+        for field in required_fields:
+            assert field in llm, f"Missing field: {field}"
+            assert llm[field] >= 0
+        assert llm['generated_responses'] <= data['summary']['total_responses']
+
+        print(f"✓ LLM summary valid: {llm}")
+
     def test_rag_analytics_score_distribution(self):
         """Test score_distribution structure"""
         response = requests.get(f"{BASE_URL}/api/analytics/rag/")
@@ -205,6 +226,40 @@ class TestAnalyticsRAGPerformanceAPI:
         print(f"✓ Latency distribution valid: {latency}")
 
 
+class TestAnalyticsRangeParams:
+    """Tests for start / end / granularity on both analytics endpoints"""
+
+    def test_hourly_range(self):
+        """Hourly buckets over the last day"""
+        from datetime import datetime, timedelta, timezone
+        start = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        for endpoint, series in (('usage', 'messages_over_time'), ('rag', 'latency_over_time')):
+            response = requests.get(f"{BASE_URL}/api/analytics/{endpoint}/", params={'start': start, 'granularity': 'hour'})
+            assert response.status_code == 200
+            data = response.json()
+            assert data['range']['granularity'] == 'hour'
+            for item in data[series]:
+                assert item['date'].endswith(':00:00+00:00')
+        print("✓ Hourly analytics range valid")
+
+    def test_too_many_buckets_rejected(self):
+        """Minute buckets over the default 30 days exceed the bucket limit"""
+        response = requests.get(f"{BASE_URL}/api/analytics/usage/", params={'granularity': 'minute'})
+        assert response.status_code == 400
+        print("✓ Oversized analytics range rejected")
+
+    def test_invalid_params_rejected(self):
+        """Unknown granularity and inverted ranges return 400"""
+        response = requests.get(f"{BASE_URL}/api/analytics/rag/", params={'granularity': 'month'})
+        assert response.status_code == 400
+        assert 'granularity' in response.json()
+        response = requests.get(f"{BASE_URL}/api/analytics/rag/", params={
+            'start': '2026-01-02T00:00:00Z', 'end': '2026-01-01T00:00:00Z',
+        })
+        assert response.status_code == 400
+        print("✓ Invalid analytics params rejected")
+
+
 class TestSessionsAPI:
     """Tests for sessions endpoints"""
     
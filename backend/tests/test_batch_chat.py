@@ -0,0 +1,66 @@
+"""
+Backend API Tests for batch question answering
+Tests: POST /api/chat/batch/ validation and NDJSON streaming
+"""
+import json
+
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestBatchChat:
+    """Tests for POST /api/chat/batch/"""
+
+    def test_empty_questions_rejected(self):
+        response = requests.post(f"{BASE_URL}/api/chat/batch/", json={"questions": []})
+        assert response.status_code == 400
+        assert 'questions' in response.json()
+        print("✓ Empty batch rejected")
+
+    def test_oversized_batch_rejected(self):
+        response = requests.post(f"{BASE_URL}/api/chat/batch/", json={"questions": ["TEST_batch"] * 1000})
+        assert response.status_code == 400
+        assert 'batch_chat' in response.json()['questions'][0]
+        print("✓ Oversized batch rejected")
+
+    def test_invalid_filter_rejected(self):
+        response = requests.post(f"{BASE_URL}/api/chat/batch/", json={
+            "questions": ["TEST_batch"],
+            "filters": {"owner": "ops"},
+        })
+        assert response.status_code == 400
+        assert 'filters' in response.json()
+        print("✓ Invalid batch filter rejected")
+
+    def test_streams_one_line_per_question(self):
+        questions = ["TEST_batch database connection timeout", "TEST_batch SSL handshake failure"]
+        response = requests.post(f"{BASE_URL}/api/chat/batch/", json={
+            "questions": questions,
+            "concurrency": 2,
+        }, stream=True, timeout=300)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('application/x-ndjson')
+
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        results, summary = lines[:-1], lines[-1]
+        assert sorted(r['index'] for r in results) == [0, 1]
+        for result in results:
+            assert result['question'] == questions[result['index']]
+            assert result['answer']
+            assert {'rag_ms', 'llm_ms', 'total_ms'} <= set(result['timings'])
+        assert summary['done'] is True
+        assert summary['count'] == 2
+        print(f"✓ Batch of {len(questions)} answered in {summary['total_ms']} ms")
+
+    def test_batch_not_persisted(self):
+        """Batch answers do not create chat sessions"""
+        before = len(requests.get(f"{BASE_URL}/api/sessions/").json())
+        response = requests.post(f"{BASE_URL}/api/chat/batch/", json={
+            "questions": ["TEST_batch no persistence"],
+        }, timeout=300)
+        assert response.status_code == 200
+        after = len(requests.get(f"{BASE_URL}/api/sessions/").json())
+        assert after == before
+        print("✓ Batch chat created no sessions")
@@ -0,0 +1,49 @@
+"""
+Backend API Tests for conditional GET
+Tests: ETag / 304 Not Modified on sessions and analytics endpoints
+"""
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+ENDPOINTS = ['/api/sessions/', '/api/analytics/usage/', '/api/analytics/rag/']
+
+
+class TestConditionalGet:
+    """ETag validators are returned and honoured"""
+
+    def test_etag_and_304(self):
+        for endpoint in ENDPOINTS:
+            response = requests.get(f"{BASE_URL}{endpoint}")
+            assert response.status_code == 200
+            etag = response.headers.get('ETag')
+            assert etag, f"{endpoint} has no ETag"
+            assert 'no-cache' in response.headers.get('Cache-Control', '')
+
+            cached = requests.get(f"{BASE_URL}{endpoint}", headers={'If-None-Match': etag})
+            assert cached.status_code == 304, f"{endpoint} did not return 304"
+            assert cached.content == b''
+        print("✓ ETag / 304 on sessions and analytics")
+
+    def test_session_detail_changes_after_rating(self):
+        session = requests.post(f"{BASE_URL}/api/sessions/", json={"title": "TEST_etag"}).json()
+        url = f"{BASE_URL}/api/sessions/{session['id']}/"
+        try:
+            response = requests.get(url)
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            assert response.headers.get('Last-Modified')
+            assert requests.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}/clear/")
+            assert requests.get(url, headers={'If-None-Match': etag}).status_code == 200
+            print("✓ Session ETag changes after a write")
+        finally:
+            requests.delete(url)
+
+    def test_stale_etag_returns_body(self):
+        response = requests.get(f"{BASE_URL}/api/sessions/", headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+        print("✓ Stale ETag returns full body")
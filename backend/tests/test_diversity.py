@@ -0,0 +1,45 @@
+"""
+Tests for MMR diversification (chat/diversity.py)
+Tests: relevance order at lambda=1, diversity at low lambda, near-duplicate collapsing
+"""
+from chat.diversity import mmr_select
+from conftest import make_docs
+
+# Two near-identical incidents and one distinct one
+VECTORS = [[1.0, 0.0, 0.0], [0.99, 0.05, 0.0], [0.6, 0.8, 0.0]]
+
+
+class TestMmrSelect:
+    def test_lambda_one_keeps_relevance_order(self):
+        selected, collapsed = mmr_select(make_docs(0.9, 0.85, 0.6), VECTORS, 2, lambda_mult=1.0)
+        assert [d['id'] for d in selected] == [0, 1]
+        assert collapsed == []
+
+    def test_low_lambda_prefers_distinct_doc(self):
+        selected, _ = mmr_select(make_docs(0.9, 0.85, 0.6), VECTORS, 2, lambda_mult=0.5)
+        assert [d['id'] for d in selected] == [0, 2]
+
+    def test_rerank_score_used_as_relevance(self):
+        docs = make_docs(0.9, 0.85, 0.6)
+        for doc, value in zip(docs, [0.1, 0.2, 0.9]):
+            doc['rerank_score'] = value
+        selected, _ = mmr_select(docs, VECTORS, 1, lambda_mult=1.0)
+        assert selected[0]['id'] == 2
+
+    def test_partly_reranked_uses_order(self):
+        """A budget-cut rerank leaves scores on two scales; their order decides."""
+        docs = make_docs(0.2, 0.9, 0.85)
+        docs[0]['rerank_score'] = 0.3
+        selected, _ = mmr_select(docs, VECTORS, 3, lambda_mult=1.0)
+        assert [d['id'] for d in selected] == [0, 1, 2]
+
+    def test_near_duplicates_collapsed(self):
+        selected, collapsed = mmr_select(
+            make_docs(0.9, 0.85, 0.6), VECTORS, 3, lambda_mult=1.0, dedup_threshold=0.95,
+        )
+        assert [d['id'] for d in selected] == [0, 2]
+        assert [d['id'] for d in collapsed] == [1]
+        assert selected[0]['duplicates'] == 1
+
+    def test_empty(self):
+        assert mmr_select([], [], 3) == ([], [])
@@ -0,0 +1,45 @@
+"""
+Backend API Tests for message export
+Tests: GET /api/messages/export/ formats, filters and gzip
+"""
+import csv
+import gzip
+import io
+import json
+
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestMessageExport:
+    """Tests for GET /api/messages/export/"""
+
+    def test_ndjson_export(self):
+        response = requests.get(f"{BASE_URL}/api/messages/export/", params={'type': 'bot'}, stream=True)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('application/x-ndjson')
+        for line in response.iter_lines():
+            if line:
+                row = json.loads(line)
+                assert row['message_type'] == 'bot'
+                assert 'total_latency_ms' in row and 'sources' in row
+        print("✓ NDJSON export valid")
+
+    def test_csv_gzip_export(self):
+        response = requests.get(f"{BASE_URL}/api/messages/export/", params={'output': 'csv', 'gzip': 'true'})
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/gzip'
+        assert 'chat_messages.csv.gz' in response.headers['Content-Disposition']
+        rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode('utf-8'))))
+        assert rows[0][:3] == ['id', 'session_id', 'message_type']
+        print(f"✓ CSV gzip export valid ({len(rows) - 1} rows)")
+
+    def test_invalid_params_rejected(self):
+        response = requests.get(f"{BASE_URL}/api/messages/export/", params={'output': 'xml'})
+        assert response.status_code == 400
+        assert 'output' in response.json()
+        response = requests.get(f"{BASE_URL}/api/messages/export/", params={'type': 'admin'})
+        assert response.status_code == 400
+        print("✓ Invalid export params rejected")
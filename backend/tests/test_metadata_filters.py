@@ -0,0 +1,68 @@
+"""
+Backend API Tests for metadata-filtered retrieval
+Tests: POST /api/chat/ "filters" validation and filtered responses
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestChatFilters:
+    """Tests for the optional filters body field on POST /api/chat/"""
+
+    @pytest.fixture
+    def cleanup_sessions(self):
+        created = []
+        yield created
+        for session_id in created:
+            try:
+                requests.delete(f"{BASE_URL}/api/sessions/{session_id}/")
+            except:
+                pass
+
+    def test_unknown_filter_field_rejected(self):
+        """Filtering on a non-indexed field is a 400"""
+        response = requests.post(f"{BASE_URL}/api/chat/", json={
+            "message": "TEST_filter_unknown_field",
+            "filters": {"owner": "ops"},
+        })
+        assert response.status_code == 400
+        assert 'filters' in response.json()
+        print("✓ Unknown filter field rejected")
+
+    def test_non_string_filter_value_rejected(self):
+        """Filter values must be strings or lists of strings"""
+        for bad in (5, [], [1, 2], {"nested": "dict"}):
+            response = requests.post(f"{BASE_URL}/api/chat/", json={
+                "message": "TEST_filter_bad_value",
+                "filters": {"severity": bad},
+            })
+            assert response.status_code == 400, f"Expected 400 for {bad!r}"
+        print("✓ Invalid filter values rejected")
+
+    def test_single_value_filter(self, cleanup_sessions):
+        """A valid filter still produces a bot response"""
+        response = requests.post(f"{BASE_URL}/api/chat/", json={
+            "message": "TEST_filter database connection timeout",
+            "filters": {"severity": "Critical"},
+        }, timeout=120)
+        assert response.status_code == 200
+        data = response.json()
+        cleanup_sessions.append(data['session_id'])
+        assert data['bot_message']['message_type'] == 'bot'
+        assert len(data['bot_message']['sources']) <= 3
+        print(f"✓ Filtered chat returned {len(data['bot_message']['sources'])} sources")
+
+    def test_filter_with_no_matches(self, cleanup_sessions):
+        """A filter matching nothing yields no sources rather than an error"""
+        response = requests.post(f"{BASE_URL}/api/chat/", json={
+            "message": "TEST_filter no matches",
+            "filters": {"error_code": "TEST-DOES-NOT-EXIST"},
+        }, timeout=120)
+        assert response.status_code == 200
+        data = response.json()
+        cleanup_sessions.append(data['session_id'])
+        assert data['bot_message']['sources'] == []
+        print("✓ Non-matching filter returns empty sources")
@@ -0,0 +1,32 @@
+"""
+Backend API Tests for the Prometheus metrics endpoint
+Tests: /metrics exposition and request timing
+"""
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestMetrics:
+    """/metrics exposes the RAG pipeline metrics"""
+
+    def test_metrics_exposition(self):
+        requests.get(f"{BASE_URL}/api/sessions/")
+        response = requests.get(f"{BASE_URL}/metrics")
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain')
+        body = response.text
+        for name in [
+            'guardian_embed_seconds',
+            'guardian_vector_search_seconds',
+            'guardian_llm_generation_seconds',
+            'guardian_llm_fallbacks_total',
+            'guardian_retrieval_misses_total',
+            'guardian_ingested_documents_total',
+            'guardian_request_seconds',
+            'guardian_request_db_seconds',
+        ]:
+            assert f"# TYPE {name}" in body, f"{name} missing"
+        assert 'view="session-list"' in body
+        print("✓ /metrics exposes pipeline histograms and counters")
@@ -0,0 +1,68 @@
+"""
+Tests for the micro-batching layer (chat/microbatch.py)
+Tests: coalescing concurrent calls, key separation, max size, error fan-out
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chat.microbatch import MicroBatcher
+
+
+class Recorder:
+    """run_batch that records each batch and doubles its items."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, key, items):
+        with self.lock:
+            self.calls.append((key, list(items)))
+        return [item * 2 for item in items]
+
+
+def submit_concurrently(batcher, keyed_items):
+    with ThreadPoolExecutor(max_workers=len(keyed_items)) as pool:
+        return list(pool.map(lambda ki: batcher.submit(*ki), keyed_items))
+
+
+class TestMicroBatcher:
+    def test_single_call(self):
+        recorder = Recorder()
+        assert MicroBatcher(recorder, window_ms=1, max_size=8).submit('k', 3) == 6
+        assert recorder.calls == [('k', [3])]
+
+    def test_concurrent_calls_coalesce(self):
+        recorder = Recorder()
+        batcher = MicroBatcher(recorder, window_ms=200, max_size=8)
+        results = submit_concurrently(batcher, [('k', i) for i in range(8)])
+        assert results == [i * 2 for i in range(8)]
+        assert len(recorder.calls) == 1
+        assert sorted(recorder.calls[0][1]) == list(range(8))
+        assert batcher.stats() == {'batches': 1, 'items': 8, 'avg_batch_size': 8.0}
+
+    def test_keys_batched_separately(self):
+        recorder = Recorder()
+        batcher = MicroBatcher(recorder, window_ms=50, max_size=8)
+        results = submit_concurrently(batcher, [('a', 1), ('b', 2), ('a', 3), ('b', 4)])
+        assert results == [2, 4, 6, 8]
+        assert sorted(key for key, _ in recorder.calls) == ['a', 'b']
+
+    def test_max_size_splits_batches(self):
+        recorder = Recorder()
+        batcher = MicroBatcher(recorder, window_ms=200, max_size=3)
+        results = submit_concurrently(batcher, [('k', i) for i in range(6)])
+        assert results == [i * 2 for i in range(6)]
+        assert all(len(items) <= 3 for _, items in recorder.calls)
+
+    def test_error_reaches_every_caller(self):
+        def fail(key, items):
+            raise ValueError('backend down')
+
+        batcher = MicroBatcher(fail, window_ms=50, max_size=8)
+        with pytest.raises(ValueError):
+            submit_concurrently(batcher, [('k', i) for i in range(3)])
+        with pytest.raises(ValueError):
+            batcher.submit('k', 1)
@@ -0,0 +1,89 @@
+"""
+Tests for the shared Ollama HTTP transport (chat/ollama_client.py)
+Tests: retries on connection errors and gateway responses, connection reuse stats
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from chat.ollama_client import RetryTransport
+
+
+def flaky(responses):
+    """MockTransport replaying ``responses`` (status codes or exceptions) in order."""
+    remaining = list(responses)
+
+    def handler(request):
+        outcome = remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={'ok': outcome == 200})
+
+    return httpx.MockTransport(handler)
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = b'{"embeddings": [[0.1, 0.2]]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+class TestRetryTransport:
+    def test_retries_gateway_errors(self):
+        transport = RetryTransport(flaky([503, 502, 200]), retries=2, backoff_s=0)
+        response = httpx.Client(transport=transport).post('http://ollama/api/embed', json={})
+        assert response.status_code == 200
+        assert transport.stats()['retries'] == 2
+
+    def test_retries_connection_errors(self):
+        transport = RetryTransport(flaky([httpx.ConnectError('refused'), 200]), retries=2, backoff_s=0)
+        assert httpx.Client(transport=transport).get('http://ollama/').status_code == 200
+
+    def test_gives_up_after_retries(self):
+        transport = RetryTransport(
+            flaky([httpx.ConnectError('refused')] * 3), retries=2, backoff_s=0,
+        )
+        with pytest.raises(httpx.ConnectError):
+            httpx.Client(transport=transport).get('http://ollama/')
+        assert transport.stats()['failures'] == 1
+
+    def test_last_gateway_error_returned(self):
+        transport = RetryTransport(flaky([503, 503]), retries=1, backoff_s=0)
+        assert httpx.Client(transport=transport).get('http://ollama/').status_code == 503
+
+    def test_read_timeout_not_retried(self):
+        transport = RetryTransport(flaky([httpx.ReadTimeout('slow'), 200]), retries=2, backoff_s=0)
+        with pytest.raises(httpx.ReadTimeout):
+            httpx.Client(transport=transport).get('http://ollama/')
+        assert transport.stats()['retries'] == 0
+
+    def test_connections_reused(self, server):
+        transport = RetryTransport(httpx.HTTPTransport(), retries=0, backoff_s=0)
+        client = httpx.Client(base_url=server, transport=transport)
+        for _ in range(5):
+            assert client.post('/api/embed', json={'input': ['x']}).status_code == 200
+        stats = transport.stats()
+        assert stats['requests'] == 5
+        assert stats['tcp_connects'] == 1
+        assert stats['reused_connection_ratio'] == 0.8
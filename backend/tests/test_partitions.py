@@ -0,0 +1,158 @@
+"""
+Tests for monthly partitioning of the message table (chat/partitions.py)
+Tests: conversion keeps rows and indexes, partitions ahead (also over rows in the default partition),
+id uniqueness across partitions, archive drops partitions
+Needs PostgreSQL: runs in a throwaway test database on the PG_DB_* server, skipped when that is unreachable.
+"""
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+MONTHS = [datetime(2020, m, 1, tzinfo=timezone.utc) for m in (1, 2, 3)]
+MONTHS_AHEAD = 2
+
+
+@pytest.fixture(scope='module')
+def db():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+    django.setup()
+    from django.core.exceptions import ImproperlyConfigured
+    from django.db import OperationalError, connection, connections
+    from django.test.utils import setup_databases, teardown_databases
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('partitioning needs PostgreSQL')
+    try:
+        connection.ensure_connection()
+    except (OperationalError, ImproperlyConfigured) as e:
+        pytest.skip(f'PostgreSQL not reachable: {e}')
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield connection
+    connections.close_all()
+    teardown_databases(old_config, verbosity=0)
+
+
+@pytest.fixture(scope='module')
+def partitioned(db):
+    """Four messages in each of three 2020 months, then the table converted."""
+    from chat import partitions
+    from chat.models import ChatMessage, ChatSession
+
+    session = ChatSession.objects.create(title='TEST_partitions')
+    for month in MONTHS:
+        for day in range(1, 5):
+            message = ChatMessage.objects.create(session=session, message_type='user', text='TEST')
+            ChatMessage.objects.filter(id=message.id).update(timestamp=month.replace(day=day))
+    copied = partitions.convert_to_partitioned(MONTHS_AHEAD)
+    return session, copied
+
+
+def message_ids(month):
+    from chat.models import ChatMessage
+    from chat.partitions import add_months
+    return list(
+        ChatMessage.objects.filter(timestamp__gte=month, timestamp__lt=add_months(month, 1)).values_list('id', flat=True)
+    )
+
+
+class TestConversion:
+    def test_rows_copied_into_monthly_partitions(self, partitioned):
+        from chat import partitions
+        from chat.models import ChatMessage
+
+        _, copied = partitioned
+        assert copied == 12 and ChatMessage.objects.count() == 12
+        assert partitions.is_partitioned()
+        existing = partitions.existing_partitions()
+        assert {partitions.partition_name(m) for m in MONTHS} <= existing
+        assert partitions.DEFAULT_PARTITION in existing
+        with partitions.connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {partitions.partition_name(MONTHS[1])}')
+            assert cursor.fetchone()[0] == 4
+
+    def test_indexes_and_primary_key_recreated(self, partitioned):
+        from chat import partitions
+
+        with partitions.connection.cursor() as cursor:
+            cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s', [partitions.TABLE])
+            names = {row[0] for row in cursor.fetchall()}
+        assert f'{partitions.TABLE}_pkey' in names
+        assert 'chat_msg_type_ts_idx' in names
+
+    def test_ensure_partitions_is_idempotent(self, partitioned):
+        from chat import partitions
+
+        created = partitions.ensure_partitions(MONTHS_AHEAD + 2)
+        assert len(created) == 2
+        assert partitions.ensure_partitions(MONTHS_AHEAD + 2) == []
+
+
+    def test_partition_created_over_rows_in_default(self, partitioned):
+        """Rows that landed in the default partition move into the new one."""
+        from django.db import IntegrityError, transaction
+        from chat import partitions
+        from chat.models import ChatMessage
+
+        session, _ = partitioned
+        now = partitions.month_start(datetime.now(timezone.utc))
+        month = partitions.add_months(now, MONTHS_AHEAD + 4)
+        message = ChatMessage.objects.create(session=session, message_type='user', text='TEST')
+        ChatMessage.objects.filter(id=message.id).update(timestamp=month.replace(day=2))
+
+        assert partitions.partition_name(month) in partitions.ensure_partitions(MONTHS_AHEAD + 4)
+        with partitions.connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {partitions.partition_name(month)}')
+            assert [row[0] for row in cursor.fetchall()] == [message.id]
+            cursor.execute(f'SELECT COUNT(*) FROM {partitions.DEFAULT_PARTITION}')
+            assert cursor.fetchone()[0] == 0
+        with pytest.raises(IntegrityError), transaction.atomic():
+            ChatMessage.objects.create(id=message.id, session=session, message_type='user', text='TEST')
+        ChatMessage.objects.filter(id=message.id).delete()
+
+
+class TestIdUniqueness:
+    def test_orm_round_trip(self, partitioned):
+        from chat.models import ChatMessage
+
+        session, _ = partitioned
+        message = ChatMessage.objects.create(session=session, message_type='bot', text='TEST')
+        ChatMessage.objects.filter(id=message.id).update(rating=5)
+        assert ChatMessage.objects.get(id=message.id).rating == 5
+        message.delete()
+        assert not ChatMessage.objects.filter(id=message.id).exists()
+
+    def test_duplicate_id_in_other_partition_rejected(self, partitioned):
+        from django.db import IntegrityError, transaction
+        from chat.models import ChatMessage
+
+        session, _ = partitioned
+        old_id = message_ids(MONTHS[0])[0]
+        # auto_now_add puts the copy in the current month's partition
+        with pytest.raises(IntegrityError), transaction.atomic():
+            ChatMessage.objects.create(id=old_id, session=session, message_type='user', text='TEST')
+
+    def test_moving_row_between_partitions_keeps_its_id(self, partitioned):
+        from chat.models import ChatMessage
+
+        message_id = message_ids(MONTHS[2])[0]
+        ChatMessage.objects.filter(id=message_id).update(timestamp=MONTHS[2].replace(month=4))
+        assert ChatMessage.objects.filter(id=message_id).exists()
+        ChatMessage.objects.filter(id=message_id).update(timestamp=MONTHS[2])
+
+
+class TestArchive:
+    def test_archiving_drops_partitions_and_releases_ids(self, partitioned, tmp_path):
+        from chat import archive, partitions
+        from chat.models import ChatMessage
+
+        session, _ = partitioned
+        archived_id = message_ids(MONTHS[0])[0]
+        results = list(archive.archive_messages(30, str(tmp_path), 'jsonl.gz'))
+
+        assert [count for _, _, count in results][:3] == [4, 4, 4]
+        assert not {partitions.partition_name(m) for m in MONTHS} & partitions.existing_partitions()
+        assert not ChatMessage.objects.filter(timestamp__lt=MONTHS[2].replace(month=4)).exists()
+        # The archived id is free again
+        ChatMessage.objects.create(id=archived_id, session=session, message_type='user', text='TEST')
@@ -0,0 +1,71 @@
+"""
+Backend API Tests for on-demand request profiling
+Tests: X-Profile header, profile listing and download
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+# Must match the server's PROFILE_TOKEN (profiling is off without one)
+TOKEN = os.environ.get('PROFILE_TOKEN', '')
+TOKEN_HEADERS = {'X-Profile-Token': TOKEN}
+needs_token = pytest.mark.skipif(not TOKEN, reason='PROFILE_TOKEN not set')
+
+
+class TestProfiling:
+    """Profiles are captured on request and fetchable by id"""
+
+    def test_unprofiled_request_has_no_profile_id(self):
+        response = requests.get(f"{BASE_URL}/api/sessions/")
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+        print("✓ No profile without X-Profile")
+
+    def test_no_profile_without_token(self):
+        response = requests.get(f"{BASE_URL}/api/sessions/", headers={'X-Profile': 'cprofile'})
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+        assert requests.get(f"{BASE_URL}/api/profiles/").status_code == 403
+        print("✓ Profiles neither captured nor listed without the token")
+
+    @needs_token
+    def test_cprofile_and_sample(self):
+        for mode in ('cprofile', 'sample'):
+            response = requests.get(
+                f"{BASE_URL}/api/analytics/usage/",
+                headers={'X-Profile': mode, **TOKEN_HEADERS},
+            )
+            assert response.status_code == 200
+            profile_id = response.headers.get('X-Profile-Id')
+            assert profile_id, f"No profile id for {mode}"
+
+            meta = requests.get(f"{BASE_URL}/api/profiles/{profile_id}/?output=json", headers=TOKEN_HEADERS).json()
+            assert meta['mode'] in ('cprofile', 'sample')
+            assert meta['path'] == '/api/analytics/usage/'
+
+            listed = requests.get(f"{BASE_URL}/api/profiles/", headers=TOKEN_HEADERS).json()['profiles']
+            assert profile_id in [p['id'] for p in listed]
+
+            download = requests.get(f"{BASE_URL}/api/profiles/{profile_id}/", headers=TOKEN_HEADERS)
+            assert download.status_code == 200
+            # cprofile falls back to sampling while another request is being cProfiled
+            extension = '.prof' if meta['mode'] == 'cprofile' else '.folded'
+            assert extension in download.headers['Content-Disposition']
+        print("✓ cProfile and sampled profiles stored and downloadable")
+
+    @needs_token
+    def test_request_id_does_not_choose_the_file(self):
+        headers = {'X-Profile': 'sample', 'X-Request-Id': 'TEST_profile', **TOKEN_HEADERS}
+        first = requests.get(f"{BASE_URL}/api/sessions/", headers=headers).headers['X-Profile-Id']
+        second = requests.get(f"{BASE_URL}/api/sessions/", headers=headers).headers['X-Profile-Id']
+        assert 'TEST_profile' not in (first, second) and first != second
+        meta = requests.get(f"{BASE_URL}/api/profiles/{first}/?output=json", headers=TOKEN_HEADERS).json()
+        assert meta['request_id'] == 'TEST_profile'
+        print("✓ Profile ids are generated by the server")
+
+    @needs_token
+    def test_unknown_profile(self):
+        response = requests.get(f"{BASE_URL}/api/profiles/does-not-exist/", headers=TOKEN_HEADERS)
+        assert response.status_code == 404
+        print("✓ Unknown profile is a 404")
@@ -0,0 +1,126 @@
+"""
+Tests for the reranking stage (chat/rerank.py)
+Tests: lexical scoring, reordering, latency budget cut-off (including content loading), model warm-up
+"""
+import time
+
+from chat.rerank import CrossEncoderReranker, LexicalReranker, Reranker, rerank, tokenize
+from conftest import make_docs
+
+
+class SlowReranker(Reranker):
+    """Scores docs by id (reversing vector order), sleeping per batch."""
+
+    name = 'slow'
+
+    def __init__(self, delay_s):
+        self.delay_s = delay_s
+        self.calls = 0
+        self.loaded = True
+
+    @property
+    def ready(self):
+        return self.loaded
+
+    def score(self, query, docs):
+        self.calls += 1
+        time.sleep(self.delay_s)
+        return [d['id'] for d in docs]
+
+
+class TestLexicalReranker:
+    def test_tokenize_keeps_error_codes(self):
+        assert tokenize('How do I fix AUTH-001?') == {'fix', 'auth-001'}
+
+    def test_exact_code_match_ranks_first(self):
+        docs = make_docs(titles=('AUTH-002 token expired', 'AUTH-001 invalid password', 'Disk full'))
+        ranked, stats = rerank('AUTH-001 error', docs, LexicalReranker(), batch_size=16, budget_ms=1000)
+        assert ranked[0]['title'] == 'AUTH-001 invalid password'
+        assert stats == {'reranker': 'lexical', 'reranked': 3, 'budget_exhausted': False}
+
+    def test_content_not_read(self):
+        docs = make_docs(titles=('Disk full', 'Disk full'))
+        docs[0]['content'] = 'printer offline'
+        rerank('printer offline', docs, LexicalReranker(), batch_size=16, budget_ms=1000)
+        assert docs[0]['rerank_score'] == docs[1]['rerank_score']
+
+    def test_vector_score_breaks_ties(self):
+        docs = make_docs(titles=('Disk full', 'Disk full'))
+        docs[1]['score'] = 0.9
+        ranked, _ = rerank('printer offline', docs, LexicalReranker(), batch_size=16, budget_ms=1000)
+        assert ranked[0]['id'] == 1
+
+
+class TestRerankBudget:
+    def test_all_batches_within_budget(self):
+        docs = make_docs(titles='abcde')
+        reranker = SlowReranker(0)
+        ranked, stats = rerank('q', docs, reranker, batch_size=2, budget_ms=1000)
+        assert reranker.calls == 3
+        assert [d['id'] for d in ranked] == [0, 1, 2, 3, 4][::-1]
+        assert not stats['budget_exhausted']
+
+    def test_budget_stops_further_batches(self):
+        """A batch that would overrun the budget is not started; the tail keeps vector order."""
+        docs = make_docs(titles='abcdef')
+        reranker = SlowReranker(0.05)
+        ranked, stats = rerank('q', docs, reranker, batch_size=2, budget_ms=80)
+        assert reranker.calls == 1
+        assert stats['reranked'] == 2 and stats['budget_exhausted']
+        assert [d['id'] for d in ranked] == [1, 0, 2, 3, 4, 5]
+
+    def test_estimated_cost_stops_first_batch(self):
+        """With a known per-doc cost, even the first batch must fit the budget."""
+        docs = make_docs(titles='abcd')
+        reranker = SlowReranker(0)
+        reranker.ms_per_doc = 30.0
+        ranked, stats = rerank('q', docs, reranker, batch_size=2, budget_ms=50)
+        assert reranker.calls == 0
+        assert stats['reranked'] == 0 and stats['budget_exhausted']
+        assert [d['id'] for d in ranked] == [0, 1, 2, 3]
+
+    def test_prepare_runs_per_scored_batch_within_budget(self):
+        """Loading a batch's content is charged to the budget, and skipped for unscored batches."""
+        docs = make_docs(titles='abcdef')
+        prepared = []
+
+        def prepare(batch):
+            prepared.append([d['id'] for d in batch])
+            time.sleep(0.05)
+
+        reranker = SlowReranker(0)
+        _, stats = rerank('q', docs, reranker, batch_size=2, budget_ms=80, prepare=prepare)
+        assert prepared == [[0, 1]]
+        assert stats['reranked'] == 2 and stats['budget_exhausted']
+
+    def test_cost_learned_across_requests(self):
+        reranker = SlowReranker(0.02)
+        rerank('q', make_docs(titles='ab'), reranker, batch_size=2, budget_ms=1000)
+        assert reranker.ms_per_doc >= 10
+        _, stats = rerank('q', make_docs(titles='abcd'), reranker, batch_size=2, budget_ms=15)
+        assert reranker.calls == 1
+        assert stats['reranked'] == 0
+
+
+class TestWarmUp:
+    def test_not_ready_skips_reranking(self):
+        docs = make_docs(titles='abc')
+        reranker = SlowReranker(0)
+        reranker.loaded = False
+        prepared = []
+        ranked, stats = rerank('q', docs, reranker, batch_size=2, budget_ms=1000, prepare=prepared.append)
+        assert reranker.calls == 0
+        assert stats == {'reranker': 'slow', 'reranked': 0, 'budget_exhausted': False}
+        assert [d['id'] for d in ranked] == [0, 1, 2]
+        assert prepared == []
+
+    def test_cross_encoder_not_ready_until_loaded(self, monkeypatch):
+        reranker = CrossEncoderReranker('some/model', batch_size=4)
+        assert not reranker.ready
+        calls = []
+        monkeypatch.setattr(CrossEncoderReranker, 'load', lambda self: calls.append(self))
+        reranker.start_loading()
+        reranker.start_loading()
+        reranker._loader.join()
+        assert calls == [reranker]
+        assert not reranker.ready
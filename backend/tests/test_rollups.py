@@ -0,0 +1,124 @@
+"""
+Tests for hourly message rollups (chat/analytics.py)
+Tests: deleting and clearing sessions takes their messages out of rolled-up hours,
+concurrent ratings of a rolled-up message
+Needs a database: runs in a throwaway test database, skipped when that is unreachable.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+HOUR = datetime(2020, 1, 1, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope='module')
+def db():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'guardian_project.settings')
+    django.setup()
+    from django.core.exceptions import ImproperlyConfigured
+    from django.db import OperationalError, connection, connections
+    from django.test.utils import setup_databases, teardown_databases
+
+    try:
+        connection.ensure_connection()
+    except (OperationalError, ImproperlyConfigured) as e:
+        pytest.skip(f'database not reachable: {e}')
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield connection
+    connections.close_all()
+    teardown_databases(old_config, verbosity=0)
+
+
+def add_session(latencies):
+    """A session with one user and one bot message per latency, all in HOUR."""
+    from chat.models import ChatMessage, ChatSession
+
+    session = ChatSession.objects.create(title='TEST_rollups')
+    for minute, latency in enumerate(latencies):
+        for message_type in ('user', 'bot'):
+            message = ChatMessage.objects.create(
+                session=session, message_type=message_type, text='TEST', rag_latency_ms=latency,
+            )
+            ChatMessage.objects.filter(id=message.id).update(timestamp=HOUR.replace(minute=minute))
+    return session
+
+
+@pytest.fixture
+def rolled_up(db):
+    from chat import analytics
+    from chat.models import ChatMessage, ChatSession, MessageRollup
+
+    kept = add_session([100, 200])
+    dropped = add_session([50, 900])
+    analytics.roll_up(HOUR.replace(hour=HOUR.hour + 1))
+    yield kept, dropped
+    MessageRollup.objects.all().delete()
+    ChatMessage.objects.all().delete()
+    ChatSession.objects.all().delete()
+
+
+def bot_rollup():
+    from chat.models import MessageRollup
+    return MessageRollup.objects.get(bucket=HOUR, message_type='bot')
+
+
+class TestDeletedMessages:
+    def test_deleted_session_leaves_rollups(self, rolled_up):
+        from chat import analytics
+
+        kept, dropped = rolled_up
+        assert bot_rollup().count == 4
+        analytics.delete_messages(dropped.messages.all())
+        dropped.delete()
+
+        rollup = bot_rollup()
+        assert rollup.count == 2
+        assert rollup.rag_latency_sum == 300
+        assert (rollup.rag_latency_min, rollup.rag_latency_max) == (100, 200)
+        stats = analytics.usage_stats()['summary']
+        assert stats['total_messages'] == 4 and stats['total_sessions'] == 1
+
+    def test_clearing_every_message_of_an_hour_drops_its_rollup(self, rolled_up):
+        from chat import analytics
+        from chat.models import MessageRollup
+
+        kept, dropped = rolled_up
+        assert analytics.delete_messages(dropped.messages.all()) == 4
+        assert analytics.delete_messages(kept.messages.all()) == 4
+        assert not MessageRollup.objects.filter(bucket=HOUR).exists()
+
+
+class TestConcurrentRatings:
+    def test_double_click_counted_once(self, rolled_up):
+        from django.db import connection
+        from rest_framework.test import APIRequestFactory
+        from chat.views import message_feedback
+
+        kept, _ = rolled_up
+        message = kept.messages.filter(message_type='bot').first()
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def rate(stars):
+            request = APIRequestFactory().patch(f'/api/messages/{message.id}/feedback/', {'rating': stars}, format='json')
+            barrier.wait()
+            try:
+                statuses.append(message_feedback(request, message.id).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=rate, args=(5 - i % 2,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert statuses == [200] * 8
+        message.refresh_from_db()
+        rollup = bot_rollup()
+        assert rollup.rated_count == 1
+        assert rollup.rating_sum == message.rating
+        assert rollup.rating_4 + rollup.rating_5 == 1
@@ -0,0 +1,32 @@
+"""
+Tests for retrieval score cutoffs and dynamic k (chat/rag_service.py)
+Tests: minimum score, relative score gap, confidence-based k
+"""
+from chat.rag_service import apply_score_cutoffs
+from conftest import make_docs
+
+
+class TestApplyScoreCutoffs:
+    def test_defaults_keep_everything(self):
+        kept, k, dropped = apply_score_cutoffs(make_docs(0.8, 0.1, 0.01), max_k=3)
+        assert len(kept) == 3 and k == 3 and dropped == []
+
+    def test_min_score(self):
+        kept, k, dropped = apply_score_cutoffs(make_docs(0.8, 0.5, 0.2, 0.1), max_k=3, min_score=0.3)
+        assert [d['id'] for d in kept] == [0, 1]
+        assert k == 2
+        assert [(d['id'], d['reason']) for d in dropped] == [('2', 'min_score'), ('3', 'min_score')]
+
+    def test_score_gap(self):
+        """Everything after a drop of more than half the top score is cut"""
+        kept, k, dropped = apply_score_cutoffs(make_docs(0.8, 0.75, 0.3, 0.29), max_k=3, max_gap=0.5)
+        assert [d['id'] for d in kept] == [0, 1]
+        assert [d['reason'] for d in dropped] == ['score_gap', 'score_gap']
+
+    def test_confident_top_hit_uses_min_k(self):
+        docs = make_docs(0.9, 0.8, 0.7)
+        assert apply_score_cutoffs(docs, max_k=3, min_k=1, confident_score=0.85)[1] == 1
+        assert apply_score_cutoffs(docs, max_k=3, min_k=1, confident_score=0.95)[1] == 3
+
+    def test_empty(self):
+        assert apply_score_cutoffs([], max_k=3) == ([], 0, [])
@@ -0,0 +1,73 @@
+"""
+Backend API Tests for per-stage tracing
+Tests: X-Trace-Id header on chat requests (server runs with TRACE_EXPORTER file or otlp),
+OTLP/JSON file export and its size-based rotation
+"""
+import json
+import os
+import re
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+# Must match the server's TRACE_EXPORTER (tracing is off by default)
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none')
+
+
+@pytest.mark.skipif(TRACE_EXPORTER == 'none', reason='TRACE_EXPORTER not set')
+class TestTracing:
+    """Traced chat requests return their trace id"""
+
+    def test_trace_id_header(self):
+        response = requests.post(f"{BASE_URL}/api/chat/", json={})
+        assert response.status_code == 400
+        trace_id = response.headers.get('X-Trace-Id')
+        assert trace_id and re.fullmatch(r'[0-9a-f]{32}', trace_id)
+
+        other = requests.post(f"{BASE_URL}/api/chat/", json={})
+        assert other.headers.get('X-Trace-Id') != trace_id
+        print("✓ X-Trace-Id returned per chat request")
+
+
+class TestFileExport:
+    """SDK spans written as OTLP/JSON lines, rotated by size"""
+
+    @pytest.fixture
+    def tracer(self, tmp_path):
+        pytest.importorskip('opentelemetry.sdk')
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from chat import tracing
+
+        path = str(tmp_path / 'traces.jsonl')
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(tracing.file_exporter(path, max_bytes=2000, backups=2)))
+        yield provider.get_tracer('test'), path
+        provider.shutdown()
+
+    def test_spans_written_as_otlp_json(self, tracer):
+        from opentelemetry import trace as otel_trace
+
+        tracer, path = tracer
+        with tracer.start_as_current_span('root') as root:
+            with tracer.start_as_current_span('child', attributes={'hits': 3}):
+                pass
+        lines = [json.loads(line) for line in open(path)]
+        spans = [s for line in lines for s in line['resourceSpans'][0]['scopeSpans'][0]['spans']]
+        child, parent = spans
+        assert parent['name'] == 'root' and parent['parentSpanId'] == ''
+        assert child['parentSpanId'] == parent['spanId']
+        assert child['traceId'] == format(root.get_span_context().trace_id, '032x')
+        assert child['attributes'] == [{'key': 'hits', 'value': {'intValue': '3'}}]
+        assert child['kind'] == otel_trace.SpanKind.INTERNAL.value + 1
+
+    def test_file_rotated_by_size(self, tracer):
+        tracer, path = tracer
+        for _ in range(50):
+            with tracer.start_as_current_span('span'):
+                pass
+        assert os.path.getsize(path) <= 2000
+        assert os.path.exists(f'{path}.1') and os.path.exists(f'{path}.2')
+        assert not os.path.exists(f'{path}.3')
+        print("✓ Trace file rotated, two backups kept")
@@ -0,0 +1,323 @@
+"""
+Tests for the in-process vector indexes (chat/vector_index.py)
+Tests: exact top-k ordering, upsert/replace, deletes, payload filters, cross-process hot reload,
+concurrent writers
+"""
+import importlib.util
+import threading
+
+import numpy as np
+import pytest
+from qdrant_client.models import PointStruct
+
+from chat.vector_index import HnswIndex, NumpyIndex, normalize
+
+DIM = 16
+
+needs_hnswlib = pytest.mark.skipif(importlib.util.find_spec('hnswlib') is None, reason='hnswlib not installed')
+INDEX_CLASSES = [NumpyIndex, pytest.param(HnswIndex, marks=needs_hnswlib)]
+
+
+def make_points(vectors, start=0):
+    return [
+        PointStruct(id=start + i, vector=v.tolist(), payload={'title': f'doc {start + i}'})
+        for i, v in enumerate(vectors)
+    ]
+
+
+def make_labelled_points(vectors):
+    """Points with a severity that cycles Critical/High/Low by id."""
+    severities = ['Critical', 'High', 'Low']
+    return [
+        PointStruct(id=i, vector=v.tolist(), payload={'title': f'doc {i}', 'severity': severities[i % 3]})
+        for i, v in enumerate(vectors)
+    ]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(42).standard_normal((200, DIM)).astype(np.float32)
+
+
+class TestNumpyIndex:
+    """Tests for NumpyIndex search and persistence"""
+
+    def test_matches_brute_force(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors))
+        query = vectors[7] + 0.1
+
+        hits = index.search(query.tolist(), top_k=5)
+
+        expected = np.argsort(-(normalize(vectors) @ normalize(query)[0]))[:5]
+        assert [h.id for h in hits] == expected.tolist()
+        assert hits[0].payload['title'] == f'doc {expected[0]}'
+        assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+
+    def test_batch_matches_single(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors))
+        queries = vectors[:4].tolist()
+
+        batched = index.search_batch(queries, top_k=3)
+
+        for query, hits in zip(queries, batched):
+            assert [h.id for h in hits] == [h.id for h in index.search(query, top_k=3)]
+
+    def test_upsert_replaces_existing_ids(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:10]))
+        index.upsert([PointStruct(id=3, vector=vectors[50].tolist(), payload={'title': 'replaced'})])
+
+        assert len(index) == 10
+        hit = index.search(vectors[50].tolist(), top_k=1)[0]
+        assert hit.id == 3
+        assert hit.payload['title'] == 'replaced'
+        assert hit.score == pytest.approx(1.0, abs=1e-5)
+
+    def test_other_instances_hot_reload(self, tmp_path, vectors):
+        reader = NumpyIndex(tmp_path, dim=DIM)
+        assert reader.search(vectors[0].tolist(), top_k=3) == []
+
+        writer = NumpyIndex(tmp_path, dim=DIM)
+        writer.upsert(make_points(vectors[:20]))
+        assert reader.search(vectors[0].tolist(), top_k=1)[0].id == 0
+
+        writer.upsert(make_points(vectors[20:40], start=20))
+        assert len(reader) == 40
+
+    def test_top_k_larger_than_index(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:2]))
+        assert len(index.search(vectors[0].tolist(), top_k=10)) == 2
+
+
+@needs_hnswlib
+class TestHnswIndex:
+    """Tests for HnswIndex incremental inserts, deletes and persistence"""
+
+    def test_finds_exact_neighbours(self, tmp_path, vectors):
+        index = HnswIndex(tmp_path, dim=DIM, ef=100)
+        index.upsert(make_points(vectors))
+
+        hits = index.search(vectors[12].tolist(), top_k=3)
+
+        assert hits[0].id == 12
+        assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+
+    def test_incremental_insert_and_capacity_growth(self, tmp_path, vectors):
+        index = HnswIndex(tmp_path, dim=DIM)
+        for start in range(0, 200, 50):
+            index.upsert(make_points(vectors[start:start + 50], start=start))
+
+        assert len(index) == 200
+        assert index.search(vectors[180].tolist(), top_k=1)[0].id == 180
+
+    def test_delete_and_reinsert(self, tmp_path, vectors):
+        index = HnswIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:20]))
+
+        index.delete([5])
+        assert len(index) == 19
+        assert 5 not in [h.id for h in index.search(vectors[5].tolist(), top_k=5)]
+
+        index.upsert(make_points(vectors[5:6], start=5))
+        assert len(index) == 20
+        assert index.search(vectors[5].tolist(), top_k=1)[0].id == 5
+
+    def test_top_k_capped_by_live_points(self, tmp_path, vectors):
+        index = HnswIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:3]))
+        index.delete([0])
+        assert len(index.search(vectors[0].tolist(), top_k=10)) == 2
+
+    def test_persisted_index_reloads_in_other_instance(self, tmp_path, vectors):
+        writer = HnswIndex(tmp_path, dim=DIM)
+        writer.upsert(make_points(vectors[:30]))
+        writer.delete([0])
+
+        reader = HnswIndex(tmp_path, dim=DIM)
+        assert len(reader) == 29
+        hit = reader.search(vectors[10].tolist(), top_k=1)[0]
+        assert hit.id == 10
+        assert hit.payload == {'title': 'doc 10'}
+
+    def test_searches_concurrent_with_inserts(self, tmp_path, vectors):
+        index = HnswIndex(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:20]))
+        errors = []
+
+        def search():
+            try:
+                for i in range(50):
+                    hits = index.search(vectors[i % 20].tolist(), top_k=3)
+                    assert hits[0].id == i % 20
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=search) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for start in range(20, 200, 20):
+            index.upsert(make_points(vectors[start:start + 20], start=start))
+        for thread in readers:
+            thread.join()
+
+        assert errors == []
+        assert len(index) == 200
+
+
+class TestQuantizedNumpyIndex:
+    """Tests for int8/binary quantized candidate scoring with rescoring"""
+
+    @pytest.mark.parametrize('mode', ['int8', 'binary'])
+    def test_rescored_scores_are_exact(self, tmp_path, vectors, mode):
+        index = NumpyIndex(tmp_path, dim=DIM, quantization=mode, oversampling=4.0)
+        index.upsert(make_points(vectors))
+        query = vectors[3]
+
+        hits = index.search(query.tolist(), top_k=3)
+
+        assert hits[0].id == 3
+        exact = normalize(vectors) @ normalize(query)[0]
+        for hit in hits:
+            assert hit.score == pytest.approx(float(exact[hit.id]), abs=1e-5)
+
+    def test_int8_recall_close_to_exact(self, tmp_path, vectors):
+        exact = NumpyIndex(tmp_path / 'exact', dim=DIM)
+        quantized = NumpyIndex(tmp_path / 'int8', dim=DIM, quantization='int8', oversampling=3.0)
+        exact.upsert(make_points(vectors))
+        quantized.upsert(make_points(vectors))
+        queries = (vectors[:20] + 0.3).tolist()
+
+        overlap = [
+            len({h.id for h in a} & {h.id for h in b}) / 5
+            for a, b in zip(exact.search_batch(queries, 5), quantized.search_batch(queries, 5))
+        ]
+        assert np.mean(overlap) >= 0.95
+
+    def test_codes_persisted_with_generation(self, tmp_path, vectors):
+        NumpyIndex(tmp_path, dim=DIM, quantization='binary').upsert(make_points(vectors))
+        assert list(tmp_path.glob('numpy/gen-*/codes-binary.npy'))
+
+
+class TestFilteredSearch:
+    """Tests for payload pre-filtering in the local indexes"""
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_filter_restricts_ranking_not_results(self, tmp_path, vectors, index_cls):
+        index = index_cls(tmp_path, dim=DIM)
+        index.upsert(make_labelled_points(vectors))
+
+        hits = index.search(vectors[0].tolist(), top_k=5, filters={'severity': 'High'})
+
+        # A post-filter would return fewer than 5 (doc 0 itself is Critical)
+        assert len(hits) == 5
+        assert all(h.payload['severity'] == 'High' for h in hits)
+        allowed = np.arange(1, len(vectors), 3)
+        exact = normalize(vectors[allowed]) @ normalize(vectors[0])[0]
+        assert [h.id for h in hits] == allowed[np.argsort(-exact)[:5]].tolist()
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_list_values_match_any(self, tmp_path, vectors, index_cls):
+        index = index_cls(tmp_path, dim=DIM)
+        index.upsert(make_labelled_points(vectors))
+
+        hits = index.search(vectors[0].tolist(), top_k=50, filters={'severity': ['High', 'Low']})
+
+        assert len(hits) == 50
+        assert {h.payload['severity'] for h in hits} <= {'High', 'Low'}
+
+    def test_no_matches_returns_empty(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM, quantization='int8')
+        index.upsert(make_labelled_points(vectors))
+        assert index.search(vectors[0].tolist(), top_k=3, filters={'severity': 'Medium'}) == []
+
+    def test_quantized_filtered_search(self, tmp_path, vectors):
+        index = NumpyIndex(tmp_path, dim=DIM, quantization='binary', oversampling=10)
+        index.upsert(make_labelled_points(vectors))
+
+        hits = index.search(vectors[2].tolist(), top_k=3, filters={'severity': 'Low'})
+
+        assert hits[0].id == 2
+        assert all(h.payload['severity'] == 'Low' for h in hits)
+
+    @needs_hnswlib
+    def test_hnsw_graph_walk_with_filter(self, tmp_path, vectors, monkeypatch):
+        monkeypatch.setattr('chat.vector_index.HNSW_EXACT_FILTER_LIMIT', 0)
+        index = HnswIndex(tmp_path, dim=DIM, ef=200)
+        index.upsert(make_labelled_points(vectors))
+
+        hits = index.search(vectors[1].tolist(), top_k=3, filters={'severity': 'High'})
+
+        assert hits[0].id == 1
+        assert all(h.payload['severity'] == 'High' for h in hits)
+
+
+class TestPayloadProjection:
+    """Tests for with_payload projection and retrieve() lookups"""
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_projection(self, tmp_path, vectors, index_cls):
+        index = index_cls(tmp_path, dim=DIM)
+        index.upsert(make_labelled_points(vectors[:10]))
+
+        summary = index.search(vectors[0].tolist(), top_k=2, with_payload=['severity'])
+        bare = index.search(vectors[0].tolist(), top_k=2, with_payload=False)
+
+        assert summary[0].payload == {'severity': 'Critical'}
+        assert bare[0].payload is None
+        assert [h.id for h in bare] == [h.id for h in summary]
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_retrieve(self, tmp_path, vectors, index_cls):
+        index = index_cls(tmp_path, dim=DIM)
+        index.upsert(make_labelled_points(vectors[:10]))
+        index.delete([4])
+
+        found = index.retrieve([3, 4, 99], with_payload=['title'])
+
+        assert found == {3: {'title': 'doc 3'}}
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_with_vectors(self, tmp_path, vectors, index_cls):
+        index = index_cls(tmp_path, dim=DIM)
+        index.upsert(make_points(vectors[:10]))
+
+        hits = index.search(vectors[3].tolist(), top_k=2, with_vectors=True)
+        plain = index.search(vectors[3].tolist(), top_k=2)
+
+        np.testing.assert_allclose(hits[0].vector, normalize(vectors[3])[0], atol=1e-5)
+        assert plain[0].vector is None
+
+
+class TestBackendDirectories:
+    """Backends sharing RAG_LOCAL_INDEX_DIR keep their generations apart"""
+
+    @needs_hnswlib
+    def test_switching_backend_does_not_load_other_layout(self, tmp_path, vectors):
+        NumpyIndex(tmp_path, dim=DIM).upsert(make_points(vectors[:10]))
+        hnsw = HnswIndex(tmp_path, dim=DIM)
+        assert hnsw.search(vectors[0].tolist(), top_k=3) == []
+        hnsw.upsert(make_points(vectors[:5]))
+        assert len(NumpyIndex(tmp_path, dim=DIM)) == 10 and len(hnsw) == 5
+
+
+class TestConcurrentWriters:
+    """Writers in other processes (here: other instances) don't lose updates"""
+
+    @pytest.mark.parametrize('index_cls', INDEX_CLASSES)
+    def test_interleaved_upserts_all_kept(self, tmp_path, vectors, index_cls):
+        writers = [index_cls(tmp_path, dim=DIM) for _ in range(2)]
+
+        def ingest(writer, first):
+            for start in range(first, 200, 20):
+                writer.upsert(make_points(vectors[start:start + 10], start=start))
+
+        threads = [threading.Thread(target=ingest, args=(w, i * 10)) for i, w in enumerate(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(index_cls(tmp_path, dim=DIM)) == 200
@@ -5,6 +5,12 @@ echo "=========================================="
 echo " PSPD Guardian — Backend Startup"
 echo "=========================================="
 
+# Prometheus metrics are shared between Gunicorn workers through files in
+# this directory, which must start empty (see chat/metrics.py)
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "${PROMETHEUS_MULTIPROC_DIR:?}"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # ---------------------------------------------------------------------------
 # 1. Wait for PostgreSQL to be ready
 # ---------------------------------------------------------------------------
@@ -72,8 +78,10 @@ echo " Starting Gunicorn on 0.0.0.0:8001"
 echo "=========================================="
 
 exec gunicorn guardian_project.wsgi:application \
+    --config gunicorn.conf.py \
     --bind 0.0.0.0:8001 \
     --workers "${GUNICORN_WORKERS:-2}" \
+    --threads "${GUNICORN_THREADS:-1}" \
     --timeout "${GUNICORN_TIMEOUT:-300}" \
     --access-logfile - \
     --error-logfile - \